@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import json
+import os
+
+from benchmarks.suite import BenchmarkSuite, compare_reports, save_report
+from stand_in.server import FaultConfig
+from utils.log import configure_logging
+
+
+def parse_setting(value: str) -> tuple[str, object]:
+    name, _, raw_value = value.partition('=')
+    try:
+        return name, json.loads(raw_value)
+    except json.JSONDecodeError:
+        return name, raw_value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Runs the bot against the local stand-in with generated accounts and saves wall time, '
+                    'accounts/hour, rpc requests per account, peak memory and event loop lag as json'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='numbers of accounts')
+    parser.add_argument('--output-dir', default='files/benchmarks')
+    parser.add_argument('--port', type=int, default=18080, help='port of the stand-in')
+    parser.add_argument('--slots', type=int, default=50, help='accounts run concurrently')
+    parser.add_argument('--sleep-scale', type=float, default=0, help='multiplier of the sleeps of settings.py')
+    parser.add_argument('--latency', type=float, nargs=2, default=[0, 0], metavar=('MIN', 'MAX'),
+                        help='delay of every stand-in request in seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='share of requests answered with 429')
+    parser.add_argument('--commit-delay', type=float, default=0.2, help='seconds from submit to commit of transaction')
+    parser.add_argument('--withdraw-delay', type=float, default=1, help='seconds from withdrawal to its arrival')
+    parser.add_argument('--set', type=parse_setting, action='append', default=[], metavar='NAME=VALUE',
+                        help='settings.py value of the benchmarked bot, e.g. --set SWAPS_LIMIT_RANGE=[1,2]')
+    parser.add_argument('--baseline', help='previous report to compare with')
+    args = parser.parse_args()
+    # Log of the suite goes next to the reports, not to the log dir of the bot
+    configure_logging(log_dir=os.path.join(args.output_dir, 'logs'))
+
+    suite = BenchmarkSuite(
+        sizes=args.sizes,
+        output_dir=args.output_dir,
+        port=args.port,
+        slots=args.slots,
+        sleep_scale=args.sleep_scale,
+        stand_in_options={
+            'faults': FaultConfig(
+                latency_range=(args.latency[0], args.latency[1]),
+                error_rate=args.error_rate,
+                throttle_rate=args.throttle_rate
+            ),
+            'commit_delay': args.commit_delay,
+            'withdraw_delay': args.withdraw_delay
+        },
+        settings_overrides=dict(args.set)
+    )
+    report = asyncio.run(suite.run())
+
+    suite.logger_msg(f'Benchmark report is saved to {save_report(report, args.output_dir)}', 'success')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for line in compare_reports(report, baseline):
+            suite.logger_msg(line)
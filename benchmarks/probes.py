@@ -0,0 +1,64 @@
+import asyncio
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows, peak memory is not reported there
+    resource = None
+
+
+def get_peak_rss_mb() -> float | None:
+    """
+    Peak resident memory of the current process
+    :return: megabytes, None if the platform does not report it
+    """
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on linux
+    return round(peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task sleeping for the interval, i.e. how long callbacks block the loop
+    """
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lags: list[float] = []
+        self.task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            start_time = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(time.perf_counter() - start_time - self.interval, 0))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stats(self) -> dict:
+        if not self.lags:
+            return {'samples': 0, 'mean_ms': 0, 'p50_ms': 0, 'p99_ms': 0, 'max_ms': 0}
+
+        lags = sorted(self.lags)
+        return {
+            'samples': len(lags),
+            'mean_ms': round(sum(lags) / len(lags) * 1000, 2),
+            'p50_ms': round(lags[len(lags) // 2] * 1000, 2),
+            'p99_ms': round(lags[min(int(len(lags) * 0.99), len(lags) - 1)] * 1000, 2),
+            'max_ms': round(lags[-1] * 1000, 2)
+        }
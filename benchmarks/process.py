@@ -0,0 +1,136 @@
+import asyncio
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+
+from benchmarks.probes import LoopLagMonitor, get_peak_rss_mb
+
+# Nothing of the bot is imported at module level, the benchmark process imports it after settings are patched.
+# Sleep ranges of settings.py, multiplied by the sleep scale (randint needs whole seconds)
+SLEEP_SETTINGS = [
+    'SLEEP_RANGE_BETWEEN_ACCOUNTS',
+    'SLEEP_RANGE_BETWEEN_ATTEMPT',
+    'SLEEP_RANGE_AFTER_REGISTRATION',
+    'SLEEP_RANGE_BETWEEN_REVERSE_SWAP',
+    'SLEEP_RANGE_BEFORE_SEND_TO_CEX',
+]
+# Delays of settings.py, multiplied by the sleep scale but not lower than the floor, so polls do not spin
+DELAY_SETTINGS = {
+    'FUNDING_WITHDRAW_INTERVAL': 0,
+    'DEPOSIT_POLL_MIN_DELAY': 0.5,
+    'DEPOSIT_POLL_MAX_DELAY': 2,
+}
+
+
+@dataclass
+class BenchmarkOptions:
+    stand_in_url: str
+    work_dir: str
+    slots: int = 50
+    sleep_scale: float = 0
+    settings_overrides: dict = field(default_factory=dict)
+
+
+def apply_settings(settings, options: BenchmarkOptions):
+    """
+    Points the bot at the stand-in, scales down its sleeps and turns off files and ports of the real run
+    :param settings: settings module, patched before the rest of the bot is imported
+    :param options:
+    :return:
+    """
+    settings.STAND_IN_URL = options.stand_in_url
+    settings.RESUME_RUN = False
+    settings.METRICS_PORT = None
+    settings.METRICS_DUMP_PATH = None
+    settings.ADAPTIVE_CONCURRENCY = False
+    for name in SLEEP_SETTINGS:
+        setattr(settings, name, [int(round(value * options.sleep_scale)) for value in getattr(settings, name)])
+    for name, floor in DELAY_SETTINGS.items():
+        setattr(settings, name, max(getattr(settings, name) * options.sleep_scale, floor))
+    for name, value in options.settings_overrides.items():
+        setattr(settings, name, value)
+
+
+def get_rpc_requests(counters: dict[tuple, float], accounts: int) -> dict:
+    by_endpoint, by_status = {}, {}
+    for labels, value in counters.items():
+        labels = dict(labels)
+        by_endpoint[labels['endpoint']] = by_endpoint.get(labels['endpoint'], 0) + value
+        by_status[str(labels['status'])] = by_status.get(str(labels['status']), 0) + value
+
+    total = sum(by_endpoint.values())
+    return {
+        'total': int(total),
+        'per_account': round(total / max(accounts, 1), 2),
+        'per_account_by_endpoint': {
+            endpoint: round(value / max(accounts, 1), 2) for endpoint, value in sorted(by_endpoint.items())
+        },
+        'by_status': {status: int(value) for status, value in sorted(by_status.items())}
+    }
+
+
+def run_size(accounts: int, options: BenchmarkOptions) -> dict:
+    """
+    Entry point of the benchmark process: runs the worker over generated accounts against the stand-in.
+    Fresh process for each size keeps peak memory and process-wide services of the sizes apart
+    :param accounts: number of generated accounts
+    :param options:
+    :return: measurements of the run
+    """
+    # Files of the run (results, journal, pool index, logs) go to the work dir instead of the real ones
+    shutil.rmtree(options.work_dir, ignore_errors=True)
+    os.makedirs(os.path.join(options.work_dir, 'files'))
+    os.chdir(options.work_dir)
+
+    import settings
+    apply_settings(settings, options)
+
+    from core.metrics import METRICS
+    from stand_in.server import generate_accounts
+    from utils.log import shutdown_logging
+    from worker import Worker
+
+    try:
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    except Exception:
+        pass
+
+    accounts_data = generate_accounts(accounts)
+    worker = Worker(options.slots)
+    loop_lag = LoopLagMonitor()
+
+    async def run():
+        loop_lag.start()
+        try:
+            await worker.start(accounts_data)
+        finally:
+            await loop_lag.stop()
+
+    start_time = time.monotonic()
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_logging()
+    wall_time = time.monotonic() - start_time
+
+    finished = worker.succeeded + worker.failed
+    phases = {
+        dict(labels)['phase']: {
+            'count': histogram.count,
+            'mean_seconds': round(histogram.sum / histogram.count, 4) if histogram.count else 0
+        }
+        for labels, histogram in sorted(METRICS.histograms.get('liquidswap_phase_duration_seconds', {}).items())
+    }
+    return {
+        'accounts': accounts,
+        'succeeded': worker.succeeded,
+        'failed': worker.failed,
+        'wall_time_seconds': round(wall_time, 2),
+        'accounts_per_hour': round(finished * 3600 / max(wall_time, 1e-9), 1),
+        'succeeded_per_hour': round(worker.succeeded * 3600 / max(wall_time, 1e-9), 1),
+        'rpc_requests': get_rpc_requests(METRICS.counters.get('liquidswap_rpc_requests_total', {}), accounts),
+        'phases': phases,
+        'peak_rss_mb': get_peak_rss_mb(),
+        'event_loop_lag': loop_lag.stats()
+    }
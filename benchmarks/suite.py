@@ -0,0 +1,163 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+
+from benchmarks.process import BenchmarkOptions, run_size
+from stand_in.server import StandIn
+from utils.log import Logger
+
+
+def get_git_revision() -> str | None:
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, timeout=10
+        )
+        return output.stdout.strip()
+    except Exception:
+        return None
+
+
+class BenchmarkSuite(Logger):
+    """
+    Runs the bot over generated accounts for each size, every size gets a fresh stand-in and a fresh process
+    """
+    def __init__(
+            self,
+            sizes: list[int],
+            output_dir: str,
+            port: int = 18080,
+            slots: int = 50,
+            sleep_scale: float = 0,
+            stand_in_options: dict | None = None,
+            settings_overrides: dict | None = None
+    ):
+        """
+        :param sizes: numbers of accounts
+        :param output_dir: report and work files dir
+        :param port: port of the stand-in
+        :param slots: accounts run concurrently
+        :param sleep_scale: multiplier of the sleeps of settings.py
+        :param stand_in_options: StandIn arguments (faults, commit_delay, withdraw_delay)
+        :param settings_overrides: settings.py values of the benchmarked bot
+        """
+        Logger.__init__(self)
+        self.sizes = sizes
+        self.output_dir = output_dir
+        self.port = port
+        self.slots = slots
+        self.sleep_scale = sleep_scale
+        self.stand_in_options = stand_in_options or {}
+        self.settings_overrides = settings_overrides or {}
+
+    def get_config(self) -> dict:
+        return {
+            'slots': self.slots,
+            'sleep_scale': self.sleep_scale,
+            'stand_in': {
+                name: asdict(value) if name == 'faults' else value
+                for name, value in self.stand_in_options.items()
+            },
+            'settings_overrides': self.settings_overrides
+        }
+
+    async def run_size(self, size: int) -> dict:
+        stand_in = StandIn(port=self.port, **self.stand_in_options)
+        options = BenchmarkOptions(
+            stand_in_url=stand_in.url,
+            work_dir=os.path.abspath(os.path.join(self.output_dir, 'work', f'accounts_{size}')),
+            slots=self.slots,
+            sleep_scale=self.sleep_scale,
+            settings_overrides=self.settings_overrides
+        )
+        await stand_in.start()
+        try:
+            # Spawned, not forked: the process must not inherit the running loop and imported settings
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result = await asyncio.get_running_loop().run_in_executor(executor, run_size, size, options)
+        finally:
+            await stand_in.stop()
+
+        # Stand-in sees requests to the node, okx and dashboard api by route
+        stand_in_stats = stand_in.stats()
+        result['stand_in'] = {
+            **stand_in_stats,
+            'requests_per_account': round(stand_in_stats['faults']['requests'] / max(size, 1), 2),
+            'requests_per_account_by_route': {
+                route: round(count / max(size, 1), 2) for route, count in stand_in_stats['faults']['routes'].items()
+            }
+        }
+        return result
+
+    async def run(self) -> dict:
+        report = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': get_git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': self.get_config(),
+            'results': []
+        }
+        for size in self.sizes:
+            self.logger_msg(f'Benchmark of {size} accounts is started')
+            result = await self.run_size(size)
+            report['results'].append(result)
+            self.logger_msg(
+                f'Benchmark of {size} accounts: {result["wall_time_seconds"]}s, '
+                f'{result["accounts_per_hour"]} accounts/hour ({result["failed"]} failed), '
+                f'{result["rpc_requests"]["per_account"]} rpc requests/account, '
+                f'peak rss {result["peak_rss_mb"]} MB, loop lag p99 {result["event_loop_lag"]["p99_ms"]} ms',
+                'success'
+            )
+
+        return report
+
+
+def save_report(report: dict, output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    started_at = datetime.fromisoformat(report['started_at']).strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(output_dir, f'benchmark_{started_at}_{report["revision"] or "unknown"}.json')
+    with open(path, mode='w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    return path
+
+
+def compare_reports(report: dict, baseline: dict) -> list[str]:
+    """
+    Changes of the main measurements against the baseline report, for sizes present in both
+    :param report:
+    :param baseline:
+    :return: one line per size
+    """
+    baseline_results = {result['accounts']: result for result in baseline['results']}
+    metrics = {
+        'accounts/hour': lambda result: result['accounts_per_hour'],
+        'succeeded/hour': lambda result: result.get('succeeded_per_hour'),
+        'rpc requests/account': lambda result: result['rpc_requests']['per_account'],
+        'peak rss MB': lambda result: result['peak_rss_mb'],
+        'loop lag p99 ms': lambda result: result['event_loop_lag']['p99_ms'],
+    }
+
+    lines = []
+    for result in report['results']:
+        baseline_result = baseline_results.get(result['accounts'])
+        if baseline_result is None:
+            continue
+
+        changes = []
+        for name, get_value in metrics.items():
+            value, baseline_value = get_value(result), get_value(baseline_result)
+            if value is None or baseline_value is None:
+                continue
+            change = f'{(value - baseline_value) / baseline_value * 100:+.1f}%' if baseline_value else 'n/a'
+            changes.append(f'{name}: {baseline_value} -> {value} ({change})')
+
+        lines.append(f'{result["accounts"]} accounts vs {baseline.get("revision")}: ' + ', '.join(changes))
+
+    return lines
@@ -1,6 +1,5 @@
 import random
 import time
-from asyncio import sleep
 
 from aptos_sdk.account import Account
 from aptos_sdk.account_address import AccountAddress
@@ -11,8 +10,11 @@ from aptos_sdk.type_tag import TypeTag, StructTag
 from core.contracts import TokenBase
 from core import enums
 from core.client import AptosCustomRestClient, CustomClient
-from core.config import RPC_URLS
+from core.config import TOKENS_INFO
+from core.journal import AccountJournal
+from core.metrics import timed
 from core.models import TransactionSimulationResult, TransactionReceipt
+from core.receipts import RECEIPT_WATCHER
 from modules.liquidswap.decorators import retry
 from modules.liquidswap.exceptions import (
     TransactionSimulationError, TransactionSubmitError, TransactionFailedError, TransactionTimeoutError, TokenInfoError
@@ -26,15 +28,19 @@ class ModuleBase(Logger):
             self,
             account: Account,
             cex_address: str,
-            base_url: str = random.choice(RPC_URLS),
-            proxies: dict = None
+            base_url: str | None = None,
+            proxies: dict = None,
+            journal: AccountJournal | None = None
     ):
         Logger.__init__(
             self, account_address=account.account_address, proxy=proxies.get('http://') if proxies else None)
 
 
-        self.base_url = base_url
-        self.aptos_client = AptosCustomRestClient(base_url=base_url, proxies=proxies)
+        self.aptos_client = AptosCustomRestClient(
+            base_url=base_url,
+            proxies=proxies,
+            pin_key=str(account.address())
+        )
         self.custom_client = CustomClient(proxies=proxies)
         self.account = account
         self.cex_address = cex_address.strip()
@@ -43,15 +49,30 @@ class ModuleBase(Logger):
         self.coin_x: TokenBase | None = None
         self.coin_y: TokenBase | None = None
 
+        self.journal = journal
+        self.current_step: str | None = None
+        self.current_step_data: dict = {}
+        self.tx_hashes: list[str] = []
+
+    @property
+    def base_url(self) -> str:
+        return self.aptos_client.base_url
+
+    @timed('async_init')
     async def async_init(self):
-        self.initial_balance_x_wei = await self.get_wallet_token_balance(
-            wallet_address=self.account.address(),
-            token_address=self.coin_x.contract_address
-        )
-        self.initial_balance_y_wei = await self.get_wallet_token_balance(
-            wallet_address=self.account.address(),
-            token_address=self.coin_y.contract_address
-        )
+        balances = await self.get_wallet_balances(wallet_address=self.account.address())
+        if balances is not None:
+            self.initial_balance_x_wei = balances.get(self.coin_x.contract_address, 0)
+            self.initial_balance_y_wei = balances.get(self.coin_y.contract_address, 0)
+        else:
+            self.initial_balance_x_wei = await self.get_wallet_token_balance(
+                wallet_address=self.account.address(),
+                token_address=self.coin_x.contract_address
+            )
+            self.initial_balance_y_wei = await self.get_wallet_token_balance(
+                wallet_address=self.account.address(),
+                token_address=self.coin_y.contract_address
+            )
 
         self.token_x_decimals = await self.get_token_decimals(token_obj=self.coin_x)
         self.token_y_decimals = await self.get_token_decimals(token_obj=self.coin_y)
@@ -96,21 +117,47 @@ class ModuleBase(Logger):
             self.logger_msg(str(e), 'error')
             return 0
 
+    async def get_wallet_balances(
+            self,
+            wallet_address: AccountAddress,
+    ) -> dict[str, int] | None:
+        """
+        Gets wallet balances of every token in TOKENS_INFO by one request
+        :param wallet_address:
+        :return: balance by token contract address or None on error
+        """
+        try:
+            coin_stores = await self.aptos_client.account_coin_stores(
+                wallet_address,
+                list(TOKENS_INFO.values())
+            )
+        except Exception as e:
+            self.logger_msg(str(e), 'error')
+            return None
+
+        return {
+            token_address: int(coin_store["data"]["coin"]["value"]) if coin_store else 0
+            for token_address, coin_store in coin_stores.items()
+        }
+
     async def get_token_reserve(
             self,
             resource_address: AccountAddress,
-            payload: str
+            payload: str,
+            use_cache: bool = True
     ) -> dict | None:
         """
         Gets token reserve
         :param resource_address:
         :param payload:
+        :param use_cache: False to read reserves from the node, not from the resource cache
         :return:
         """
         try:
             data = await self.aptos_client.account_resource(
                 resource_address,
-                payload
+                payload,
+                use_cache=use_cache
             )
             return data
 
@@ -136,6 +183,7 @@ class ModuleBase(Logger):
         )
         return token_info["data"]
 
+    @timed('submit')
     async def submit_bcs_transaction(self, signed_transaction):
         try:
             tx_hash = await self.aptos_client.submit_bcs_transaction(signed_transaction)
@@ -144,47 +192,32 @@ class ModuleBase(Logger):
             self.logger_msg(f"ApiError: {e}", 'error')
             return None
 
-    async def txn_pending_status(self, txn_hash: str) -> bool:
-        """
-        Checks if transaction is pending
-        :param txn_hash:
-        :return:
-        """
-        response = await self.aptos_client.client.get(f"{self.base_url}/transactions/by_hash/{txn_hash}")
-
-        if response.status_code == 404:
-            return True
-
-        elif response.status_code >= 400:
-            raise Exception(f"Error getting transaction due RPC error: {response.json()}")
-
-        return response.json()["type"] == "pending_transaction"
-
+    @timed('wait_for_receipt')
     async def wait_for_receipt(self, txn_hash: str) -> TransactionReceipt:
         """
         Waits for transaction receipt
         :param txn_hash:
         :return:
         """
-        start_time = time.time()
-        while await self.txn_pending_status(txn_hash=txn_hash):
-            if time.time() - start_time > self.aptos_client.client_config.transaction_wait_in_seconds:
-
-                return TransactionReceipt(
-                    status=enums.TransactionStatus.TIME_OUT,
-                    vm_status=None
-                )
-
-            await sleep(1)
+        txn_data = await RECEIPT_WATCHER.wait(
+            client=self.aptos_client.client,
+            base_url=self.base_url,
+            txn_hash=txn_hash,
+            timeout=self.aptos_client.client_config.transaction_wait_in_seconds
+        )
+        if txn_data is None:
+            # Transaction may never be committed, local sequence number can be ahead of the chain
+            self.aptos_client.resync_sequence_number(self.account.address())
+            return TransactionReceipt(
+                status=enums.TransactionStatus.TIME_OUT,
+                vm_status=None
+            )
 
-        response = await self.aptos_client.client.get(f"{self.base_url}/transactions/by_hash/{txn_hash}")
-        vm_status = response.json().get("vm_status")
-        if vm_status is None:
-            await sleep(5)
-            response = await self.aptos_client.client.get(f"{self.base_url}/transactions/by_hash/{txn_hash}")
-            vm_status = response.json().get("vm_status")
+        # Own transaction landed, balances cached before it are stale
+        self.aptos_client.invalidate_account(self.account.address())
 
-        if response.json().get("success") is True:
+        vm_status = txn_data.get("vm_status")
+        if txn_data.get("success") is True:
             receipt = TransactionReceipt(
                 status=enums.TransactionStatus.SUCCESS,
                 vm_status=vm_status
@@ -197,6 +230,82 @@ class ModuleBase(Logger):
 
         return receipt
 
+    def get_step(self, step: str) -> dict | None:
+        """
+        Gets journal record of the step from previous run
+        :param step:
+        :return:
+        """
+        if self.journal is None:
+            return None
+
+        return self.journal.get(step)
+
+    def record_step(self, step: str, status: enums.JournalStepStatus = enums.JournalStepStatus.DONE, **data):
+        if self.journal is not None:
+            self.journal.record(step, status, **data)
+
+    def begin_step(self, step: str, **data):
+        """
+        Starts journaled step, transactions submitted until finish_step are recorded to it
+        :param step:
+        :param data: step data needed to resume it, e.g. chosen token
+        :return:
+        """
+        self.current_step = step
+        self.current_step_data = data
+        self.record_step(step, enums.JournalStepStatus.PENDING, **data)
+
+    def finish_step(self, **data):
+        if self.current_step is None:
+            return
+
+        self.record_step(self.current_step, **{**self.current_step_data, **data})
+        self.current_step = None
+        self.current_step_data = {}
+
+    def on_transaction_submitted(self, tx_hash: str):
+        """
+        Records submitted transaction hash before waiting for receipt, so resumed run does not send it twice
+        :param tx_hash:
+        :return:
+        """
+        self.tx_hashes.append(tx_hash)
+        if self.current_step is not None:
+            self.record_step(
+                self.current_step,
+                enums.JournalStepStatus.SUBMITTED,
+                **{**self.current_step_data, "tx_hash": tx_hash}
+            )
+
+    async def resume_step(self, step: str) -> bool:
+        """
+        Checks the step of previous run, waits for the transaction submitted before crash
+        :param step:
+        :return: True if the step is done and must not be executed again
+        """
+        record = self.get_step(step)
+        if record is None:
+            return False
+
+        if record["status"] == enums.JournalStepStatus.DONE:
+            self.logger_msg(f'Step {step} is done in previous run, skipped', 'debug')
+            return True
+
+        tx_hash = record.get("tx_hash")
+        if record["status"] == enums.JournalStepStatus.SUBMITTED and tx_hash:
+            self.logger_msg(f'Step {step} was interrupted, waiting for submitted txn: {tx_hash}', 'warning')
+            txn_receipt = await self.wait_for_receipt(tx_hash)
+            if txn_receipt.status == enums.TransactionStatus.SUCCESS:
+                data = {
+                    key: value for key, value in record.items()
+                    if key not in ("ts", "account", "step", "status")
+                }
+                self.record_step(step, **data)
+                return True
+
+        return False
+
     async def is_token_registered_for_address(
             self,
             wallet_address: AccountAddress,
@@ -238,11 +347,16 @@ class ModuleBase(Logger):
         )
         txn_info_message = f"Coin register {token_obj.symbol.upper()} for wallet"
 
-        txn_hash = await self.simulate_and_send_transfer_type_transaction(
-            account=sender_account,
-            txn_payload=payload,
-            txn_info_message=txn_info_message
-        )
+        # Register is checked before every swap, its hash must not be taken for the swap step one
+        step, self.current_step = self.current_step, None
+        try:
+            txn_hash = await self.simulate_and_send_transfer_type_transaction(
+                account=sender_account,
+                txn_payload=payload,
+                txn_info_message=txn_info_message
+            )
+        finally:
+            self.current_step = step
 
         return txn_hash
 
@@ -272,6 +386,7 @@ class ModuleBase(Logger):
         )
         return raw_transaction
 
+    @timed('simulate')
     async def estimate_transaction(
             self,
             raw_transaction: RawTransaction,
@@ -382,7 +497,8 @@ class ModuleBase(Logger):
         simulation_status = await self.prebuild_payload_and_estimate_transaction(
             account=account,
             txn_payload=txn_payload,
-            gas_limit=self.aptos_client.client_config.max_gas_amount,
+            # Limit left by the previous transaction is its gas used with a margin, e.g. register after swap needs more
+            gas_limit=random.randint(*GAS_LIMIT),
             gas_price=self.aptos_client.client_config.gas_unit_price
         )
 
@@ -411,6 +527,7 @@ class ModuleBase(Logger):
             err_msg = f"Transaction submission failed"
             raise TransactionSubmitError(err_msg)
 
+        self.on_transaction_submitted(tx_hash)
         self.logger_msg(
             f"Txn sent. Waiting for receipt (Timeout in {self.aptos_client.client_config.transaction_wait_in_seconds}s). "
             f"https://explorer.aptoslabs.com/txn/{tx_hash}",
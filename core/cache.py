@@ -0,0 +1,154 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from aptos_sdk.async_client import ResourceNotFound
+
+from settings import POOL_RESERVE_CACHE_TTL, COIN_STORE_CACHE_TTL
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float | None
+    not_found: bool = False
+
+    def is_alive(self, now: float) -> bool:
+        return self.expires_at is None or self.expires_at > now
+
+
+class ResourceCache:
+    """
+    Process-wide cache of account resources with per resource type ttl and
+    de-duplication of concurrent requests for the same resource
+    """
+    def __init__(
+            self,
+            pool_reserve_ttl: float = POOL_RESERVE_CACHE_TTL,
+            coin_store_ttl: float = COIN_STORE_CACHE_TTL
+    ):
+        self.pool_reserve_ttl = pool_reserve_ttl
+        self.coin_store_ttl = coin_store_ttl
+        self.entries: dict[str, dict[str, CacheEntry]] = {}
+        self.in_flight: dict[tuple[str, str, int], asyncio.Future] = {}
+        self.generations: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_ttl(self, resource_type: str) -> tuple[bool, float | None]:
+        """
+        Gets ttl for resource type
+        :param resource_type:
+        :return: (is cacheable, ttl in seconds or None for immutable resources)
+        """
+        if resource_type.startswith('0x1::coin::CoinInfo<'):
+            return True, None
+        if resource_type.startswith('0x1::coin::CoinStore<'):
+            return True, self.coin_store_ttl
+        if '::liquidity_pool::LiquidityPool<' in resource_type:
+            return True, self.pool_reserve_ttl
+
+        return False, None
+
+    async def get_or_fetch(
+            self,
+            account_address: str,
+            resource_type: str,
+            fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """
+        Gets resource from the cache or fetches it once for all concurrent callers
+        :param account_address:
+        :param resource_type:
+        :param fetch:
+        :return:
+        """
+        cacheable, ttl = self.get_ttl(resource_type)
+        if not cacheable:
+            return await fetch()
+
+        entry = self.entries.get(account_address, {}).get(resource_type)
+        if entry is not None and entry.is_alive(time.monotonic()):
+            self.hits += 1
+            if entry.not_found:
+                raise entry.value
+            return entry.value
+
+        # Requests started before the last invalidation are not joined, their response can be stale
+        key = (account_address, resource_type, self.generations.get(account_address, 0))
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            future = asyncio.ensure_future(fetch())
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self._store(key, ttl, done))
+
+        # Shield the shared request, so a cancelled caller does not cancel it for the others
+        return await asyncio.shield(future)
+
+    def _store(self, key: tuple[str, str, int], ttl: float | None, future: asyncio.Future):
+        self.in_flight.pop(key, None)
+        if future.cancelled():
+            return
+
+        account_address, resource_type, generation = key
+        # Resource was invalidated while the request was in flight, the response can be stale
+        if self.generations.get(account_address, 0) != generation:
+            return
+
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        exception = future.exception()
+        if exception is None:
+            entry = CacheEntry(value=future.result(), expires_at=expires_at)
+        elif isinstance(exception, ResourceNotFound):
+            entry = CacheEntry(value=exception, expires_at=expires_at, not_found=True)
+        else:
+            return
+
+        self.entries.setdefault(account_address, {})[resource_type] = entry
+
+    def put(self, account_address: str, resource_type: str, value: dict | None):
+        """
+        Stores resource fetched by other means, e.g. by the bulk resources endpoint
+        :param account_address:
+        :param resource_type:
+        :param value: resource or None if account does not have it
+        :return:
+        """
+        cacheable, ttl = self.get_ttl(resource_type)
+        if not cacheable:
+            return
+
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        if value is None:
+            entry = CacheEntry(
+                value=ResourceNotFound(resource_type, resource_type), expires_at=expires_at, not_found=True
+            )
+        else:
+            entry = CacheEntry(value=value, expires_at=expires_at)
+
+        self.entries.setdefault(account_address, {})[resource_type] = entry
+
+    def invalidate_account(self, account_address: str):
+        """
+        Drops cached resources of the account, called after its own transactions
+        :param account_address:
+        :return:
+        """
+        self.generations[account_address] = self.generations.get(account_address, 0) + 1
+        self.entries.pop(account_address, None)
+
+    def stats(self) -> dict:
+        return {
+            'entries': sum(len(resources) for resources in self.entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced
+        }
+
+
+RESOURCE_CACHE = ResourceCache()
@@ -1,48 +1,232 @@
+import time
+from typing import Any
+
 import httpx
 from fake_useragent import UserAgent
-from aptos_sdk.async_client import RestClient, ClientConfig
-from aptos_sdk.metadata import Metadata
+from aptos_sdk.account import Account
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import RestClient, ClientConfig, AccountNotFound, ApiError
+from aptos_sdk.transactions import SignedTransaction
+
+from core.cache import RESOURCE_CACHE
+from core.metrics import METRICS
+from core.rate_limit import RATE_LIMITERS
+from core.rpc_router import RPC_ROUTER
+from core.sequence import SEQUENCE_NUMBERS
+from core.transport import TRANSPORT_REGISTRY
+
+
+class RoutedHttpClient:
+    """
+    Facade of the shared node clients, sends request by the client of its node and records the result to node health
+    """
+    def __init__(self, proxies: dict = None, http2: bool = False, base_url: str | None = None):
+        self.proxies = proxies
+        self.http2 = http2
+        self.base_url = base_url
+        self.headers: dict[str, str] = {}
+
+    @staticmethod
+    def get_endpoint_label(url: str) -> str:
+        endpoint = RPC_ROUTER.get_endpoint(url)
+        return endpoint.url if endpoint is not None else httpx.URL(url).host
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        endpoint = RPC_ROUTER.get_endpoint(url)
+        # Shared keep-alive client for this node and proxy, closed by the registry on shutdown
+        return TRANSPORT_REGISTRY.get_client(
+            base_url=endpoint.url if endpoint is not None else self.base_url,
+            proxies=self.proxies,
+            http2=self.http2
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.headers:
+            kwargs['headers'] = {**self.headers, **(kwargs.get('headers') or {})}
+
+        await RATE_LIMITERS.acquire(url, TRANSPORT_REGISTRY.get_proxy_key(self.proxies))
+        endpoint_label = self.get_endpoint_label(url)
+        start_time = time.monotonic()
+        try:
+            response = await self.get_client(url).request(method, url, **kwargs)
+        except httpx.TransportError:
+            RPC_ROUTER.record(url, None, None)
+            METRICS.inc('liquidswap_rpc_requests_total', endpoint=endpoint_label, status='transport_error')
+            raise
+
+        # Long-poll request is held by the node until transaction is committed, it is not the node latency
+        latency = None if '/wait_by_hash/' in url else time.monotonic() - start_time
+        RPC_ROUTER.record(url, latency, response.status_code)
+        METRICS.inc('liquidswap_rpc_requests_total', endpoint=endpoint_label, status=response.status_code)
+        if latency is not None:
+            METRICS.observe('liquidswap_rpc_request_duration_seconds', latency, endpoint=endpoint_label)
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
 
 
 class AptosCustomRestClient(RestClient):
     def __init__(
             self,
-            base_url: str,
+            base_url: str | None = None,
             proxies: dict = None,
-            client_config: ClientConfig = ClientConfig()
-
+            client_config: ClientConfig = ClientConfig(),
+            pin_key: str | None = None
     ):
-        self.base_url = base_url
-        # Default limits
-        limits = httpx.Limits()
-        # Default timeouts but do not set a pool timeout, since the idea is that jobs will wait as
-        # long as progress is being made.
-        timeout = httpx.Timeout(60.0, pool=None)
-        # Default headers
-        headers = {Metadata.APTOS_HEADER: Metadata.get_aptos_header_val()}
-        self.client = httpx.AsyncClient(
-            http2=client_config.http2,
-            limits=limits,
-            timeout=timeout,
-            headers=headers,
-            proxies=proxies
-        )
+        """
+        :param base_url: fixed node url, requests are balanced over RPC_URLS if None
+        :param proxies:
+        :param client_config:
+        :param pin_key: account address, its reads go to the node that accepted its last transaction
+        """
+        self.fixed_base_url = base_url.rstrip('/') if base_url else None
+        self.pin_key = pin_key
+        self.client = RoutedHttpClient(proxies=proxies, http2=client_config.http2, base_url=self.fixed_base_url)
         self.client_config = client_config
         self._chain_id = None
         if client_config.api_key:
             self.client.headers["Authorization"] = f"Bearer {client_config.api_key}"
 
+    @property
+    def base_url(self) -> str:
+        # Read by every request of the sdk, so each request is routed separately
+        if self.fixed_base_url is not None:
+            return self.fixed_base_url
+
+        return RPC_ROUTER.choose(self.pin_key)
+
+    def pin_node(self):
+        """
+        Pins the following requests of the account to one node before its transaction is submitted,
+        so its receipt, sequence number and balances are read from the node that accepted it
+        :return:
+        """
+        if self.pin_key is not None and self.fixed_base_url is None:
+            RPC_ROUTER.pin(self.pin_key, RPC_ROUTER.choose(self.pin_key))
+
+    async def close(self):
+        # Transport is shared between accounts, see TransportRegistry.aclose
+        pass
+
+    async def account_resource(
+            self,
+            account_address: AccountAddress,
+            resource_type: str,
+            ledger_version: int | None = None,
+            use_cache: bool = True
+    ) -> dict[str, Any]:
+        if ledger_version is not None:
+            return await super().account_resource(account_address, resource_type, ledger_version)
+
+        if not use_cache:
+            resource = await super().account_resource(account_address, resource_type)
+            RESOURCE_CACHE.put(str(account_address), resource_type, resource)
+            return resource
+
+        return await RESOURCE_CACHE.get_or_fetch(
+            str(account_address),
+            resource_type,
+            lambda: super(AptosCustomRestClient, self).account_resource(account_address, resource_type)
+        )
+
+    async def account_coin_stores(
+            self,
+            account_address: AccountAddress,
+            token_addresses: list[str],
+            use_cache: bool = True
+    ) -> dict[str, dict | None]:
+        """
+        Gets CoinStore resources of many tokens by one bulk resources request and puts them into the cache
+        :param account_address:
+        :param token_addresses:
+        :param use_cache: False to not put the resources into the cache, e.g. they are read long before use
+        :return: CoinStore resource by token address, None if token is not registered
+        """
+        try:
+            resources = await self.account_resources(account_address)
+        except AccountNotFound:
+            resources = []
+
+        resources_by_type = {resource['type']: resource for resource in resources}
+        coin_stores = {}
+        for token_address in token_addresses:
+            resource_type = f"0x1::coin::CoinStore<{token_address}>"
+            coin_store = resources_by_type.get(resource_type)
+            if use_cache:
+                RESOURCE_CACHE.put(str(account_address), resource_type, coin_store)
+            coin_stores[token_address] = coin_store
+
+        return coin_stores
+
+    @staticmethod
+    def invalidate_account(account_address: AccountAddress):
+        RESOURCE_CACHE.invalidate_account(str(account_address))
+
+    async def account_sequence_number(
+            self,
+            account_address: AccountAddress,
+            ledger_version: int | None = None
+    ) -> int:
+        if ledger_version is not None:
+            return await super().account_sequence_number(account_address, ledger_version)
+
+        return await SEQUENCE_NUMBERS.get(
+            str(account_address),
+            lambda: super(AptosCustomRestClient, self).account_sequence_number(account_address)
+        )
+
+    @staticmethod
+    def resync_sequence_number(account_address: AccountAddress):
+        SEQUENCE_NUMBERS.resync(str(account_address))
+
+    async def simulate_bcs_transaction(
+            self,
+            signed_transaction: SignedTransaction,
+            estimate_gas_usage: bool = False,
+    ) -> dict[str, Any]:
+        txn_data = await super().simulate_bcs_transaction(signed_transaction, estimate_gas_usage)
+        if txn_data and SEQUENCE_NUMBERS.is_sequence_number_error(txn_data[0].get("vm_status")):
+            self.resync_sequence_number(signed_transaction.transaction.sender)
+
+        return txn_data
+
+    async def submit_bcs_transaction(self, signed_transaction: SignedTransaction) -> str:
+        sender = signed_transaction.transaction.sender
+        self.pin_node()
+        try:
+            tx_hash = await super().submit_bcs_transaction(signed_transaction)
+        except ApiError as e:
+            if SEQUENCE_NUMBERS.is_sequence_number_error(str(e)):
+                self.resync_sequence_number(sender)
+            raise
+
+        SEQUENCE_NUMBERS.increment(str(sender), signed_transaction.transaction.sequence_number)
+        self.invalidate_account(sender)
+        return tx_hash
+
+    async def submit_transaction(self, sender: Account, payload: dict[str, Any]) -> str:
+        self.pin_node()
+        try:
+            tx_hash = await super().submit_transaction(sender, payload)
+        except ApiError as e:
+            if SEQUENCE_NUMBERS.is_sequence_number_error(str(e)):
+                self.resync_sequence_number(sender.address())
+            raise
+
+        SEQUENCE_NUMBERS.increment(str(sender.address()))
+        self.invalidate_account(sender.address())
+        return tx_hash
+
 
 class CustomClient:
     def __init__(self, proxies: dict = None):
-        limits = httpx.Limits()
-        timeout = httpx.Timeout(60.0, pool=None)
         self.user_agent = UserAgent(platforms=["pc"])
-        self.client = httpx.AsyncClient(
-            limits=limits,
-            timeout=timeout,
-            proxies=proxies
-        )
+        self.proxy = TRANSPORT_REGISTRY.get_proxy_key(proxies)
+        self.client = TRANSPORT_REGISTRY.get_client(proxies=proxies)
 
     def get_random_user_agent(self):
         return self.user_agent.random
@@ -50,12 +234,15 @@ class CustomClient:
     async def get(self, url, **kwargs):
         headers = kwargs.pop('headers', {})
         headers['User-Agent'] = self.get_random_user_agent()
+        await RATE_LIMITERS.acquire(url, self.proxy)
         return await self.client.get(url, headers=headers, **kwargs)
 
     async def post(self, url, data=None, **kwargs):
         headers = kwargs.pop('headers', {})
         headers['User-Agent'] = self.get_random_user_agent()
+        await RATE_LIMITERS.acquire(url, self.proxy)
         return await self.client.post(url, data=data, headers=headers, **kwargs)
 
     async def close(self):
-        await self.client.aclose()
+        # Transport is shared between accounts, see TransportRegistry.aclose
+        pass
@@ -0,0 +1,123 @@
+import asyncio
+
+from core.rpc_router import RPC_ROUTER
+from utils.log import Logger
+
+# Share of failed requests since the last adjustment that cuts the limit, single node hiccup does not
+ERROR_RATE_TO_DECREASE = 0.05
+
+
+class AdaptiveConcurrencyLimiter(Logger):
+    """
+    AIMD limiter of concurrently running accounts: limit grows by one while rpc nodes stay healthy
+    and the limit is used up, and is cut by the decrease factor on 429, error and timeout signals
+    """
+    def __init__(
+            self,
+            initial_limit: int,
+            min_limit: int,
+            max_limit: int,
+            latency_target: float,
+            decrease_factor: float = 0.5
+    ):
+        Logger.__init__(self)
+        self.min_limit = max(int(min_limit), 1)
+        self.max_limit = max(int(max_limit), self.min_limit)
+        self.limit = float(min(max(int(initial_limit), self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_use = 0
+        self.saturated = False
+        self.increases = 0
+        self.decreases = 0
+        self.last_rpc_totals = RPC_ROUTER.get_totals()
+        self.condition: asyncio.Condition | None = None
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        return self.condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_use < self.current_limit)
+            self.in_use += 1
+            if self.in_use >= self.current_limit:
+                self.saturated = True
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_use -= 1
+            condition.notify()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+
+    def get_congestion(self) -> str | None:
+        """
+        Compares rpc totals with the previous adjustment
+        :return: congestion signal or None if nodes are healthy
+        """
+        totals = RPC_ROUTER.get_totals()
+        requests = totals['requests'] - self.last_rpc_totals['requests']
+        errors = totals['errors'] - self.last_rpc_totals['errors']
+        throttled = totals['throttled'] - self.last_rpc_totals['throttled']
+        self.last_rpc_totals = totals
+
+        if throttled:
+            return f'{throttled}/{requests} requests rate limited'
+        if requests and errors / requests >= ERROR_RATE_TO_DECREASE:
+            return f'{errors}/{requests} requests failed or timed out'
+        if totals['latency'] is not None and totals['latency'] > self.latency_target:
+            return f'rpc latency {totals["latency"]:.2f} second'
+
+        return None
+
+    async def adjust(self):
+        old_limit = self.current_limit
+        congestion = self.get_congestion()
+        if congestion is not None:
+            self.limit = max(self.limit * self.decrease_factor, self.min_limit)
+            self.decreases += 1
+        elif self.saturated:
+            # Grows only when the limit was actually reached, idle limit says nothing about the nodes
+            self.limit = min(self.limit + 1, self.max_limit)
+            self.increases += 1
+        self.saturated = self.in_use >= self.current_limit
+
+        if self.current_limit == old_limit:
+            return
+
+        if self.current_limit > old_limit:
+            condition = self._get_condition()
+            async with condition:
+                condition.notify(self.current_limit - old_limit)
+            self.logger_msg(f'Concurrency limit raised: {old_limit} -> {self.current_limit}', 'debug')
+        else:
+            self.logger_msg(f'Concurrency limit cut: {old_limit} -> {self.current_limit}, {congestion}', 'warning')
+
+    async def run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.adjust()
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.current_limit,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'in_use': self.in_use,
+            'increases': self.increases,
+            'decreases': self.decreases
+        }
@@ -1,8 +1,12 @@
 import asyncio
-from settings import SLEEP_RANGE_BETWEEN_ACCOUNTS, SEMAPHORE_LIMIT, NUMBER_OF_RETRIES
+from settings import (
+    SLEEP_RANGE_BETWEEN_ACCOUNTS, SEMAPHORE_LIMIT, NUMBER_OF_RETRIES, CONCURRENCY_LIMIT_RANGE, STAND_IN_URL
+)
 
 SEMAPHORE_LIMIT = max(int(SEMAPHORE_LIMIT), 1)
 
+CONCURRENCY_LIMIT_RANGE = sorted(([max(int(x), 1) for x in CONCURRENCY_LIMIT_RANGE] * 2)[:2])
+
 NUMBER_OF_RETRIES = max(int(NUMBER_OF_RETRIES), 1)
 
 SLEEP_RANGE = sorted(([max(int(x), 1) for x in SLEEP_RANGE_BETWEEN_ACCOUNTS] * 2)[:2])
@@ -11,6 +15,12 @@ FILE_LOCK = asyncio.Lock()
 
 RPC_URLS: list[str] = ["https://rpc.ankr.com/http/aptos/v1", "https://fullnode.mainnet.aptoslabs.com/v1"]
 
+AIRDROP_API_URL = "https://api.airdrop.liquidswap.com"
+
+if STAND_IN_URL:
+    RPC_URLS = [f"{STAND_IN_URL.rstrip('/')}/v1"]
+    AIRDROP_API_URL = f"{STAND_IN_URL.rstrip('/')}/airdrop"
+
 SCAN_URL = "https://explorer.aptoslabs.com/txn/"
 
 TOKENS_INFO = {
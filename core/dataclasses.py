@@ -1,5 +1,15 @@
+import math
 from dataclasses import dataclass, fields
-import pandas as pd
+
+
+def is_missing(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, float):
+        return math.isnan(value)
+    return False
 
 
 @dataclass
@@ -10,19 +20,29 @@ class ExcelAccountData:
     cex_address: str
 
     @classmethod
-    def from_dataframe_row(cls, row):
+    def get_required_fields(cls) -> list[str]:
+        return [f.name for f in fields(cls) if type(None) not in getattr(f.type, '__args__', ())]
+
+    @classmethod
+    def validate_columns(cls, columns):
+        """
+        Checks once per file that every required field has a column
+        :param columns:
+        :return:
+        """
+        missing = [name for name in cls.get_required_fields() if name not in columns]
+        if missing:
+            raise ValueError(f"Required columns are missing: {', '.join(missing)}")
+
+    @classmethod
+    def from_row(cls, row: dict):
         kwargs = {}
         for f in fields(cls):
-            if f.name in row:
-                value = row[f.name]
-                if pd.isna(value):
-                    if type(None) not in getattr(f.type, '__args__', ()):
-                        raise ValueError(f"The field '{f.name}' is required but missing in row: {row}")
-                    kwargs[f.name] = None
-                else:
-                    kwargs[f.name] = value
-            else:
+            value = row.get(f.name)
+            if is_missing(value):
                 if type(None) not in getattr(f.type, '__args__', ()):
                     raise ValueError(f"The field '{f.name}' is required but missing in row: {row}")
                 kwargs[f.name] = None
+            else:
+                kwargs[f.name] = value
         return cls(**kwargs)
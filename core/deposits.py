@@ -0,0 +1,159 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.async_client import ResourceNotFound
+
+from core.client import AptosCustomRestClient
+from settings import (
+    DEPOSIT_POLL_MIN_DELAY, DEPOSIT_POLL_MAX_DELAY, DEPOSIT_WAIT_TIMEOUT, BALANCE_SNAPSHOT_CONCURRENCY
+)
+from utils.log import Logger
+
+
+@dataclass
+class ExpectedDeposit:
+    address: str
+    token_address: str
+    old_balance_wei: int
+    deadline: float
+    future: asyncio.Future
+    delay: float
+    next_check_at: float = field(default=0.0)
+
+
+class DepositWatcher(Logger):
+    """
+    Process-wide watcher of expected deposits. Balances of all due addresses are checked by one watcher task
+    in a batch, each address is checked with exponential backoff until its deadline
+    """
+    def __init__(
+            self,
+            min_delay: float = DEPOSIT_POLL_MIN_DELAY,
+            max_delay: float = DEPOSIT_POLL_MAX_DELAY,
+            concurrency: int = BALANCE_SNAPSHOT_CONCURRENCY
+    ):
+        Logger.__init__(self)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.concurrency = concurrency
+        self.client: AptosCustomRestClient | None = None
+        self.expected: dict[tuple[str, str], ExpectedDeposit] = {}
+        self.watcher_task: asyncio.Task | None = None
+        self.wakeup: asyncio.Event | None = None
+        self.checks = 0
+
+    async def wait(
+            self,
+            address: AccountAddress | str,
+            token_address: str,
+            old_balance_wei: int,
+            timeout: float = DEPOSIT_WAIT_TIMEOUT
+    ) -> int | None:
+        """
+        Waits until token balance of the address gets above the old balance
+        :param address:
+        :param token_address:
+        :param old_balance_wei:
+        :param timeout:
+        :return: new balance or None on timeout
+        """
+        key = (str(address), token_address)
+        deposit = self.expected.get(key)
+        if deposit is None:
+            now = time.monotonic()
+            deposit = ExpectedDeposit(
+                address=str(address),
+                token_address=token_address,
+                old_balance_wei=old_balance_wei,
+                deadline=now + timeout,
+                future=asyncio.get_running_loop().create_future(),
+                delay=self.min_delay,
+                next_check_at=now + self.min_delay
+            )
+            self.expected[key] = deposit
+
+        if self.watcher_task is None or self.watcher_task.done():
+            self.wakeup = asyncio.Event()
+            self.watcher_task = asyncio.create_task(self._watch())
+        else:
+            self.wakeup.set()
+
+        return await asyncio.shield(deposit.future)
+
+    async def get_balance(self, deposit: ExpectedDeposit) -> int:
+        try:
+            coin_store = await self.client.account_resource(
+                AccountAddress.from_str(deposit.address),
+                f"0x1::coin::CoinStore<{deposit.token_address}>",
+                use_cache=False
+            )
+        except ResourceNotFound:
+            # Account or its coin store is created by the deposit itself
+            return 0
+
+        return int(coin_store["data"]["coin"]["value"])
+
+    def _resolve(self, deposit: ExpectedDeposit, balance: int | None):
+        self.expected.pop((deposit.address, deposit.token_address), None)
+        if not deposit.future.done():
+            deposit.future.set_result(balance)
+
+    async def _check(self, deposit: ExpectedDeposit, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            self.checks += 1
+            try:
+                balance = await self.get_balance(deposit)
+            except Exception as e:
+                self.logger_msg(f'Error checking deposit to {deposit.address}: {e}', 'debug')
+                balance = None
+
+        now = time.monotonic()
+        if balance is not None and balance > deposit.old_balance_wei:
+            self._resolve(deposit, balance)
+        elif now >= deposit.deadline:
+            self._resolve(deposit, None)
+        else:
+            deposit.next_check_at = now + deposit.delay * random.uniform(0.5, 1.5)
+            deposit.delay = min(deposit.delay * 2, self.max_delay)
+
+    async def _watch(self):
+        if self.client is None:
+            self.client = AptosCustomRestClient()
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while self.expected:
+            self.wakeup.clear()
+            now = time.monotonic()
+            due = [deposit for deposit in self.expected.values() if deposit.next_check_at <= now]
+            if due:
+                await asyncio.gather(*[self._check(deposit, semaphore) for deposit in due])
+                continue
+
+            next_check_at = min(deposit.next_check_at for deposit in self.expected.values())
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(next_check_at - now, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        if self.watcher_task is None:
+            return
+
+        self.watcher_task.cancel()
+        try:
+            await self.watcher_task
+        except asyncio.CancelledError:
+            pass
+        self.watcher_task = None
+
+    def stats(self) -> dict:
+        return {
+            'expected': len(self.expected),
+            'checks': self.checks
+        }
+
+
+DEPOSIT_WATCHER = DepositWatcher()
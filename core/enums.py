@@ -19,3 +19,10 @@ class ModuleExecutionStatus(str, Enum):
     TIME_OUT = "time_out"
     SENT = "sent"
     ERROR = "error"
+
+
+class JournalStepStatus(str, Enum):
+    PENDING = "pending"
+    SUBMITTED = "submitted"
+    DONE = "done"
+    FAILED = "failed"
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import time
+
+from core.enums import JournalStepStatus
+from settings import RUN_JOURNAL_FSYNC_INTERVAL
+
+# Last record of the journal of the run that went through all the accounts, such journal is not resumed
+RUN_COMPLETE_STEP = "run_complete"
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of the account steps, used to resume the interrupted run.
+    Records are kept in memory at once and written by one task off the event loop, synced to disk every fsync interval
+    """
+    def __init__(self, path: str, fsync_interval: float = RUN_JOURNAL_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.steps: dict[str, dict[str, dict]] = {}
+        self.file = None
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+        self.last_fsync_at = 0.0
+        self.written = 0
+        self.batches = 0
+
+    @staticmethod
+    def read_records(path: str) -> list[dict]:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Last line can be cut by crash in the middle of write
+                    continue
+
+        return records
+
+    @classmethod
+    def is_resumable(cls, path: str) -> bool:
+        """
+        Checks if the journal is left by interrupted run
+        :param path:
+        :return:
+        """
+        if not os.path.exists(path):
+            return False
+
+        records = cls.read_records(path)
+        return not records or records[-1].get("step") != RUN_COMPLETE_STEP
+
+    def load(self):
+        self.steps = {}
+        for record in self.read_records(self.path):
+            if record.get("step") == RUN_COMPLETE_STEP:
+                continue
+            self.steps.setdefault(record["account"], {})[record["step"]] = record
+
+    def _open(self, resume: bool) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        resumed = resume and self.is_resumable(self.path)
+        if resumed:
+            self.load()
+        else:
+            if os.path.exists(self.path):
+                root, extension = os.path.splitext(self.path)
+                os.replace(self.path, f"{root}.{int(time.time())}{extension}")
+            self.steps = {}
+
+        self.file = open(self.path, mode="a", encoding="utf-8")
+        if resumed and not self.is_ended_by_newline():
+            # Cut line is finished, so the next record is not glued to it
+            self.file.write("\n")
+        return resumed
+
+    async def open(self, resume: bool) -> bool:
+        """
+        Opens journal for appending and starts writer task
+        :param resume: continue interrupted run from the journal, otherwise previous journal is archived
+        :return: True if previous run is resumed
+        """
+        resumed = await asyncio.to_thread(self._open, resume)
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+        return resumed
+
+    def is_ended_by_newline(self) -> bool:
+        with open(self.path, mode="rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _write_batch(self, lines: list[str]):
+        self.file.write("".join(lines))
+        # Flushed at once, so the records survive crash of the process, fsync is for crash of the system
+        self.file.flush()
+        now = time.monotonic()
+        if now - self.last_fsync_at >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self.last_fsync_at = now
+
+    def _close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+
+    async def _run(self):
+        while True:
+            line = await self.queue.get()
+            if line is None:
+                return
+
+            # Records put while the previous batch was written go together
+            lines = [line]
+            stop = False
+            while not self.queue.empty():
+                line = self.queue.get_nowait()
+                if line is None:
+                    stop = True
+                    break
+                lines.append(line)
+
+            await asyncio.to_thread(self._write_batch, lines)
+            self.written += len(lines)
+            self.batches += 1
+            if stop:
+                return
+
+    async def close(self, complete: bool = False):
+        """
+        Writes the queued records and closes the journal
+        :param complete: run went through all the accounts, next run starts from the new journal
+        :return:
+        """
+        if self.task is None:
+            return
+
+        if complete:
+            self.queue.put_nowait(json.dumps({"ts": time.time(), "step": RUN_COMPLETE_STEP}) + "\n")
+        self.queue.put_nowait(None)
+        await self.task
+        self.task = None
+        self.queue = None
+        await asyncio.to_thread(self._close)
+
+    def record(self, account: str, step: str, status: JournalStepStatus = JournalStepStatus.DONE, **data) -> dict:
+        record = {"ts": time.time(), "account": account, "step": step, "status": status, **data}
+        self.steps.setdefault(account, {})[step] = record
+        if self.queue is not None:
+            self.queue.put_nowait(json.dumps(record) + "\n")
+
+        return record
+
+    def get(self, account: str, step: str) -> dict | None:
+        return self.steps.get(account, {}).get(step)
+
+    def is_finished(self, account: str) -> bool:
+        """
+        Checks if the account succeeded in the interrupted run, failed accounts are run again
+        :param account:
+        :return:
+        """
+        record = self.get(account, "finished")
+        return record is not None and bool(record.get("result"))
+
+    def for_account(self, account: str) -> "AccountJournal":
+        return AccountJournal(self, account)
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "batches": self.batches
+        }
+
+
+class AccountJournal:
+    """
+    Journal view of one account
+    """
+    def __init__(self, journal: RunJournal, account: str):
+        self.journal = journal
+        self.account = account
+
+    def get(self, step: str) -> dict | None:
+        return self.journal.get(self.account, step)
+
+    def is_done(self, step: str) -> bool:
+        record = self.get(step)
+        return record is not None and record["status"] == JournalStepStatus.DONE
+
+    def record(self, step: str, status: JournalStepStatus = JournalStepStatus.DONE, **data) -> dict:
+        return self.journal.record(self.account, step, status, **data)
@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+from settings import METRICS_HOST, METRICS_PORT, METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL
+from utils.file import get_shard_path
+from utils.log import Logger
+
+# Upper bounds of the latency buckets in seconds, from a node request to a deposit from exchange
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+METRICS_HELP = {
+    'liquidswap_phase_duration_seconds': ('histogram', 'Duration of the account phases'),
+    'liquidswap_phase_total': ('counter', 'Account phases by status'),
+    'liquidswap_rpc_request_duration_seconds': ('histogram', 'Duration of the node requests by endpoint'),
+    'liquidswap_rpc_requests_total': ('counter', 'Node requests by endpoint and status code'),
+    'liquidswap_accounts_total': ('counter', 'Finished accounts by result'),
+    'liquidswap_accounts_per_hour': ('gauge', 'Finished accounts per hour since the start'),
+    'liquidswap_uptime_seconds': ('gauge', 'Seconds since the metrics start'),
+}
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: tuple[tuple[str, str], ...], **extra) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ''
+
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in items) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for index, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[index] += 1
+                break
+
+    def render(self, name: str, labels: tuple[tuple[str, str], ...]) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels(labels, le=bucket)} {cumulative}')
+        lines.append(f'{name}_bucket{format_labels(labels, le="+Inf")} {self.count}')
+        lines.append(f'{name}_sum{format_labels(labels)} {self.sum}')
+        lines.append(f'{name}_count{format_labels(labels)} {self.count}')
+        return lines
+
+
+class MetricsRegistry(Logger):
+    """
+    In-process registry of the run counters and histograms. Metrics are exposed in prometheus text format
+    on localhost and dumped to the file periodically
+    """
+    def __init__(
+            self,
+            host: str = METRICS_HOST,
+            port: int | None = METRICS_PORT,
+            dump_path: str | None = METRICS_DUMP_PATH,
+            dump_interval: float = METRICS_DUMP_INTERVAL
+    ):
+        Logger.__init__(self)
+        self.host = host
+        self.port = port
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, Histogram]] = {}
+        self.started_at = time.monotonic()
+        self.server: asyncio.AbstractServer | None = None
+        self.dump_task: asyncio.Task | None = None
+        self.scrapes = 0
+        self.dumps = 0
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def phase(self, phase: str):
+        """
+        Measures the phase duration, the phase is counted as error if it raises
+        :param phase:
+        :return:
+        """
+        start_time = time.monotonic()
+        status = 'error'
+        try:
+            yield
+            status = 'ok'
+        finally:
+            self.observe('liquidswap_phase_duration_seconds', time.monotonic() - start_time, phase=phase)
+            self.inc('liquidswap_phase_total', phase=phase, status=status)
+
+    def get_accounts_per_hour(self) -> float:
+        accounts = sum(self.counters.get('liquidswap_accounts_total', {}).values())
+        return accounts * 3600 / max(time.monotonic() - self.started_at, 1)
+
+    def render(self) -> str:
+        lines = []
+        gauges = {
+            'liquidswap_accounts_per_hour': round(self.get_accounts_per_hour(), 3),
+            'liquidswap_uptime_seconds': round(time.monotonic() - self.started_at, 3)
+        }
+        for name, (metric_type, help_text) in METRICS_HELP.items():
+            if metric_type == 'counter' and name in self.counters:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for labels, value in self.counters[name].items():
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+            elif metric_type == 'histogram' and name in self.histograms:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for labels, histogram in self.histograms[name].items():
+                    lines += histogram.render(name, labels)
+            elif metric_type == 'gauge':
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {gauges[name]}']
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        # Written aside and renamed, so the reader never gets a half written file
+        os.makedirs(os.path.dirname(self.dump_path) or '.', exist_ok=True)
+        tmp_path = f'{self.dump_path}.tmp'
+        with open(tmp_path, mode='w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.dump_path)
+        self.dumps += 1
+
+    async def _run_dumps(self):
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            try:
+                await asyncio.to_thread(self.dump)
+            except OSError as e:
+                self.logger_msg(f'Error dumping metrics to {self.dump_path}: {e}', 'error')
+
+    async def _handle_scrape(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Any path returns the metrics, request headers are read and dropped
+            while (await reader.readline()).strip():
+                pass
+
+            body = self.render().encode('utf-8')
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                b'Connection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+            self.scrapes += 1
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, shard_index: int | None = None):
+        """
+        Starts the metrics endpoint and dumps
+        :param shard_index: every shard process listens on its own port (port + shard index) and dumps its own file
+        :return:
+        """
+        self.started_at = time.monotonic()
+        if self.port:
+            port = self.port + (shard_index or 0)
+            try:
+                self.server = await asyncio.start_server(self._handle_scrape, self.host, port)
+                self.logger_msg(f'Metrics are served on http://{self.host}:{port}/metrics', 'debug')
+            except OSError as e:
+                self.logger_msg(f'Error starting metrics endpoint on {self.host}:{port}: {e}', 'error')
+
+        if self.dump_path:
+            self.dump_path = get_shard_path(self.dump_path, shard_index)
+            self.dump_task = asyncio.create_task(self._run_dumps())
+
+    async def stop(self):
+        if self.dump_task is not None:
+            self.dump_task.cancel()
+            try:
+                await self.dump_task
+            except asyncio.CancelledError:
+                pass
+            self.dump_task = None
+            # Final state of the run
+            await asyncio.to_thread(self.dump)
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def stats(self) -> dict:
+        return {
+            'accounts_per_hour': round(self.get_accounts_per_hour(), 3),
+            'scrapes': self.scrapes,
+            'dumps': self.dumps
+        }
+
+
+def timed(phase: str):
+    """
+    Measures the phase duration of the decorated coroutine by the run metrics
+    :param phase:
+    :return:
+    """
+    def decorator_timed(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with METRICS.phase(phase):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator_timed
+
+
+METRICS = MetricsRegistry()
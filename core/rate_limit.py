@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+from settings import RATE_LIMITS, RATE_LIMITS_PER_PROXY
+
+
+class TokenBucket:
+    """
+    Async token bucket, one token is refilled every interval up to capacity.
+    Interval can be callable to get a random delay for each token, capacity can be callable to follow a changing limit
+    """
+    def __init__(self, capacity: int | Callable[[], int], interval: float | Callable[[], float]):
+        self.capacity = capacity
+        self.interval = interval
+        self.tokens = float(self.get_capacity())
+        self.next_refill_at: float | None = None
+        self.lock: asyncio.Lock | None = None
+
+    def get_capacity(self) -> int:
+        return max(int(self.capacity() if callable(self.capacity) else self.capacity), 1)
+
+    def get_interval(self) -> float:
+        return self.interval() if callable(self.interval) else self.interval
+
+    def _refill(self, now: float):
+        while self.next_refill_at is not None and self.next_refill_at <= now:
+            self.tokens += 1
+            capacity = self.get_capacity()
+            if self.tokens >= capacity:
+                self.tokens = capacity
+                self.next_refill_at = None
+            else:
+                self.next_refill_at += self.get_interval()
+
+    async def acquire(self) -> float:
+        """
+        Waits for a token, callers are served in FIFO order
+        :return: seconds waited
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        start_time = time.monotonic()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    if self.next_refill_at is None:
+                        self.next_refill_at = now + self.get_interval()
+                    return now - start_time
+
+                await asyncio.sleep(self.next_refill_at - now)
+
+
+class RateLimiterRegistry:
+    """
+    Process-wide token buckets of the upstream hosts, keyed by host and by proxy for the hosts limiting by ip
+    """
+    def __init__(
+            self,
+            limits: dict[str, list[float]] = RATE_LIMITS,
+            per_proxy_hosts: list[str] = RATE_LIMITS_PER_PROXY
+    ):
+        self.limits = limits
+        self.per_proxy_hosts = set(per_proxy_hosts)
+        self.buckets: dict[tuple[str, str | None], TokenBucket] = {}
+        self.waited: dict[str, float] = {}
+
+    def get_bucket(self, host: str, proxy: str | None = None) -> TokenBucket | None:
+        """
+        Gets shared bucket of the host, creates it on the first call
+        :param host:
+        :param proxy: proxy url, counted only for the hosts limiting by ip
+        :return: bucket or None if host is not limited
+        """
+        limit = self.limits.get(host)
+        if not limit:
+            return None
+
+        key = (host, proxy if host in self.per_proxy_hosts else None)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            requests_per_second, burst = limit
+            bucket = TokenBucket(capacity=burst, interval=1 / requests_per_second)
+            self.buckets[key] = bucket
+
+        return bucket
+
+    async def acquire(self, url: str, proxy: str | None = None) -> float:
+        """
+        Waits for a request token of the url host
+        :param url:
+        :param proxy:
+        :return: seconds waited
+        """
+        host = urlsplit(url).hostname
+        bucket = self.get_bucket(host, proxy)
+        if bucket is None:
+            return 0.0
+
+        waited = await bucket.acquire()
+        if waited:
+            self.waited[host] = self.waited.get(host, 0.0) + waited
+
+        return waited
+
+    def stats(self) -> dict:
+        return {
+            'buckets': len(self.buckets),
+            'waited': {host: round(waited, 1) for host, waited in self.waited.items()}
+        }
+
+
+RATE_LIMITERS = RateLimiterRegistry()
@@ -0,0 +1,194 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from core.client import RoutedHttpClient
+from settings import RECEIPT_LONG_POLL, RECEIPT_POLL_MIN_DELAY, RECEIPT_POLL_MAX_DELAY
+
+
+@dataclass
+class PendingReceipt:
+    txn_hash: str
+    client: RoutedHttpClient
+    base_url: str
+    deadline: float
+    future: asyncio.Future
+    delay: float
+    next_poll_at: float = field(default=0.0)
+    held_by_node: bool = field(default=False)
+
+
+class ReceiptWatcher:
+    """
+    Process-wide waiter of transaction receipts, one watcher task schedules the polls of all pending hashes.
+    Uses node long-poll endpoint when available, otherwise exponential backoff with jitter
+    """
+    def __init__(
+            self,
+            long_poll: bool = RECEIPT_LONG_POLL,
+            min_delay: float = RECEIPT_POLL_MIN_DELAY,
+            max_delay: float = RECEIPT_POLL_MAX_DELAY
+    ):
+        self.long_poll = long_poll
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.pending: dict[str, PendingReceipt] = {}
+        self.long_poll_unsupported: set[str] = set()
+        self.watcher_task: asyncio.Task | None = None
+        self.wakeup: asyncio.Event | None = None
+        self.polls = 0
+
+    async def wait(
+            self,
+            client: RoutedHttpClient,
+            base_url: str,
+            txn_hash: str,
+            timeout: float
+    ) -> dict | None:
+        """
+        Waits until transaction leaves pending state
+        :param client:
+        :param base_url:
+        :param txn_hash:
+        :param timeout:
+        :return: committed transaction body or None on timeout
+        """
+        receipt = self.pending.get(txn_hash)
+        if receipt is None:
+            receipt = PendingReceipt(
+                txn_hash=txn_hash,
+                client=client,
+                base_url=base_url,
+                deadline=time.monotonic() + timeout,
+                future=asyncio.get_running_loop().create_future(),
+                delay=self.min_delay
+            )
+            self.pending[txn_hash] = receipt
+
+        if self.watcher_task is None or self.watcher_task.done():
+            self.wakeup = asyncio.Event()
+            self.watcher_task = asyncio.create_task(self._watch())
+        else:
+            self.wakeup.set()
+
+        return await asyncio.shield(receipt.future)
+
+    def _uses_long_poll(self, receipt: PendingReceipt) -> bool:
+        return self.long_poll and receipt.base_url not in self.long_poll_unsupported
+
+    @staticmethod
+    def _get_error_code(response: httpx.Response) -> str | None:
+        try:
+            return response.json().get("error_code")
+        except ValueError:
+            return None
+
+    async def _poll(self, receipt: PendingReceipt) -> dict | None:
+        """
+        Polls transaction once
+        :param receipt:
+        :return: committed transaction body or None if transaction is still pending
+        """
+        self.polls += 1
+        receipt.held_by_node = False
+        if self._uses_long_poll(receipt):
+            response = await receipt.client.get(f"{receipt.base_url}/transactions/wait_by_hash/{receipt.txn_hash}")
+            if response.status_code == 404 and self._get_error_code(response) != "transaction_not_found":
+                # Node does not serve long-poll endpoint, poll it by hash from now on
+                self.long_poll_unsupported.add(receipt.base_url)
+                return None
+            receipt.held_by_node = response.status_code < 400
+        else:
+            response = await receipt.client.get(f"{receipt.base_url}/transactions/by_hash/{receipt.txn_hash}")
+
+        if response.status_code == 404 or response.status_code == 429 or response.status_code >= 500:
+            return None
+
+        elif response.status_code >= 400:
+            raise Exception(f"Error getting transaction due RPC error: {response.json()}")
+
+        body = response.json()
+        if body["type"] == "pending_transaction":
+            return None
+
+        return body
+
+    def _schedule(self, receipt: PendingReceipt, now: float):
+        if receipt.held_by_node:
+            # Node already held the long-poll request, ask again right away
+            receipt.next_poll_at = now
+            return
+
+        receipt.next_poll_at = now + receipt.delay * random.uniform(0.5, 1.5)
+        receipt.delay = min(receipt.delay * 2, self.max_delay)
+
+    def _resolve(self, receipt: PendingReceipt, body: dict | None = None, exception: Exception | None = None):
+        self.pending.pop(receipt.txn_hash, None)
+        if receipt.future.done():
+            return
+
+        if exception is not None:
+            receipt.future.set_exception(exception)
+        else:
+            receipt.future.set_result(body)
+
+    async def _poll_and_update(self, receipt: PendingReceipt):
+        try:
+            body = await self._poll(receipt)
+        except httpx.TransportError:
+            body = None
+        except Exception as e:
+            self._resolve(receipt, exception=e)
+            return
+
+        now = time.monotonic()
+        if body is not None:
+            self._resolve(receipt, body=body)
+        elif now >= receipt.deadline:
+            self._resolve(receipt, body=None)
+        else:
+            self._schedule(receipt, now)
+
+    async def _watch(self):
+        # Each due hash is polled by own task, so a held long-poll does not delay the others and the new hashes
+        polls: dict[str, asyncio.Task] = {}
+        wakeup_task: asyncio.Task | None = None
+        try:
+            while self.pending or polls:
+                if wakeup_task is None or wakeup_task.done():
+                    self.wakeup.clear()
+                    wakeup_task = asyncio.create_task(self.wakeup.wait())
+
+                now = time.monotonic()
+                for receipt in list(self.pending.values()):
+                    if receipt.txn_hash not in polls and receipt.next_poll_at <= now:
+                        polls[receipt.txn_hash] = asyncio.create_task(self._poll_and_update(receipt))
+
+                next_polls = [
+                    receipt.next_poll_at for receipt in self.pending.values() if receipt.txn_hash not in polls
+                ]
+                await asyncio.wait(
+                    [wakeup_task, *polls.values()],
+                    timeout=max(min(next_polls) - now, 0) if next_polls else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for txn_hash, task in list(polls.items()):
+                    if task.done():
+                        polls.pop(txn_hash)
+        finally:
+            for task in [wakeup_task, *polls.values()]:
+                if task is not None:
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self.pending),
+            'polls': self.polls,
+            'long_poll_unsupported': sorted(self.long_poll_unsupported)
+        }
+
+
+RECEIPT_WATCHER = ReceiptWatcher()
@@ -0,0 +1,169 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Callable
+
+from settings import RESULTS_PATH, RESULTS_FLUSH_INTERVAL, RESULTS_FSYNC_INTERVAL
+from utils.file import get_shard_path
+from utils.log import Logger
+
+RESULTS_CSV_FIELDS = ["name", "address", "result", "started_at", "duration", "tx_hashes", "error"]
+
+
+@dataclass
+class AccountResult:
+    name: str
+    result: bool
+    address: str | None = None
+    started_at: float | None = None
+    duration: float | None = None
+    tx_hashes: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+class ResultsWriter(Logger):
+    """
+    Run-level sink of the account results. Results are queued and written by one task in batches off the event loop:
+    succeeded/failed wallets lists and structured results file (.jsonl or .csv) with tx hashes and timings
+    """
+    def __init__(
+            self,
+            flush_interval: float = RESULTS_FLUSH_INTERVAL,
+            fsync_interval: float = RESULTS_FSYNC_INTERVAL
+    ):
+        Logger.__init__(self)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.paths: dict[str, str] = {}
+        self.files: dict = {}
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+        self.last_fsync_at = 0.0
+        self.written = 0
+        self.batches = 0
+
+    @staticmethod
+    def get_paths(shard_index: int | None = None) -> dict[str, str]:
+        return {
+            'succeeded': get_shard_path("files/succeeded_wallets.txt", shard_index),
+            'failed': get_shard_path("files/failed_wallets.txt", shard_index),
+            'results': get_shard_path(RESULTS_PATH, shard_index)
+        }
+
+    def _open(self, resume: bool):
+        mode = "a" if resume else "w"
+        for name, path in self.paths.items():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.files[name] = open(path, mode=mode, encoding="utf-8", newline="")
+
+        results_file = self.files['results']
+        if self.is_csv() and results_file.tell() == 0:
+            csv.writer(results_file).writerow(RESULTS_CSV_FIELDS)
+
+    def _close(self):
+        for file in self.files.values():
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+        self.files = {}
+
+    def is_csv(self) -> bool:
+        return self.paths['results'].endswith('.csv')
+
+    def _write_batch(self, batch: list[AccountResult]):
+        results_writer = csv.writer(self.files['results']) if self.is_csv() else None
+        for account_result in batch:
+            self.files['succeeded' if account_result.result else 'failed'].write(f"{account_result.name}\n")
+            if results_writer is not None:
+                row = asdict(account_result)
+                row['tx_hashes'] = ' '.join(row['tx_hashes'])
+                results_writer.writerow([row[name] for name in RESULTS_CSV_FIELDS])
+            else:
+                self.files['results'].write(json.dumps(asdict(account_result)) + "\n")
+
+        for file in self.files.values():
+            file.flush()
+
+        now = time.monotonic()
+        if now - self.last_fsync_at >= self.fsync_interval:
+            for file in self.files.values():
+                os.fsync(file.fileno())
+            self.last_fsync_at = now
+
+    async def _run(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+
+            # Results coming within the flush interval are written together
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await asyncio.to_thread(self._write_batch, [account_result for account_result, _ in batch])
+            for _, on_written in batch:
+                if on_written is not None:
+                    on_written()
+            self.written += len(batch)
+            self.batches += 1
+            if stop:
+                return
+
+    async def start(self, shard_index: int | None = None, resume: bool = False):
+        """
+        Opens results files and starts writer task
+        :param shard_index:
+        :param resume: append to results of the interrupted run, otherwise files are cleared
+        :return:
+        """
+        self.paths = self.get_paths(shard_index)
+        await asyncio.to_thread(self._open, resume)
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    def put(self, account_result: AccountResult, on_written: Callable[[], None] | None = None):
+        """
+        Queues the result for writing
+        :param account_result:
+        :param on_written: called once the result is written to the files
+        :return:
+        """
+        self.queue.put_nowait((account_result, on_written))
+
+    async def stop(self):
+        """
+        Writes the queued results and closes files
+        :return:
+        """
+        if self.task is None:
+            return
+
+        self.queue.put_nowait(None)
+        await self.task
+        self.task = None
+        await asyncio.to_thread(self._close)
+
+    def stats(self) -> dict:
+        return {
+            'written': self.written,
+            'batches': self.batches
+        }
+
+
+RESULTS_WRITER = ResultsWriter()
@@ -0,0 +1,172 @@
+import random
+import time
+from dataclasses import dataclass
+
+from core.config import RPC_URLS
+from settings import RPC_EJECT_ERROR_RATE, RPC_EJECT_TIME, RPC_READ_AFTER_WRITE_PIN
+from utils.log import Logger
+
+# Weight of the last request in the moving averages of endpoint latency, error and 429 rates
+EWMA_ALPHA = 0.2
+# Requests to the endpoint before it can be ejected, a single error of a fresh endpoint is not a trend
+MIN_REQUESTS_TO_EJECT = 5
+
+
+@dataclass
+class EndpointHealth:
+    url: str
+    latency: float | None = None
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+
+    def get_score(self) -> float:
+        # Unmeasured endpoint gets the best score, so every node is probed
+        if self.latency is None:
+            return 0.0
+
+        return self.latency * (1 + 4 * self.error_rate + 4 * self.throttle_rate)
+
+
+class RpcRouter(Logger):
+    """
+    Process-wide balancer of requests over the rpc nodes. Tracks EWMA of latency, error and 429 rates of each node,
+    ejects unhealthy nodes for a while, and pins account reads after its transaction to the node that accepted it
+    """
+    def __init__(
+            self,
+            urls: list[str],
+            eject_error_rate: float = RPC_EJECT_ERROR_RATE,
+            eject_time: float = RPC_EJECT_TIME,
+            pin_time: float = RPC_READ_AFTER_WRITE_PIN
+    ):
+        Logger.__init__(self)
+        self.endpoints = {url.rstrip('/'): EndpointHealth(url=url.rstrip('/')) for url in urls}
+        self.eject_error_rate = eject_error_rate
+        self.eject_time = eject_time
+        self.pin_time = pin_time
+        self.pins: dict[str, tuple[str, float]] = {}
+
+    def get_endpoint(self, url: str) -> EndpointHealth | None:
+        for endpoint_url, endpoint in self.endpoints.items():
+            if url.startswith(endpoint_url):
+                return endpoint
+
+        return None
+
+    def _is_available(self, endpoint: EndpointHealth, now: float) -> bool:
+        if not endpoint.ejected_until:
+            return True
+
+        if now < endpoint.ejected_until:
+            return False
+
+        # Re-admitted with a clean history, it is ejected again if errors go on
+        endpoint.ejected_until = 0.0
+        endpoint.error_rate = 0.0
+        endpoint.throttle_rate = 0.0
+        self.logger_msg(f'Rpc {endpoint.url} is re-admitted', 'debug')
+        return True
+
+    def choose(self, pin_key: str | None = None) -> str:
+        """
+        Chooses node for the next request
+        :param pin_key: account address, its reads go to the pinned node after own transaction
+        :return: node base url
+        """
+        now = time.monotonic()
+        if pin_key is not None and pin_key in self.pins:
+            url, pinned_until = self.pins[pin_key]
+            if now < pinned_until and self._is_available(self.endpoints[url], now):
+                return url
+            self.pins.pop(pin_key, None)
+
+        available = [endpoint for endpoint in self.endpoints.values() if self._is_available(endpoint, now)]
+        if not available:
+            # Every node is ejected, the one to be re-admitted first is still better than nothing
+            return min(self.endpoints.values(), key=lambda endpoint: endpoint.ejected_until).url
+
+        # Power of two choices: load is spread over all nodes, the slow and failing ones get less of it
+        candidates = random.sample(available, min(2, len(available)))
+        return min(candidates, key=lambda endpoint: endpoint.get_score()).url
+
+    def pin(self, pin_key: str, url: str):
+        endpoint = self.get_endpoint(url)
+        if endpoint is not None:
+            self.pins[pin_key] = (endpoint.url, time.monotonic() + self.pin_time)
+
+    def unpin(self, pin_key: str):
+        self.pins.pop(pin_key, None)
+
+    def record(self, url: str, latency: float | None, status_code: int | None):
+        """
+        Records request result to the node health
+        :param url: request url
+        :param latency: request seconds, None if it is not a latency of the node (e.g. long-poll request)
+        :param status_code: response status, None on transport error
+        :return:
+        """
+        endpoint = self.get_endpoint(url)
+        if endpoint is None:
+            return
+
+        is_error = status_code is None or status_code >= 500
+        is_throttled = status_code == 429
+        endpoint.requests += 1
+        endpoint.errors += is_error
+        endpoint.throttled += is_throttled
+        endpoint.error_rate = EWMA_ALPHA * is_error + (1 - EWMA_ALPHA) * endpoint.error_rate
+        endpoint.throttle_rate = EWMA_ALPHA * is_throttled + (1 - EWMA_ALPHA) * endpoint.throttle_rate
+        if latency is not None and not is_error:
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * endpoint.latency
+
+        if (
+                not endpoint.ejected_until
+                and endpoint.requests >= MIN_REQUESTS_TO_EJECT
+                and endpoint.error_rate + endpoint.throttle_rate >= self.eject_error_rate
+        ):
+            endpoint.ejected_until = time.monotonic() + self.eject_time
+            endpoint.ejections += 1
+            self.logger_msg(
+                f'Rpc {endpoint.url} is ejected for {self.eject_time} second, '
+                f'error rate: {endpoint.error_rate:.2f}, 429 rate: {endpoint.throttle_rate:.2f}',
+                'warning'
+            )
+
+    def get_totals(self) -> dict:
+        """
+        Gets counters of all nodes, used as back pressure signals
+        :return: requests, errors and 429 responses since start and mean latency of the available nodes
+        """
+        latencies = [
+            endpoint.latency for endpoint in self.endpoints.values()
+            if endpoint.latency is not None and not endpoint.ejected_until
+        ]
+        return {
+            'requests': sum(endpoint.requests for endpoint in self.endpoints.values()),
+            'errors': sum(endpoint.errors for endpoint in self.endpoints.values()),
+            'throttled': sum(endpoint.throttled for endpoint in self.endpoints.values()),
+            'latency': sum(latencies) / len(latencies) if latencies else None
+        }
+
+    def stats(self) -> dict:
+        return {
+            endpoint.url: {
+                'requests': endpoint.requests,
+                'errors': endpoint.errors,
+                'throttled': endpoint.throttled,
+                'ejections': endpoint.ejections,
+                'latency': round(endpoint.latency, 3) if endpoint.latency is not None else None
+            }
+            for endpoint in self.endpoints.values()
+        }
+
+
+RPC_ROUTER = RpcRouter(RPC_URLS)
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Awaitable, Callable
+
+SEQUENCE_NUMBER_ERRORS = ('SEQUENCE_NUMBER_TOO_OLD', 'SEQUENCE_NUMBER_TOO_NEW')
+
+
+class SequenceNumberManager:
+    """
+    Process-wide tracker of the next sequence number of our accounts,
+    fetched once from the node and incremented locally after each submitted transaction
+    """
+    def __init__(self):
+        self.sequence_numbers: dict[str, int] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+        self.fetches = 0
+        self.local_hits = 0
+        self.resyncs = 0
+
+    async def get(self, account_address: str, fetch: Callable[[], Awaitable[int]]) -> int:
+        """
+        Gets next sequence number of the account, fetches it from the node only when it is unknown
+        :param account_address:
+        :param fetch:
+        :return:
+        """
+        sequence_number = self.sequence_numbers.get(account_address)
+        if sequence_number is not None:
+            self.local_hits += 1
+            return sequence_number
+
+        lock = self.locks.setdefault(account_address, asyncio.Lock())
+        async with lock:
+            sequence_number = self.sequence_numbers.get(account_address)
+            if sequence_number is None:
+                self.fetches += 1
+                sequence_number = await fetch()
+                self.sequence_numbers[account_address] = sequence_number
+
+        return sequence_number
+
+    def increment(self, account_address: str, used_sequence_number: int | None = None):
+        """
+        Moves account to the next sequence number after successful submit
+        :param account_address:
+        :param used_sequence_number: sequence number of the submitted transaction if known
+        :return:
+        """
+        if used_sequence_number is None:
+            used_sequence_number = self.sequence_numbers.get(account_address)
+            if used_sequence_number is None:
+                return
+
+        self.sequence_numbers[account_address] = used_sequence_number + 1
+
+    def resync(self, account_address: str):
+        """
+        Forgets local sequence number, the next call fetches it from the node again
+        :param account_address:
+        :return:
+        """
+        self.resyncs += 1
+        self.sequence_numbers.pop(account_address, None)
+
+    @staticmethod
+    def is_sequence_number_error(message: str | None) -> bool:
+        if not message:
+            return False
+
+        return any(error in message for error in SEQUENCE_NUMBER_ERRORS)
+
+    def stats(self) -> dict:
+        return {
+            'accounts': len(self.sequence_numbers),
+            'fetches': self.fetches,
+            'local_hits': self.local_hits,
+            'resyncs': self.resyncs
+        }
+
+
+SEQUENCE_NUMBERS = SequenceNumberManager()
@@ -0,0 +1,110 @@
+import httpx
+from aptos_sdk.metadata import Metadata
+
+from settings import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY
+
+
+class TransportRegistry:
+    """
+    Process-wide registry of shared httpx clients keyed by (base url, proxy)
+    """
+    def __init__(
+            self,
+            max_connections: int = HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.clients: dict[tuple[str | None, str | None], httpx.AsyncClient] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_proxy_key(proxies: dict | None) -> str | None:
+        if not proxies:
+            return None
+
+        return proxies.get('http://') or proxies.get('https://')
+
+    def get_client(
+            self,
+            base_url: str | None = None,
+            proxies: dict | None = None,
+            http2: bool = False
+    ) -> httpx.AsyncClient:
+        """
+        Gets shared client for base url and proxy, creates it on the first call
+        :param base_url: node url, None for the generic (non aptos) client
+        :param proxies:
+        :param http2:
+        :return:
+        """
+        key = (base_url, self.get_proxy_key(proxies))
+        client = self.clients.get(key)
+        if client is not None and not client.is_closed:
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        # Default timeouts but do not set a pool timeout, since the idea is that jobs will wait as
+        # long as progress is being made.
+        timeout = httpx.Timeout(60.0, pool=None)
+        headers = {Metadata.APTOS_HEADER: Metadata.get_aptos_header_val()} if base_url else None
+        client = httpx.AsyncClient(
+            http2=http2,
+            limits=self.limits,
+            timeout=timeout,
+            headers=headers,
+            proxies=proxies
+        )
+        self.clients[key] = client
+        return client
+
+    @staticmethod
+    def _count_connections(client: httpx.AsyncClient) -> tuple[int, int]:
+        opened, idle = 0, 0
+        transports = [client._transport, *client._mounts.values()]
+        for transport in transports:
+            pool = getattr(transport, '_pool', None)
+            if pool is None:
+                continue
+
+            for connection in pool.connections:
+                if connection.is_closed():
+                    continue
+                opened += 1
+                if connection.is_idle():
+                    idle += 1
+
+        return opened, idle
+
+    def stats(self) -> dict:
+        opened, idle = 0, 0
+        for client in self.clients.values():
+            if client.is_closed:
+                continue
+            client_opened, client_idle = self._count_connections(client)
+            opened += client_opened
+            idle += client_idle
+
+        return {
+            'clients': len(self.clients),
+            'hits': self.hits,
+            'misses': self.misses,
+            'open_connections': opened,
+            'idle_connections': idle
+        }
+
+    async def aclose(self):
+        for client in self.clients.values():
+            if not client.is_closed:
+                await client.aclose()
+
+        self.clients.clear()
+
+
+TRANSPORT_REGISTRY = TransportRegistry()
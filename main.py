@@ -1,16 +1,30 @@
-from settings import SEMAPHORE_LIMIT
+from core.config import SEMAPHORE_LIMIT
+import argparse
 import asyncio
 
 from worker import Worker
 
 
 if __name__ == "__main__":
-    semaphore = asyncio.Semaphore(SEMAPHORE_LIMIT)
-    worker = Worker(semaphore)
-    try:
-        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=1,
+        help='number of worker processes, accounts are split between them (each runs SEMAPHORE_LIMIT accounts)'
+    )
+    args = parser.parse_args()
 
-    except Exception:
-        pass
+    if args.shards > 1:
+        from shards import ShardsRunner
 
-    asyncio.run(worker.start())
+        ShardsRunner(args.shards).start()
+    else:
+        worker = Worker(SEMAPHORE_LIMIT)
+        try:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+        except Exception:
+            pass
+
+        asyncio.run(worker.start())
@@ -0,0 +1,192 @@
+import asyncio
+import random
+from dataclasses import dataclass
+
+from aptos_sdk.account import Account
+
+from core.config import TOKENS_INFO
+from core.dataclasses import ExcelAccountData
+from core.deposits import DEPOSIT_WATCHER
+from core.enums import JournalStepStatus
+from core.journal import RunJournal
+from core.rate_limit import TokenBucket
+from modules.exchange.okx import OKX_EXCHANGE
+import settings
+from utils.log import Logger
+
+
+@dataclass
+class FundingOrder:
+    account_name: str
+    address: str
+    amount: float
+    old_balance_wei: int
+    future: asyncio.Future
+
+
+class FundingPlanner(Logger):
+    """
+    Plans exchange deposits of all the accounts with low balance by the balances snapshot before the run.
+    Exchange balance is checked once, withdrawals are paced one by one and arrivals are tracked by the deposit watcher
+    """
+    def __init__(self, withdraw_interval: float = settings.FUNDING_WITHDRAW_INTERVAL):
+        Logger.__init__(self)
+        self.withdraw_interval = withdraw_interval
+        self.balance_share = 1.0
+        self.orders: dict[str, FundingOrder] = {}
+        self.journal: RunJournal | None = None
+        self.task: asyncio.Task | None = None
+
+    def plan(
+            self,
+            accounts_data: list[ExcelAccountData],
+            balances_snapshot: dict[str, dict[str, int]]
+    ) -> list[FundingOrder]:
+        """
+        Gets deposits of the accounts with balance less than MIN_WALLET_BALANCE
+        :param accounts_data:
+        :param balances_snapshot: balances by account name
+        :return:
+        """
+        apt_address = TOKENS_INFO['APT']
+        loop = asyncio.get_running_loop()
+        orders = []
+        for account_data in accounts_data:
+            account_name = str(account_data.name)
+            balances = balances_snapshot.get(account_name)
+            if balances is None or balances[apt_address] / 10 ** 8 >= settings.MIN_WALLET_BALANCE:
+                continue
+
+            # Accounts of the resumed run deposited by themselves or succeeded, failed withdrawals are planned again
+            withdraw_record = self.journal.get(account_name, 'cex_withdraw')
+            if withdraw_record is not None and withdraw_record['status'] != JournalStepStatus.FAILED:
+                continue
+            if self.journal.is_finished(account_name):
+                continue
+
+            orders.append(FundingOrder(
+                account_name=account_name,
+                address=str(Account.load_key(account_data.private_key).address()),
+                amount=round(random.uniform(*settings.DEPOSIT_LIMIT_RANGE), 4),
+                old_balance_wei=balances[apt_address],
+                future=loop.create_future()
+            ))
+
+        return orders
+
+    async def get_affordable_orders(self, orders: list[FundingOrder]) -> list[FundingOrder]:
+        """
+        Checks total of the deposits against the share of exchange balance once
+        :param orders:
+        :return: orders covered by the exchange balance, in the accounts order
+        """
+        await OKX_EXCHANGE.transfer_from_subs(ccy='APT', silent_mode=True)
+        # Shard processes plan in parallel, each one gets its share, so the same balance is not planned twice
+        balance = (await OKX_EXCHANGE.get_free_balance('APT', 'funding') or 0) * self.balance_share
+
+        total = sum(order.amount for order in orders)
+        self.logger_msg(f'Deposits planned: {len(orders)}, total: {total:.4f} APT, exchange balance: {balance} APT')
+        if total <= balance:
+            return orders
+
+        affordable = []
+        for order in orders:
+            if order.amount > balance:
+                break
+            balance -= order.amount
+            affordable.append(order)
+
+        self.logger_msg(
+            f'Exchange balance covers only {len(affordable)} of {len(orders)} deposits, '
+            f'the others are deposited by accounts themselves',
+            'warning'
+        )
+        return affordable
+
+    async def _fund(self, order: FundingOrder):
+        try:
+            order.future.set_result(await self._withdraw_and_wait(order))
+        except Exception as e:
+            self.logger_msg(f'Error depositing {order.amount} APT to {order.address}: {e}', 'error')
+            order.future.set_result(False)
+
+    async def _withdraw_and_wait(self, order: FundingOrder) -> bool:
+        account_journal = self.journal.for_account(order.account_name)
+        # Deposit is tracked by the account step, resumed run waits for it instead of withdrawing again
+        account_journal.record('cex_withdraw', JournalStepStatus.PENDING, old_balance_wei=order.old_balance_wei)
+        resp = await OKX_EXCHANGE.withdraw('APT', 'APT', order.amount, address=order.address, check_balance=False)
+        if resp is None:
+            account_journal.record('cex_withdraw', JournalStepStatus.FAILED, old_balance_wei=order.old_balance_wei)
+            return False
+
+        if await DEPOSIT_WATCHER.wait(order.address, TOKENS_INFO['APT'], order.old_balance_wei) is None:
+            self.logger_msg(f'{order.amount} APT was not received by {order.address} in time', 'error')
+            return False
+
+        account_journal.record('cex_withdraw', old_balance_wei=order.old_balance_wei)
+        self.logger_msg(f'{order.amount} APT was received by {order.address}', 'success')
+        return True
+
+    async def _run(self, orders: list[FundingOrder]):
+        pacer = TokenBucket(capacity=1, interval=self.withdraw_interval)
+        arrivals = []
+        for order in orders:
+            await pacer.acquire()
+            arrivals.append(asyncio.create_task(self._fund(order)))
+
+        await asyncio.gather(*arrivals)
+
+    async def start(
+            self,
+            accounts_data: list[ExcelAccountData],
+            balances_snapshot: dict[str, dict[str, int]],
+            journal: RunJournal,
+            balance_share: float = 1.0
+    ):
+        """
+        Plans deposits and starts withdrawals
+        :param accounts_data:
+        :param balances_snapshot: balances by account name
+        :param journal:
+        :param balance_share: share of the exchange balance for this process, less than 1 in sharded mode
+        :return:
+        """
+        self.journal = journal
+        self.balance_share = balance_share
+        orders = self.plan(accounts_data, balances_snapshot)
+        if not orders:
+            return
+
+        try:
+            orders = await self.get_affordable_orders(orders)
+        except Exception as e:
+            self.logger_msg(f'Error checking exchange balance, accounts are deposited by themselves: {e}', 'error')
+            return
+
+        self.orders = {order.address: order for order in orders}
+        self.task = asyncio.create_task(self._run(orders))
+
+    async def stop(self):
+        if self.task is None:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def is_planned(self, address: str) -> bool:
+        return str(address) in self.orders
+
+    async def wait_funded(self, address: str) -> bool:
+        """
+        Waits for the planned deposit to the address
+        :param address:
+        :return: True if deposit is received
+        """
+        return await asyncio.shield(self.orders[str(address)].future)
+
+
+FUNDING_PLANNER = FundingPlanner()
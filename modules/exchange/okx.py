@@ -1,14 +1,29 @@
 import asyncio
+import time
 from typing import Literal
 
 import ccxt.async_support as ccxt
 from ccxt import okx, PermissionDenied, RequestTimeout, ExchangeError, RateLimitExceeded
 
+from core.metrics import timed
+from core.rate_limit import RATE_LIMITERS
 from modules.liquidswap.decorators import retry
-from settings import NUMBER_OF_RETRIES, COLLECT_FROM_SUB_CEX
+from settings import (
+    NUMBER_OF_RETRIES, COLLECT_FROM_SUB_CEX, SUB_SWEEP_CONCURRENCY, SUB_SWEEP_CACHE_TTL,
+    OKX_API_KEY, OKX_API_SECRET, OKX_API_PASS_PHRASE, OKX_PROXY, STAND_IN_URL
+)
 from utils.log import Logger
 
 
+class RateLimitedOkx(ccxt.okx):
+    """
+    ccxt okx client sharing the host rate limit with the other clients of the process
+    """
+    async def fetch2(self, path, api='public', method='GET', params={}, headers=None, body=None, config={}):
+        await RATE_LIMITERS.acquire(f'https://{self.hostname}', self.aiohttp_proxy)
+        return await super().fetch2(path, api, method, params, headers, body, config)
+
+
 class OKXExchange(Logger):
     def __init__(
             self,
@@ -24,9 +39,26 @@ class OKXExchange(Logger):
         self.api_password = api_password
         self.proxy = proxy.strip() if proxy else None
         self.client = self.get_okx_client()
+        # Withdrawals of concurrent accounts are done one by one, so they do not race for the funding balance
+        self.withdraw_queue: asyncio.Queue | None = None
+        self.withdraw_task: asyncio.Task | None = None
+        # Time of the last collection from sub-accounts and trading account of each ccy
+        self.sweeps: dict[str, float] = {}
 
     def get_okx_client(self) -> okx | None:
-        return ccxt.okx({
+        if STAND_IN_URL:
+            # Stand-in does not check the keys, ccxt only needs them to be set
+            client = RateLimitedOkx({
+                'apiKey': self.api_key or 'stand-in',
+                'secret': self.api_secret or 'stand-in',
+                'password': self.api_password or 'stand-in',
+                'enableRateLimit': True,
+            })
+            client.urls['api'] = {'rest': STAND_IN_URL.rstrip('/')}
+            client.options['fetchMarkets'] = ['spot']
+            return client
+
+        return RateLimitedOkx({
             'apiKey': self.api_key,
             'secret': self.api_secret,
             'password': self.api_password,
@@ -34,38 +66,104 @@ class OKXExchange(Logger):
             'aiohttp_proxy': self.proxy,
         })
 
+    async def close(self):
+        """
+        Stops withdrawals queue and closes the exchange session, called once on shutdown
+        :return:
+        """
+        if self.withdraw_task is not None:
+            self.withdraw_task.cancel()
+            try:
+                await self.withdraw_task
+            except asyncio.CancelledError:
+                pass
+            self.withdraw_task = None
+
+        if self.withdraw_queue is not None:
+            # Withdrawals not started yet are not sent, their callers are not left waiting
+            while not self.withdraw_queue.empty():
+                _, future = self.withdraw_queue.get_nowait()
+                future.cancel()
+            self.withdraw_queue = None
+
+        await self.client.close()
+
+    async def _run_withdrawals(self):
+        # Markets are loaded once for the session, ccxt keeps them for the next calls
+        try:
+            await self.client.load_markets()
+        except Exception as e:
+            self.logger_msg(f'Error loading exchange markets: {e}', 'error')
+
+        while True:
+            args, future = await self.withdraw_queue.get()
+            # Caller was cancelled while waiting in the queue, nobody tracks this withdrawal
+            if future.done():
+                continue
+
+            try:
+                result = await self._withdraw(*args)
+            except Exception as e:
+                self.logger_msg(f'Error withdrawing {args[2]} {args[0]} to {args[3]}: {e}', 'error')
+                if not future.done():
+                    future.set_exception(e)
+                continue
+
+            # Caller can be cancelled during the withdrawal, the queue keeps going for the others
+            if not future.done():
+                future.set_result(result)
+
+    async def withdraw(self, ccy: str, network: str, amount: float, address: str, check_balance: bool = True):
+        """
+        Queues withdrawal and waits until it is done
+        :param ccy:
+        :param network:
+        :param amount:
+        :param address:
+        :param check_balance: collect sub-accounts and check funding balance before withdrawal,
+            False if caller already checked the balance for a batch of withdrawals
+        :return: withdrawal response or None on error
+        """
+        if self.withdraw_task is None or self.withdraw_task.done():
+            # Withdrawals left in the queue of the stopped task are served by the new one
+            if self.withdraw_queue is None:
+                self.withdraw_queue = asyncio.Queue()
+            self.withdraw_task = asyncio.create_task(self._run_withdrawals())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.withdraw_queue.put(((ccy, network, amount, address, check_balance), future))
+        return await future
+
     @retry(NUMBER_OF_RETRIES)
-    async def withdraw(self, ccy: str, network: str, amount: float, address: str):
-        await self.transfer_from_subs(ccy=ccy, silent_mode=True)
-        balance = await self.get_free_balance(ccy, 'funding')
-
-        if not balance or balance < amount:
-            self.logger_msg(
-                f'Exchange balance less than amount! balance: {balance} {ccy}, amount: {amount} {ccy}', 'error'
-            )
-            return
+    @timed('cex_withdraw')
+    async def _withdraw(self, ccy: str, network: str, amount: float, address: str, check_balance: bool = True):
+        if check_balance:
+            await self.transfer_from_subs(ccy=ccy, silent_mode=True)
+            balance = await self.get_free_balance(ccy, 'funding')
 
-        async with self.client:
-            resp = await self.client.withdraw(ccy, amount, address, params={
-                "network": network
-            })
-            self.logger_msg(f'withdraw resp: {resp}', 'debug')
+            if not balance or balance < amount:
+                self.logger_msg(
+                    f'Exchange balance less than amount! balance: {balance} {ccy}, amount: {amount} {ccy}', 'error'
+                )
+                return None
+
+        resp = await self.client.withdraw(ccy, amount, address, params={
+            "network": network
+        })
+        self.logger_msg(f'withdraw resp: {resp}', 'debug')
+        return resp
 
     @retry(NUMBER_OF_RETRIES, (PermissionDenied, RequestTimeout, ExchangeError, RateLimitExceeded))
     async def get_free_balance(
             self, ccy, balance_type: Literal['fund', 'unified', 'funding', 'trading']
     ) -> float | None:
-        async with self.client:
-            free_balance = await self.client.fetch_free_balance(params={'type': balance_type})
-            self.logger_msg(f"[{ccy}] | [{balance_type}] free_balance: {free_balance}", 'debug')
+        free_balance = await self.client.fetch_free_balance(params={'type': balance_type})
+        self.logger_msg(f"[{ccy}] | [{balance_type}] free_balance: {free_balance}", 'debug')
 
-            free_token_balance = free_balance.get(ccy)
-            return free_token_balance
+        free_token_balance = free_balance.get(ccy)
+        return free_token_balance
 
     async def transfer_from_spot_to_funding(self, ccy: str = 'ETH'):
-
-        await asyncio.sleep(5)
-
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
@@ -76,53 +174,105 @@ class OKXExchange(Logger):
 
         self.logger_msg(msg=f"Main trading account balance: {balance} {ccy}")
 
-        async with self.client:
-            await self.client.transfer(ccy, balance, 'trading', 'funding')
+        await self.client.transfer(ccy, balance, 'trading', 'funding')
 
         self.logger_msg(msg=f"Transfer {balance} {ccy} to funding account complete", type_msg='success')
 
-    async def transfer_from_sub_accounts(self, ccy: str = 'ETH', amount: float = None, silent_mode: bool = False):
+    async def get_sub_account_balance(self, sub_name: str, ccy: str) -> float:
+        params = {
+            'subAcct': sub_name,
+            'ccy': ccy
+        }
+        sub_balance = await self.client.private_get_asset_subaccount_balances(params)
+        if not sub_balance or not sub_balance.get('data'):
+            return 0.0
+
+        return float(sub_balance['data'][0]['availBal'])
+
+    async def transfer_from_sub_account(self, sub_name: str, ccy: str, amount: float):
+        params = {
+            "ccy": ccy,
+            "type": "2",
+            "amt": f"{amount:.10f}",
+            "from": "6",
+            "to": "6",
+            "subAcct": sub_name
+        }
+        await self.client.privatePostAssetTransfer(params)
+        self.logger_msg(msg=f"{sub_name} | Transfer {amount:.8f} {ccy} to main account complete", type_msg='success')
+
+    async def transfer_from_sub_accounts(
+            self, ccy: str = 'ETH', amount: float = None, silent_mode: bool = False
+    ) -> bool:
+        """
+        Collects ccy from all sub-accounts to the main funding account, sub-accounts are requested concurrently
+        :param ccy:
+        :param amount: transferred from each sub-account having at least this amount, whole balance if None
+        :param silent_mode:
+        :return: True if all the sub-accounts are collected
+        """
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
         if not silent_mode:
             self.logger_msg(msg=f'Checking subAccounts balance')
 
-        async with self.client:
-            sub_list = await self.client.private_get_users_subaccount_list()
-
-        await asyncio.sleep(1)
-        for sub_data in sub_list['data']:
-            sub_name = sub_data['subAcct']
-
-            async with self.client:
-                params = {
-                    'subAcct': sub_name,
-                    'ccy': ccy
-                }
-                sub_balance = await self.client.private_get_asset_subaccount_balances(params)
-                if sub_balance:
-                    sub_balance = float(sub_balance['data'][0]['availBal'])
-
-            await asyncio.sleep(1)
-            amount = amount if amount else sub_balance
-            if sub_balance == amount and sub_balance != 0.0:
+        sub_list = await self.client.private_get_users_subaccount_list()
+        sub_names = [sub_data['subAcct'] for sub_data in sub_list['data']]
+        # Requests are also paced by the exchange host rate limit
+        semaphore = asyncio.Semaphore(SUB_SWEEP_CONCURRENCY)
+
+        async def sweep(sub_name: str) -> float:
+            async with semaphore:
+                sub_balance = await self.get_sub_account_balance(sub_name, ccy)
+                transfer_amount = sub_balance if amount is None else amount
+                if sub_balance == 0.0 or sub_balance < transfer_amount:
+                    return 0.0
+
                 self.logger_msg(msg=f'{sub_name} | subAccount balance : {sub_balance:.8f} {ccy}')
-                async with self.client:
-                    params = {
-                        "ccy": ccy,
-                        "type": "2",
-                        "amt": f"{amount:.10f}",
-                        "from": "6",
-                        "to": "6",
-                        "subAcct": sub_name
-                    }
-                    await self.client.privatePostAssetTransfer(params)
-                self.logger_msg(msg=f"Transfer {amount:.8f} {ccy} to main account complete", type_msg='success')
+                await self.transfer_from_sub_account(sub_name, ccy, transfer_amount)
+                return transfer_amount
+
+        # All the sweeps finish before return, failed sub-account does not leave the others running in background
+        results = await asyncio.gather(*[sweep(sub_name) for sub_name in sub_names], return_exceptions=True)
+        transferred, failed = 0.0, 0
+        for sub_name, result in zip(sub_names, results):
+            if isinstance(result, Exception):
+                self.logger_msg(f'{sub_name} | Error collecting {ccy} from subAccount: {result}', 'error')
+                failed += 1
+            else:
+                transferred += result
+
+        self.logger_msg(
+            f'Collected {transferred:.8f} {ccy} from {len(sub_names) - failed}/{len(sub_names)} subAccounts', 'debug'
+        )
+        return not failed
 
     async def transfer_from_subs(self, ccy, amount: float = None, silent_mode: bool = False):
-        if COLLECT_FROM_SUB_CEX:
-            await self.transfer_from_sub_accounts(ccy=ccy, amount=amount, silent_mode=silent_mode)
-            return await self.transfer_from_spot_to_funding(ccy=ccy)
+        """
+        Collects ccy from sub-accounts and main trading account to the main funding account,
+        back-to-back withdrawals skip both within SUB_SWEEP_CACHE_TTL
+        :param ccy:
+        :param amount:
+        :param silent_mode:
+        :return:
+        """
+        if not COLLECT_FROM_SUB_CEX:
+            return True
+
+        swept_at = self.sweeps.get(ccy)
+        if swept_at is not None and time.monotonic() - swept_at < SUB_SWEEP_CACHE_TTL:
+            self.logger_msg(f'{ccy} was collected {time.monotonic() - swept_at:.0f} second ago', 'debug')
+            return True
+
+        collected = await self.transfer_from_sub_accounts(ccy=ccy, amount=amount, silent_mode=silent_mode)
+        await self.transfer_from_spot_to_funding(ccy=ccy)
+        # Failed sub-accounts are collected again by the next withdrawal
+        if collected:
+            self.sweeps[ccy] = time.monotonic()
 
         return True
+
+
+# One exchange session for the whole run, shared by all the accounts
+OKX_EXCHANGE = OKXExchange(OKX_API_KEY, OKX_API_SECRET, OKX_API_PASS_PHRASE, OKX_PROXY)
@@ -144,7 +144,7 @@ def get_y(
 
         dy = Decimal(0)
         if k < xy:
-            dy = xy - k / d_stable(x0, y) + 1
+            dy = (xy - k) / d_stable(x0, y) + 1
             y += dy
         else:
             dy = (k - xy) / d_stable(x0, y)
@@ -158,6 +158,107 @@ def get_y(
     return y
 
 
+ONE_E_8 = 10 ** 8
+
+
+def lp_value_u256(x_coin: int, x_scale: int, y_coin: int, y_scale: int) -> int:
+    """
+    Integer version of lp_value, mirrors on-chain stable curve u256 math
+    :param x_coin:
+    :param x_scale:
+    :param y_coin:
+    :param y_scale:
+    :return:
+    """
+    x = x_coin * ONE_E_8 // x_scale
+    y = y_coin * ONE_E_8 // y_scale
+    a = x * y
+    b = x * x + y * y
+
+    return a * b
+
+
+def d_stable_u256(x0: int, y: int) -> int:
+    return 3 * x0 * y * y + x0 * x0 * x0
+
+
+def f_u256(x0: int, y: int) -> int:
+    return x0 * y * y * y + x0 * x0 * x0 * y
+
+
+def get_y_u256(x0: int, xy: int, y: int) -> int:
+    """
+    Integer version of get_y, Newton method with floor division as on chain
+    :param x0:
+    :param xy:
+    :param y:
+    :return:
+    """
+    for _ in range(255):
+        k = f_u256(x0, y)
+
+        if k < xy:
+            dy = (xy - k) // d_stable_u256(x0, y) + 1
+            y += dy
+        else:
+            dy = (k - xy) // d_stable_u256(x0, y)
+            y -= dy
+
+        if dy <= 1:
+            return y
+
+    return y
+
+
+def coin_out_u256(coin_in: int, scale_in: int, scale_out: int, reserve_in: int, reserve_out: int) -> int:
+    """
+    Integer version of coin_out
+    :param coin_in:
+    :param scale_in:
+    :param scale_out:
+    :param reserve_in:
+    :param reserve_out:
+    :return:
+    """
+    xy = lp_value_u256(reserve_in, scale_in, reserve_out, scale_out)
+
+    reserve_in_scaled = reserve_in * ONE_E_8 // scale_in
+    reserve_out_scaled = reserve_out * ONE_E_8 // scale_out
+    amount_in = coin_in * ONE_E_8 // scale_in
+    total_reserve = amount_in + reserve_in_scaled
+    y = reserve_out_scaled - get_y_u256(total_reserve, xy, reserve_out_scaled)
+
+    return y * scale_out // ONE_E_8
+
+
+def get_coins_out_with_fees_stable_u256(
+        coin_in: int,
+        reserve_in: int,
+        reserve_out: int,
+        scale_in: int,
+        scale_out: int,
+        fee: int,
+        fee_scale: int = 10000,
+) -> int:
+    """
+    Integer version of get_coins_out_with_fees_stable, fee rounding as in the router
+    :param coin_in:
+    :param reserve_in:
+    :param reserve_out:
+    :param scale_in:
+    :param scale_out:
+    :param fee:
+    :param fee_scale:
+    :return:
+    """
+    coin_in_val_scaled = coin_in * (fee_scale - fee)
+    coin_in_val_after_fees = coin_in_val_scaled // fee_scale
+    if coin_in_val_scaled % fee_scale != 0:
+        coin_in_val_after_fees += 1
+
+    return coin_out_u256(coin_in_val_after_fees, scale_in, scale_out, reserve_in, reserve_out)
+
+
 def d(value=None) -> Decimal:
     if isinstance(value, Decimal):
         return value
@@ -282,6 +383,15 @@ if __name__ == '__main__':
         scale_out=Decimal(100000000),
         fee=d(5)
     )
+    out_u256 = get_coins_out_with_fees_stable_u256(
+        coin_in=100000000,
+        reserve_in=33345610000,
+        reserve_out=575625000000,
+        scale_in=1000000,
+        scale_out=100000000,
+        fee=5
+    )
+    print(out_, out_u256)
     liq_ = get_optimal_liquidity_amount(
         x_desired=Decimal(180000000),
         x_reserve=Decimal(1899881601400),
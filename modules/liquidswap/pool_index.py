@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+
+from aptos_sdk.async_client import RestClient, ResourceNotFound
+
+from core.config import TOKENS_INFO
+from modules.liquidswap.config import POOLS_INFO
+from settings import POOL_INDEX_PATH, POOL_INDEX_REFRESH_HOURS
+from utils.log import Logger
+
+
+@dataclass
+class PoolIndexEntry:
+    version: str
+    curve: str
+    coin_x: str
+    coin_y: str
+
+
+class PoolIndex(Logger):
+    """
+    On-disk index of existing LiquidSwap pools for each token pair of TOKENS_INFO,
+    with the coin ordering used on chain
+    """
+    def __init__(self, path: str = POOL_INDEX_PATH, refresh_hours: float = POOL_INDEX_REFRESH_HOURS):
+        Logger.__init__(self)
+        self.path = path
+        self.refresh_hours = refresh_hours
+        self.updated_at: float | None = None
+        self.pools: dict[str, list[PoolIndexEntry]] = {}
+
+    @staticmethod
+    def get_pair_key(coin_x_address: str, coin_y_address: str) -> str:
+        return '|'.join(sorted((coin_x_address, coin_y_address)))
+
+    @staticmethod
+    def get_pool_resource_type(version: str, curve: str, coin_x_address: str, coin_y_address: str) -> str:
+        router_address = POOLS_INFO[version]['router_address']
+        return f"{router_address}::liquidity_pool::LiquidityPool" \
+               f"<{coin_x_address}, {coin_y_address}, " \
+               f"{router_address}::curves::{curve}>"
+
+    def is_expired(self) -> bool:
+        if self.updated_at is None:
+            return True
+
+        return time.time() - self.updated_at > self.refresh_hours * 3600
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+
+            self.updated_at = data['updated_at']
+            self.pools = {
+                pair_key: [PoolIndexEntry(**entry) for entry in entries]
+                for pair_key, entries in data['pools'].items()
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            self.logger_msg(f'Pool index file {self.path} is broken: {e}', 'warning')
+            return False
+
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        data = {
+            'updated_at': self.updated_at,
+            'pools': {
+                pair_key: [asdict(entry) for entry in entries]
+                for pair_key, entries in self.pools.items()
+            }
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    async def _probe_pool(
+            self,
+            client: RestClient,
+            version: str,
+            curve: str,
+            coin_x_address: str,
+            coin_y_address: str
+    ) -> PoolIndexEntry | None:
+        """
+        Checks both coin orderings of the pool
+        :param client:
+        :param version:
+        :param curve:
+        :param coin_x_address:
+        :param coin_y_address:
+        :return: pool entry in on chain ordering or None if pool does not exist
+        """
+        resource_address = POOLS_INFO[version]['resource_address']
+        for x_address, y_address in ((coin_x_address, coin_y_address), (coin_y_address, coin_x_address)):
+            try:
+                await client.account_resource(
+                    resource_address,
+                    self.get_pool_resource_type(version, curve, x_address, y_address)
+                )
+                return PoolIndexEntry(version=version, curve=curve, coin_x=x_address, coin_y=y_address)
+            except ResourceNotFound:
+                continue
+
+        return None
+
+    async def build(self, client: RestClient):
+        """
+        Probes every version and curve of POOLS_INFO for every token pair of TOKENS_INFO
+        :param client:
+        :return:
+        """
+        self.logger_msg('Building pool index')
+        pools = {}
+        for coin_x_address, coin_y_address in itertools.combinations(TOKENS_INFO.values(), 2):
+            probes = [
+                self._probe_pool(client, version, curve, coin_x_address, coin_y_address)
+                for version, pool_info in POOLS_INFO.items()
+                for curve in pool_info['types']
+            ]
+            results = await asyncio.gather(*probes, return_exceptions=True)
+
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                # Pair stays unindexed, swaps fall back to probing it on the fly
+                self.logger_msg(f'Pool index: failed to probe {coin_x_address} / {coin_y_address}: {errors[0]}', 'error')
+                continue
+
+            pools[self.get_pair_key(coin_x_address, coin_y_address)] = [
+                result for result in results if result is not None
+            ]
+
+        self.pools = pools
+        self.updated_at = time.time()
+        self.save()
+        self.logger_msg(f'Pool index saved to {self.path}, pairs: {len(self.pools)}', 'success')
+
+    async def load_or_build(self, client: RestClient):
+        if self.load() and not self.is_expired():
+            self.logger_msg(f'Pool index loaded from {self.path}', 'debug')
+            return
+
+        await self.build(client)
+
+    def get_pools(self, coin_x_address: str, coin_y_address: str) -> list[PoolIndexEntry] | None:
+        """
+        Gets existing pools of the pair
+        :param coin_x_address:
+        :param coin_y_address:
+        :return: list of pools or None if pair is not indexed
+        """
+        return self.pools.get(self.get_pair_key(coin_x_address, coin_y_address))
+
+
+POOL_INDEX = PoolIndex()
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from aptos_sdk.async_client import ResourceNotFound
+
+from core.client import AptosCustomRestClient
+from core.config import TOKENS_INFO
+from modules.liquidswap.config import POOLS_INFO
+from modules.liquidswap.pool_index import POOL_INDEX, PoolIndexEntry
+from modules.liquidswap.quote import PoolSnapshot
+import settings
+from utils.log import Logger
+
+
+@dataclass
+class PoolState:
+    pool: PoolIndexEntry
+    reserve_x: int
+    reserve_y: int
+    fee: int
+    updated_at: float
+
+
+class PoolStateService(Logger):
+    """
+    Run-level in-memory snapshot of pool reserves for the configured token pairs, shared by all accounts
+    """
+    def __init__(
+            self,
+            refresh_interval: float = settings.POOL_STATE_REFRESH_INTERVAL,
+            max_staleness: float = settings.POOL_STATE_MAX_STALENESS
+    ):
+        Logger.__init__(self)
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.client: AptosCustomRestClient | None = None
+        self.states: dict[tuple[str, str, str], PoolState] = {}
+        self.refresh_event: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_pairs() -> list[tuple[str, str]]:
+        input_address = TOKENS_INFO[settings.TOKEN_SWAP_INPUT]
+        return [
+            (input_address, TOKENS_INFO[token])
+            for token in settings.TOKENS_SWAP_OUTPUT
+            if TOKENS_INFO[token] != input_address
+        ]
+
+    async def _refresh_pool(self, pool: PoolIndexEntry):
+        resource_type = POOL_INDEX.get_pool_resource_type(pool.version, pool.curve, pool.coin_x, pool.coin_y)
+        try:
+            resource_data = await self.client.account_resource(
+                POOLS_INFO[pool.version]['resource_address'],
+                resource_type,
+                use_cache=False
+            )
+        except ResourceNotFound:
+            self.logger_msg(f'Pool {pool.version} {pool.curve} {pool.coin_x} / {pool.coin_y} not found', 'debug')
+            return
+        except Exception as e:
+            self.logger_msg(f'Error refreshing pool {pool.version} {pool.curve}: {e}', 'debug')
+            return
+
+        key = (pool.version, pool.curve, POOL_INDEX.get_pair_key(pool.coin_x, pool.coin_y))
+        self.states[key] = PoolState(
+            pool=pool,
+            reserve_x=int(resource_data["data"]["coin_x_reserve"]["value"]),
+            reserve_y=int(resource_data["data"]["coin_y_reserve"]["value"]),
+            fee=int(resource_data["data"]["fee"]),
+            updated_at=time.monotonic()
+        )
+
+    async def refresh(self):
+        pools = []
+        for coin_x_address, coin_y_address in self.get_pairs():
+            indexed_pools = POOL_INDEX.get_pools(coin_x_address, coin_y_address)
+            if indexed_pools:
+                pools.extend(indexed_pools)
+
+        await asyncio.gather(*[self._refresh_pool(pool) for pool in pools])
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.refresh_event.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.refresh_event.clear()
+            await self.refresh()
+
+    async def start(self, client: AptosCustomRestClient):
+        self.client = client
+        self.refresh_event = asyncio.Event()
+        await self.refresh()
+        self.task = asyncio.create_task(self._run())
+        self.logger_msg(f'Pool state service started, pools: {len(self.states)}', 'debug')
+
+    async def stop(self):
+        if self.task is None:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def request_refresh(self):
+        """
+        Refreshes reserves without waiting for the interval, called after own swap lands
+        :return:
+        """
+        if self.refresh_event is not None:
+            self.refresh_event.set()
+
+    def get_snapshot(
+            self,
+            pool_version: str,
+            pool_type: str,
+            coin_x_address: str,
+            coin_y_address: str,
+            coin_x_decimals: int,
+            coin_y_decimals: int
+    ) -> PoolSnapshot | None:
+        """
+        Gets pool snapshot for coin_x -> coin_y swap from memory
+        :param pool_version:
+        :param pool_type:
+        :param coin_x_address:
+        :param coin_y_address:
+        :param coin_x_decimals:
+        :param coin_y_decimals:
+        :return: snapshot or None if pool is unknown or its state is older than max staleness
+        """
+        state = self.states.get((pool_version, pool_type, POOL_INDEX.get_pair_key(coin_x_address, coin_y_address)))
+        if state is None or time.monotonic() - state.updated_at > self.max_staleness:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if state.pool.coin_x == coin_x_address:
+            reserve_in, reserve_out = state.reserve_x, state.reserve_y
+        else:
+            reserve_in, reserve_out = state.reserve_y, state.reserve_x
+
+        return PoolSnapshot(
+            version=pool_version,
+            curve=pool_type,
+            reserve_in=reserve_in,
+            reserve_out=reserve_out,
+            scale_in=10 ** coin_x_decimals,
+            scale_out=10 ** coin_y_decimals,
+            fee=state.fee
+        )
+
+    def stats(self) -> dict:
+        return {
+            'pools': len(self.states),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+POOL_STATE = PoolStateService()
@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from modules.liquidswap.math import ONE_E_8
+
+INT64_MAX = np.iinfo(np.int64).max
+
+
+@dataclass
+class PoolSnapshot:
+    version: str
+    curve: str
+    reserve_in: int
+    reserve_out: int
+    scale_in: int
+    scale_out: int
+    fee: int
+
+
+def _as_int_array(values: Sequence[int] | np.ndarray) -> np.ndarray:
+    """
+    Converts amounts to exact integer array, object dtype keeps python ints without overflow
+    :param values:
+    :return:
+    """
+    return np.array([int(value) for value in values], dtype=object)
+
+
+def quote_uncorrelated(amounts: np.ndarray, pool: PoolSnapshot) -> np.ndarray:
+    """
+    Vectorized get_coins_out_with_fees for many input amounts against one pool
+    :param amounts: exact integer array of input amounts
+    :param pool:
+    :return:
+    """
+    fee_scale = 10000
+    fee_multiplier = fee_scale - (pool.fee + 1)
+    max_amount = int(amounts.max()) if len(amounts) else 0
+    max_after_fees = max_amount * fee_multiplier
+
+    # int64 is enough while every intermediate product fits, otherwise fall back to python ints
+    fits_int64 = (
+        max_after_fees * pool.reserve_out <= INT64_MAX
+        and pool.reserve_in * fee_scale + max_after_fees <= INT64_MAX
+    )
+    if fits_int64:
+        amounts = amounts.astype(np.int64)
+
+    coin_in_val_after_fees = amounts * fee_multiplier
+    new_reserve_in = pool.reserve_in * fee_scale + coin_in_val_after_fees
+
+    return (coin_in_val_after_fees * pool.reserve_out // new_reserve_in).astype(object)
+
+
+def get_y_batch(x0: np.ndarray, xy: int, y: int) -> np.ndarray:
+    """
+    Batched get_y_u256, every element iterates until its own Newton step is <= 1
+    :param x0: exact integer array of total reserves in
+    :param xy: pool lp value
+    :param y: initial reserve out
+    :return:
+    """
+    y = np.full(len(x0), y, dtype=object)
+    active = np.arange(len(x0))
+
+    for _ in range(255):
+        if not len(active):
+            break
+
+        x = x0[active]
+        y_active = y[active]
+        k = x * y_active * y_active * y_active + x * x * x * y_active
+        d = 3 * x * y_active * y_active + x * x * x
+
+        below = k < xy
+        dy = np.where(below, (xy - k) // d + 1, (k - xy) // d)
+        y[active] = np.where(below, y_active + dy, y_active - dy)
+
+        active = active[dy > 1]
+
+    return y
+
+
+def quote_stable(amounts: np.ndarray, pool: PoolSnapshot, fee_scale: int = 10000) -> np.ndarray:
+    """
+    Vectorized get_coins_out_with_fees_stable_u256 for many input amounts against one pool
+    :param amounts: exact integer array of input amounts
+    :param pool:
+    :param fee_scale:
+    :return:
+    """
+    coin_in_val_scaled = amounts * (fee_scale - pool.fee)
+    coin_in_val_after_fees = coin_in_val_scaled // fee_scale + (coin_in_val_scaled % fee_scale != 0)
+
+    reserve_in_scaled = pool.reserve_in * ONE_E_8 // pool.scale_in
+    reserve_out_scaled = pool.reserve_out * ONE_E_8 // pool.scale_out
+    xy = reserve_in_scaled * reserve_out_scaled * (
+            reserve_in_scaled * reserve_in_scaled + reserve_out_scaled * reserve_out_scaled
+    )
+
+    amount_in_scaled = coin_in_val_after_fees * ONE_E_8 // pool.scale_in
+    total_reserve = amount_in_scaled + reserve_in_scaled
+    y = reserve_out_scaled - get_y_batch(total_reserve, xy, reserve_out_scaled)
+
+    return y * pool.scale_out // ONE_E_8
+
+
+def quote_matrix(amounts: Sequence[int] | np.ndarray, pools: Sequence[PoolSnapshot]) -> np.ndarray:
+    """
+    Calculates output of every input amount in every pool
+    :param amounts: input amounts in wei
+    :param pools: pool reserve snapshots
+    :return: object array of python ints with shape (len(pools), len(amounts))
+    """
+    amounts = _as_int_array(amounts)
+    result = np.empty((len(pools), len(amounts)), dtype=object)
+
+    for i, pool in enumerate(pools):
+        match pool.curve:
+            case 'Stable':
+                result[i] = quote_stable(amounts, pool)
+            case 'Uncorrelated':
+                result[i] = quote_uncorrelated(amounts, pool)
+            case _:
+                raise ValueError(f'Unknown pool curve: {pool.curve}')
+
+    return result
+
+
+if __name__ == '__main__':
+    import random
+    import timeit
+
+    from modules.liquidswap.math import get_coins_out_with_fees_stable, get_coins_out_with_fees, d
+
+    bench_pools = [
+        PoolSnapshot('v0', 'Stable', 33345610000, 575625000000, 10 ** 6, 10 ** 8, 5),
+        PoolSnapshot('v0', 'Uncorrelated', 574779000000, 33407640000, 10 ** 8, 10 ** 6, 30),
+        PoolSnapshot('v0.5', 'Stable', 33000000000, 576000000000, 10 ** 6, 10 ** 8, 4),
+        PoolSnapshot('v0.5', 'Uncorrelated', 570000000000, 33500000000, 10 ** 8, 10 ** 6, 25),
+    ]
+    bench_amounts = [random.randint(10 ** 6, 10 ** 10) for _ in range(100)]
+
+    def decimal_per_call():
+        for bench_pool in bench_pools:
+            for bench_amount in bench_amounts:
+                if bench_pool.curve == 'Stable':
+                    get_coins_out_with_fees_stable(
+                        coin_in=d(bench_amount),
+                        reserve_in=d(bench_pool.reserve_in),
+                        reserve_out=d(bench_pool.reserve_out),
+                        scale_in=d(bench_pool.scale_in),
+                        scale_out=d(bench_pool.scale_out),
+                        fee=d(bench_pool.fee)
+                    )
+                else:
+                    get_coins_out_with_fees(
+                        coin_in_val=d(bench_amount),
+                        reserve_in=d(bench_pool.reserve_in),
+                        reserve_out=d(bench_pool.reserve_out),
+                        fee=d(bench_pool.fee)
+                    )
+
+    number = 10
+    decimal_time = timeit.timeit(decimal_per_call, number=number) / number
+    matrix_time = timeit.timeit(lambda: quote_matrix(bench_amounts, bench_pools), number=number) / number
+    print(
+        f'{len(bench_pools)} pools x {len(bench_amounts)} amounts: '
+        f'decimal per call {decimal_time * 1000:.2f} ms, quote_matrix {matrix_time * 1000:.2f} ms'
+    )
@@ -10,14 +10,21 @@ from aptos_sdk.type_tag import TypeTag, StructTag
 
 import settings
 from core.base import ModuleBase
-from core.config import NUMBER_OF_RETRIES, TOKENS_INFO
+from core.config import NUMBER_OF_RETRIES, TOKENS_INFO, AIRDROP_API_URL
 from core.contracts import TokenBase
+from core.deposits import DEPOSIT_WATCHER
+from core.enums import JournalStepStatus
+from core.journal import AccountJournal
+from core.metrics import METRICS, timed
 from core.models import TransactionPayloadData
-from modules.exchange.okx import OKXExchange
+from modules.exchange.funding import FUNDING_PLANNER
+from modules.exchange.okx import OKX_EXCHANGE
 from modules.liquidswap.config import POOLS_INFO
 from modules.liquidswap.decorators import swap_retry, retry
 from modules.liquidswap.exceptions import BuildTransactionError, DashboardRegistrationError
-from modules.liquidswap.math import get_coins_out_with_fees_stable, d, get_coins_out_with_fees
+from modules.liquidswap.pool_index import POOL_INDEX
+from modules.liquidswap.pool_state import POOL_STATE
+from modules.liquidswap.quote import PoolSnapshot, quote_matrix
 
 
 class LiquidSwapSwap(ModuleBase):
@@ -25,7 +32,8 @@ class LiquidSwapSwap(ModuleBase):
             self,
             account: Account,
             cex_address: str,
-            proxy: str = None
+            proxy: str = None,
+            journal: AccountJournal | None = None
     ):
         proxies = {
             'http://': proxy.strip(),
@@ -35,13 +43,13 @@ class LiquidSwapSwap(ModuleBase):
         super().__init__(
             account=account,
             cex_address=cex_address,
-            proxies=proxies
+            proxies=proxies,
+            journal=journal
         )
 
         self.account = account
 
         self.router_address = None
-        self.resource_data = None
         self.pool_type = None
         self.pool_version = None
         self.swap_address = None
@@ -50,100 +58,106 @@ class LiquidSwapSwap(ModuleBase):
             self,
             pool_type: str,
             resource_address: AccountAddress,
-            router_address: AccountAddress
-    ) -> dict | None:
-        res_payload = f"{router_address}::liquidity_pool::LiquidityPool" \
-                      f"<{self.coin_x.contract_address}, {self.coin_y.contract_address}, " \
-                      f"{router_address}::curves::{pool_type}>"
-
-        resource_data = await self.get_token_reserve(
-            resource_address=resource_address,
-            payload=res_payload
-        )
-
-        if resource_data is not None:
-            self.resource_data = resource_data
-
-            reserve_x = resource_data["data"]["coin_x_reserve"]["value"]
-            reserve_y = resource_data["data"]["coin_y_reserve"]["value"]
-
-            return {
-                self.coin_x.contract_address: reserve_x,
-                self.coin_y.contract_address: reserve_y
-            }
-
-        else:
-
+            router_address: AccountAddress,
+            is_reversed: bool | None = None,
+            use_cache: bool = True
+    ) -> tuple[dict, int] | None:
+        """
+        Gets reserves and fee of the pool, fee is returned, not kept on the module: pools are read concurrently
+        :param pool_type:
+        :param resource_address:
+        :param router_address:
+        :param is_reversed:
+        :param use_cache:
+        :return: reserve by token contract address and pool fee
+        """
+        # Ordering is known from the pool index, otherwise both orderings are probed
+        orderings = (False, True) if is_reversed is None else (is_reversed,)
+        for reverse in orderings:
+            coin_x, coin_y = (self.coin_y, self.coin_x) if reverse else (self.coin_x, self.coin_y)
             res_payload = f"{router_address}::liquidity_pool::LiquidityPool" \
-                          f"<{self.coin_y.contract_address}, {self.coin_x.contract_address}, " \
+                          f"<{coin_x.contract_address}, {coin_y.contract_address}, " \
                           f"{router_address}::curves::{pool_type}>"
 
-            reversed_data = await self.get_token_reserve(
+            resource_data = await self.get_token_reserve(
                 resource_address=resource_address,
-                payload=res_payload
+                payload=res_payload,
+                use_cache=use_cache
             )
-            if reversed_data is None:
-                self.logger_msg(f"Error getting token pair reserve (reverse), {pool_type} pool", 'debug')
-                return None
+            if resource_data is None:
+                continue
 
-            self.resource_data = reversed_data
-            reserve_x = reversed_data["data"]["coin_x_reserve"]["value"]
-            reserve_y = reversed_data["data"]["coin_y_reserve"]["value"]
+            reserve_x = resource_data["data"]["coin_x_reserve"]["value"]
+            reserve_y = resource_data["data"]["coin_y_reserve"]["value"]
 
             return {
-                self.coin_x.contract_address: reserve_y,
-                self.coin_y.contract_address: reserve_x
-            }
+                coin_x.contract_address: reserve_x,
+                coin_y.contract_address: reserve_y
+            }, int(resource_data["data"]["fee"])
+
+        self.logger_msg(f"Error getting token pair reserve, {pool_type} pool", 'debug')
+        return None
 
-    async def get_amount_in(
+    async def get_pool_snapshot(
             self,
+            pool_version: str,
             pool_type: Literal['Stable', 'Uncorrelated'],
-            resource_address: AccountAddress,
-            router_address: AccountAddress,
-            amount_out: int,
             coin_x_address: str,
             coin_y_address: str,
             coin_x_decimals: int,
-            coin_y_decimals: int
-    ) -> int | None:
-        tokens_reserve: dict = await self.get_token_pair_reserve(
+            coin_y_decimals: int,
+            is_reversed: bool | None = None,
+            fresh: bool = False
+    ) -> PoolSnapshot | None:
+        if not fresh:
+            snapshot = POOL_STATE.get_snapshot(
+                pool_version, pool_type, coin_x_address, coin_y_address, coin_x_decimals, coin_y_decimals
+            )
+            if snapshot is not None:
+                return snapshot
+
+        pool_info = POOLS_INFO[pool_version]
+        pair_reserve = await self.get_token_pair_reserve(
             pool_type=pool_type,
-            resource_address=resource_address,
-            router_address=router_address
+            resource_address=pool_info['resource_address'],
+            router_address=pool_info['router_address'],
+            is_reversed=is_reversed,
+            use_cache=not fresh
         )
-        if tokens_reserve is None:
+        if pair_reserve is None:
             return None
 
-        reserve_x = int(tokens_reserve[coin_x_address])
-        reserve_y = int(tokens_reserve[coin_y_address])
+        tokens_reserve, pool_fee = pair_reserve
 
-        if reserve_x is None or reserve_y is None:
-            return None
-
-        pool_fee = int(self.resource_data["data"]["fee"])
-
-        match pool_type:
-            case 'Stable':
-                amount_in = int(get_coins_out_with_fees_stable(
-                    coin_in=d(amount_out),
-                    reserve_in=d(reserve_x),
-                    reserve_out=d(reserve_y),
-                    scale_in=d(pow(10, coin_x_decimals)),
-                    scale_out=d(pow(10, coin_y_decimals)),
-                    fee=d(pool_fee)
-                ))
-            case 'Uncorrelated':
-                amount_in = int(get_coins_out_with_fees(
-                    coin_in_val=d(amount_out),
-                    reserve_in=d(reserve_x),
-                    reserve_out=d(reserve_y),
-                    fee=d(pool_fee)
-                ))
-            case _:
-                amount_in = None
-
-        return amount_in
+        return PoolSnapshot(
+            version=pool_version,
+            curve=pool_type,
+            reserve_in=int(tokens_reserve[coin_x_address]),
+            reserve_out=int(tokens_reserve[coin_y_address]),
+            scale_in=10 ** coin_x_decimals,
+            scale_out=10 ** coin_y_decimals,
+            fee=pool_fee
+        )
 
+    def get_candidate_pools(self) -> list[tuple[str, str, bool | None]]:
+        """
+        Gets pools to quote for coin_x / coin_y pair
+        :return: list of (pool version, pool type, is pool ordering reversed to coin_x / coin_y or None if unknown)
+        """
+        indexed_pools = POOL_INDEX.get_pools(self.coin_x.contract_address, self.coin_y.contract_address)
+        if indexed_pools is None:
+            return [
+                (pool_version, pool_type, None)
+                for pool_version, pool_info in POOLS_INFO.items()
+                for pool_type in pool_info['types']
+            ]
+
+        return [
+            (pool.version, pool.curve, pool.coin_x != self.coin_x.contract_address)
+            for pool in indexed_pools
+        ]
+
+    @timed('quote')
     async def get_most_profitable_amount_in_and_set_pool_type(
             self,
             amount_out: int,
@@ -152,34 +166,54 @@ class LiquidSwapSwap(ModuleBase):
             coin_x_decimals: int,
             coin_y_decimals: int
     ):
-        pool_data = {}
-        tasks = []
-
-        for pool_version, pool_info in POOLS_INFO.items():
-            for pool_type in pool_info['types']:
-                resource_address = pool_info['resource_address']
-                router_address = pool_info['router_address']
-                task = asyncio.create_task(
-                    self.get_amount_in(
-                        pool_type=pool_type,
-                        resource_address=resource_address,
-                        router_address=router_address,
-                        amount_out=amount_out,
-                        coin_x_address=coin_x_address,
-                        coin_y_address=coin_y_address,
-                        coin_x_decimals=coin_x_decimals,
-                        coin_y_decimals=coin_y_decimals
-                    )
-                )
-                tasks.append((pool_version, pool_type, task))
+        candidate_pools = self.get_candidate_pools()
+        snapshots = await asyncio.gather(*[
+            self.get_pool_snapshot(
+                pool_version=pool_version,
+                pool_type=pool_type,
+                coin_x_address=coin_x_address,
+                coin_y_address=coin_y_address,
+                coin_x_decimals=coin_x_decimals,
+                coin_y_decimals=coin_y_decimals,
+                is_reversed=is_reversed
+            )
+            for pool_version, pool_type, is_reversed in candidate_pools
+        ])
+        candidates = {
+            (snapshot.version, snapshot.curve): (snapshot, is_reversed)
+            for (_, _, is_reversed), snapshot in zip(candidate_pools, snapshots)
+            if snapshot is not None
+        }
+        if not candidates:
+            self.logger_msg('No pools available for the pair', 'error')
+            return None
 
-        for pool_version, pool_type, task in tasks:
-            amount_in = await task
-            if amount_in is not None:
-                pool_data[(pool_version, pool_type)] = amount_in
+        snapshots = [snapshot for snapshot, _ in candidates.values()]
+        amounts_in = quote_matrix([amount_out], snapshots)[:, 0]
+        pool_data = {
+            (snapshot.version, snapshot.curve): int(amount_in)
+            for snapshot, amount_in in zip(snapshots, amounts_in)
+        }
 
         most_profitable_pool = max(pool_data, key=pool_data.get)
-        most_profitable_amount_in = pool_data[most_profitable_pool]
+
+        # Quote is passed as the exact min output of the swap, so the chosen pool is quoted again
+        # on the reserves read from the node right now, not on the shared or cached ones
+        fresh_snapshot = await self.get_pool_snapshot(
+            pool_version=most_profitable_pool[0],
+            pool_type=most_profitable_pool[1],
+            coin_x_address=coin_x_address,
+            coin_y_address=coin_y_address,
+            coin_x_decimals=coin_x_decimals,
+            coin_y_decimals=coin_y_decimals,
+            is_reversed=candidates[most_profitable_pool][1],
+            fresh=True
+        )
+        if fresh_snapshot is None:
+            self.logger_msg(f'Error getting reserves of {most_profitable_pool[1]} pool', 'error')
+            return None
+
+        most_profitable_amount_in = int(quote_matrix([amount_out], [fresh_snapshot])[0, 0])
 
         self.pool_version, self.pool_type = most_profitable_pool
         self.router_address = POOLS_INFO[self.pool_version]['router_address']
@@ -406,7 +440,9 @@ class LiquidSwapSwap(ModuleBase):
             return txn_hash
 
         elif isinstance(txn_payload_data.payload, dict):
-            tx_hash = await self.aptos_client.submit_transaction(self.account, txn_payload_data.payload)
+            with METRICS.phase('submit'):
+                tx_hash = await self.aptos_client.submit_transaction(self.account, txn_payload_data.payload)
+            self.on_transaction_submitted(tx_hash)
             txn_receipt = await self.wait_for_receipt(tx_hash)
             return self.check_txn_receipt(txn_receipt, tx_hash)
 
@@ -425,10 +461,13 @@ class LiquidSwapSwap(ModuleBase):
             self.account,
             txn_payload_data,
         )
+        # Own swap moved the pool reserves
+        POOL_STATE.request_refresh()
 
         return txn_hash
 
     @retry(attempts=NUMBER_OF_RETRIES)
+    @timed('send_to_cex')
     async def send_to_cex(self, token: TokenBase):
         self.aptos_client.client_config.max_gas_amount = random.randint(*settings.GAS_LIMIT)
         balance_x_wei = await self.get_wallet_token_balance(
@@ -450,27 +489,36 @@ class LiquidSwapSwap(ModuleBase):
         }
         self.logger_msg(payload, 'debug')
         self.logger_msg(f'Send tx to cex with gas: {self.aptos_client.client_config.max_gas_amount}', 'debug')
-        tx_hash = await self.aptos_client.submit_transaction(self.account, payload)
+        with METRICS.phase('submit'):
+            tx_hash = await self.aptos_client.submit_transaction(self.account, payload)
+        self.on_transaction_submitted(tx_hash)
         txn_receipt = await self.wait_for_receipt(tx_hash)
         return self.check_txn_receipt(txn_receipt, tx_hash)
 
-    @retry(attempts=NUMBER_OF_RETRIES)
-    async def wait_for_receiving(self, token: TokenBase, old_balance_x_wei: int = 0, sleep_time: int = 60) -> bool:
-        while True:
-            decimals = await self.get_token_decimals(token_obj=token)
-            new_balance_x_wei = await self.get_wallet_token_balance(
-                wallet_address=self.account.address(),
-                token_address=token.contract_address
+    async def wait_for_receiving(self, token: TokenBase, old_balance_x_wei: int = 0) -> bool:
+        """
+        Waits for the deposit by the shared deposit watcher
+        :param token:
+        :param old_balance_x_wei: balance before the deposit
+        :return: True if deposit is received before DEPOSIT_WAIT_TIMEOUT
+        """
+        decimals = await self.get_token_decimals(token_obj=token)
+        self.logger_msg(msg=f'Waiting {token.symbol} to receive...', type_msg='warning')
+        new_balance_x_wei = await DEPOSIT_WATCHER.wait(
+            self.account.address(),
+            token.contract_address,
+            old_balance_x_wei
+        )
+        if new_balance_x_wei is None:
+            self.logger_msg(
+                msg=f'{token.symbol} was not received in {settings.DEPOSIT_WAIT_TIMEOUT} second',
+                type_msg='error'
             )
-            if new_balance_x_wei > old_balance_x_wei:
-                amount = (new_balance_x_wei - old_balance_x_wei) / 10 ** decimals
-                self.logger_msg(msg=f'{amount} {token.symbol} was received', type_msg='success')
-                return True
-            else:
-                self.logger_msg(
-                    msg=f'Still waiting {token.symbol} to receive...', type_msg='warning'
-                )
-                await asyncio.sleep(sleep_time)
+            return False
+
+        amount = (new_balance_x_wei - old_balance_x_wei) / 10 ** decimals
+        self.logger_msg(msg=f'{amount} {token.symbol} was received', type_msg='success')
+        return True
 
     @staticmethod
     def hex_to_list_int(hex_string: str) -> list[int]:
@@ -481,13 +529,14 @@ class LiquidSwapSwap(ModuleBase):
         return signature_ints
 
     @retry(attempts=NUMBER_OF_RETRIES, exceptions=(DashboardRegistrationError,))
+    @timed('dashboard_registration')
     async def dashboard_registration(
             self,
             target: str = 'ae76af25-8425-4e68-b501-a780f50bb84c',
             wallet: str = 'Petra'
     ):
-        token_url = f'https://api.airdrop.liquidswap.com/account/{self.account_address}/'
-        signature_url = 'https://api.airdrop.liquidswap.com/signature'
+        token_url = f'{AIRDROP_API_URL}/account/{self.account_address}/'
+        signature_url = f'{AIRDROP_API_URL}/signature'
         token_resp = await self.custom_client.get(token_url)
         token_data = token_resp.json()
         self.logger_msg(token_data, 'debug')
@@ -535,19 +584,19 @@ class LiquidSwapSwap(ModuleBase):
 
     async def full_swap(self) -> bool | None:
         # Execute dashboard registration for airdrop
-        await self.dashboard_registration()
-
-        swaps_limit = random.randint(*settings.SWAPS_LIMIT_RANGE)
+        if not await self.resume_step('registration'):
+            if await self.dashboard_registration():
+                self.record_step('registration')
+
+        # Resumed run keeps swaps count of the interrupted one
+        swaps_limit_record = self.get_step('swaps_limit')
+        if swaps_limit_record is not None:
+            swaps_limit = swaps_limit_record['value']
+        else:
+            swaps_limit = random.randint(*settings.SWAPS_LIMIT_RANGE)
+            self.record_step('swaps_limit', value=swaps_limit)
         success_count = 0
 
-        # withdraw from exchange
-        exchange_client = OKXExchange(
-            settings.OKX_API_KEY,
-            settings.OKX_API_SECRET,
-            settings.OKX_API_PASS_PHRASE,
-            settings.OKX_PROXY
-        )
-
         self.coin_x = TokenBase(settings.TOKEN_SWAP_INPUT, TOKENS_INFO[settings.TOKEN_SWAP_INPUT])
         balance_x_wei = await self.get_wallet_token_balance(
             wallet_address=self.account.address(),
@@ -556,46 +605,83 @@ class LiquidSwapSwap(ModuleBase):
         token_x_decimals = await self.get_token_decimals(token_obj=self.coin_x)
 
         balance_x_decimals = balance_x_wei / 10 ** token_x_decimals
-        if balance_x_decimals < settings.MIN_WALLET_BALANCE:
+        # withdraw from exchange
+        withdraw_record = self.get_step('cex_withdraw')
+        if FUNDING_PLANNER.is_planned(self.account.address()):
+            # Deposit is sent by the run funding planner
+            if not await FUNDING_PLANNER.wait_funded(self.account.address()):
+                self.logger_msg('Planned deposit from exchange failed', 'error')
+                return False
+        elif withdraw_record is not None and withdraw_record['status'] == JournalStepStatus.PENDING:
+            # Withdrawal was requested before crash, it is not requested twice
+            self.logger_msg('Withdrawal from exchange was requested in previous run, waiting for it')
+            if not await self.wait_for_receiving(self.coin_x, old_balance_x_wei=withdraw_record['old_balance_wei']):
+                return False
+            self.record_step('cex_withdraw', old_balance_wei=withdraw_record['old_balance_wei'])
+        elif (withdraw_record is None or withdraw_record['status'] == JournalStepStatus.FAILED) \
+                and balance_x_decimals < settings.MIN_WALLET_BALANCE:
             deposit_amount = round(random.uniform(*settings.DEPOSIT_LIMIT_RANGE), 4)
-            await exchange_client.withdraw('APT', 'APT', deposit_amount, address=str(self.account.address()))
-            await self.wait_for_receiving(self.coin_x, old_balance_x_wei=balance_x_wei)
+            self.record_step('cex_withdraw', JournalStepStatus.PENDING, old_balance_wei=balance_x_wei)
+            resp = await OKX_EXCHANGE.withdraw('APT', 'APT', deposit_amount, address=str(self.account.address()))
+            if resp is None:
+                # Nothing to wait for, resumed run requests the withdrawal again
+                self.logger_msg('Withdrawal from exchange failed', 'error')
+                self.record_step('cex_withdraw', JournalStepStatus.FAILED, old_balance_wei=balance_x_wei)
+                return False
+            if not await self.wait_for_receiving(self.coin_x, old_balance_x_wei=balance_x_wei):
+                return False
+            self.record_step('cex_withdraw', old_balance_wei=balance_x_wei)
 
         for i in range(1, swaps_limit + 1):
+            swap_step, reverse_swap_step = f'swap_{i}', f'reverse_swap_{i}'
+            swap_record = self.get_step(swap_step)
+
             # Initial
-            coin_y_symbol = random.choice(settings.TOKENS_SWAP_OUTPUT)
+            coin_y_symbol = swap_record['coin_y'] if swap_record else random.choice(settings.TOKENS_SWAP_OUTPUT)
             self.coin_y = TokenBase(coin_y_symbol, TOKENS_INFO[coin_y_symbol])
             await self.async_init()
 
-            self.logger_msg(
-                f'Start full_swap module. Launch {i} of {swaps_limit}. Token out: {settings.TOKEN_SWAP_INPUT}. '
-                f'Token in: {coin_y_symbol}',
-                'success'
-            )
+            is_swapped = await self.resume_step(swap_step)
+            if is_swapped:
+                # Reverse swap amount is counted from the balance before the swap
+                self.initial_balance_y_wei = swap_record['initial_balance_y_wei']
+            else:
+                self.logger_msg(
+                    f'Start full_swap module. Launch {i} of {swaps_limit}. Token out: {settings.TOKEN_SWAP_INPUT}. '
+                    f'Token in: {coin_y_symbol}',
+                    'success'
+                )
 
-            # Execute
-            txn_hash = await self.send_swap_txn()
-            if not txn_hash:
-                continue
+                # Execute
+                self.begin_step(swap_step, coin_y=coin_y_symbol, initial_balance_y_wei=self.initial_balance_y_wei)
+                txn_hash = await self.send_swap_txn()
+                if not txn_hash:
+                    continue
+                self.finish_step(tx_hash=txn_hash)
 
-            if settings.REVERSE_SWAP:
+            if settings.REVERSE_SWAP and not await self.resume_step(reverse_swap_step):
                 sleep_time = random.randint(*settings.SLEEP_RANGE_BETWEEN_REVERSE_SWAP)
                 self.logger_msg(f'sleeping before reverse swap: {sleep_time} second')
                 await asyncio.sleep(sleep_time)
 
+                self.begin_step(reverse_swap_step)
                 txn_hash = await self.send_swap_txn(is_reverse=True)
                 if not txn_hash:
                     continue
+                self.finish_step(tx_hash=txn_hash)
 
                 sleep_time = random.randint(*settings.SLEEP_RANGE_BETWEEN_REVERSE_SWAP)
                 self.logger_msg(f'sleeping after reverse swap: {sleep_time} second')
                 await asyncio.sleep(sleep_time)
             success_count += 1
 
-        await asyncio.sleep(random.randint(*settings.SLEEP_RANGE_BEFORE_SEND_TO_CEX))
-        txn_hash = await self.send_to_cex(self.coin_x)
-        if txn_hash:
-            self.logger_msg(f'Send token to cex success! https://explorer.aptoslabs.com/txn/{txn_hash}', 'success')
+        if not await self.resume_step('send_to_cex'):
+            await asyncio.sleep(random.randint(*settings.SLEEP_RANGE_BEFORE_SEND_TO_CEX))
+            self.begin_step('send_to_cex')
+            txn_hash = await self.send_to_cex(self.coin_x)
+            if txn_hash:
+                self.finish_step(tx_hash=txn_hash)
+                self.logger_msg(f'Send token to cex success! https://explorer.aptoslabs.com/txn/{txn_hash}', 'success')
         self.logger_msg(f'Stop full_swap module. Success count: {success_count}', 'success')
         if success_count == 0:
             return False
@@ -606,21 +692,35 @@ class LiquidSwapSwap(ModuleBase):
         self.logger_msg(f'Start only withdraw module.', 'success')
         self.coin_y = TokenBase(settings.TOKEN_SWAP_INPUT, TOKENS_INFO[settings.TOKEN_SWAP_INPUT])
         for out_token in settings.TOKENS_SWAP_OUTPUT:
+            swap_step = f'withdraw_swap_{out_token}'
+            if await self.resume_step(swap_step):
+                continue
+
             self.coin_x = TokenBase(out_token, TOKENS_INFO[out_token])
             self.logger_msg(f'out_token: {self.coin_x.symbol}', 'debug')
             self.logger_msg(f'out_token contract: {self.coin_x.contract_address}', 'debug')
             await self.async_init()
 
             # Execute
+            self.begin_step(swap_step)
             txn_hash = await self.send_swap_txn()
             if not txn_hash:
                 continue
+            self.finish_step(tx_hash=txn_hash)
             await asyncio.sleep(random.randint(10, 30))
 
+        send_to_cex_record = self.get_step('send_to_cex')
+        if await self.resume_step('send_to_cex'):
+            return send_to_cex_record.get('tx_hash')
+
         sleep_time = random.randint(*settings.SLEEP_RANGE_BEFORE_SEND_TO_CEX)
         self.logger_msg(f'Sleep before send to cex. {sleep_time} second', 'debug')
         await asyncio.sleep(sleep_time)
-        return await self.send_to_cex(self.coin_y)
+        self.begin_step('send_to_cex')
+        txn_hash = await self.send_to_cex(self.coin_y)
+        if txn_hash:
+            self.finish_step(tx_hash=txn_hash)
+        return txn_hash
 
     async def run(self) -> bool | None:
         if settings.ONLY_WITHDRAW:
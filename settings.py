@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DEBUG_MODE = os.getenv('DEBUG_MODE', 0)
+# Write log file as JSON lines with account and proxy fields (True/False)
+LOG_JSON = False
 
 # Main settings
 ONLY_WITHDRAW = False
@@ -13,6 +15,40 @@ SHUFFLE_ACCOUNTS = True
 # Limit of accounts that can be run concurrently
 SEMAPHORE_LIMIT = 3
 
+# Adaptive limit of accounts run concurrently (True/False): starts from SEMAPHORE_LIMIT, grows by one while rpc nodes are
+# healthy and is cut in half on 429, errors, timeouts or latency above the target. Limit range and adjustment interval
+ADAPTIVE_CONCURRENCY = False
+CONCURRENCY_LIMIT_RANGE = [1, 10]  # [1, 100]
+CONCURRENCY_ADJUST_INTERVAL = 30  # seconds
+CONCURRENCY_LATENCY_TARGET = 2  # seconds
+
+# Interval of logging the accounts queue depth and busy slots
+WORKER_METRICS_INTERVAL = 60  # seconds
+
+# Get balances of all the accounts by bulk requests before swaps start, and limit of concurrent requests.
+# Used by the funding planner only, adds one bulk request per account (accounts read own balances again when started)
+BALANCE_SNAPSHOT_PREFLIGHT = True
+BALANCE_SNAPSHOT_CONCURRENCY = 20
+
+# Run metrics in prometheus text format: endpoint on localhost (None to disable, shard processes listen on
+# port + shard index) and file rewritten every dump interval (None to disable)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+METRICS_DUMP_PATH = "files/metrics.prom"
+METRICS_DUMP_INTERVAL = 60  # seconds
+
+# Results of the accounts with tx hashes and timings (.jsonl or .csv), results are written in batches every flush
+# interval and synced to disk every fsync interval
+RESULTS_PATH = "files/results.jsonl"
+RESULTS_FLUSH_INTERVAL = 1  # seconds
+RESULTS_FSYNC_INTERVAL = 10  # seconds
+
+# Journal of the accounts steps, interrupted run continues from it instead of sending transactions again.
+# Journal records are written at once and synced to disk every fsync interval
+RESUME_RUN = True
+RUN_JOURNAL_PATH = "files/run_journal.jsonl"
+RUN_JOURNAL_FSYNC_INTERVAL = 1  # seconds
+
 # Limit of retries for all the actions
 NUMBER_OF_RETRIES = 5
 
@@ -49,6 +85,47 @@ EXCEL_FILE_PATH = os.getenv('EXCEL_FILE_PATH', "files/accounts.xlsx")
 # Name of page with the accounts data (if unsure, leave the option at the default)
 EXCEL_PAGE_NAME = "data"
 
+'----------------------------------------------NETWORK CONTROL--------------------------------------------------------'
+# Connections limits of the shared http clients (one client per rpc url and proxy)
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 30  # seconds
+
+# Requests are balanced over the rpc nodes: node with share of errors and 429 responses above the rate is ejected
+# for the eject time, account reads go to the node that accepted its transaction for the pin time
+RPC_EJECT_ERROR_RATE = 0.5  # 0.1 - 1
+RPC_EJECT_TIME = 30  # seconds
+RPC_READ_AFTER_WRITE_PIN = 30  # seconds
+
+# Requests per second and burst to each host, shared by all the accounts of the process (hosts not listed are not limited)
+RATE_LIMITS = {
+    "fullnode.mainnet.aptoslabs.com": [10, 20],
+    "rpc.ankr.com": [10, 20],
+    "api.airdrop.liquidswap.com": [2, 4],
+    "www.okx.com": [5, 10],
+}
+# Hosts limiting requests by ip, each proxy has own limit for them
+RATE_LIMITS_PER_PROXY = ["fullnode.mainnet.aptoslabs.com", "rpc.ankr.com", "api.airdrop.liquidswap.com"]
+
+# Lifetime of cached resources: pool reserves and wallet balances (own transactions drop balances immediately)
+POOL_RESERVE_CACHE_TTL = 3  # seconds
+COIN_STORE_CACHE_TTL = 30  # seconds
+
+# Keep reserves of the swap pools in memory for all the accounts (True/False), refresh interval and max age of reserves
+# They are used to choose the pool, reserves of the chosen pool are read from the node right before each swap
+POOL_STATE_SERVICE = True
+POOL_STATE_REFRESH_INTERVAL = 5  # seconds
+POOL_STATE_MAX_STALENESS = 15  # seconds
+
+# Transaction receipt waiting: node long-poll endpoint (True/False) and min/max delay between polls without it
+RECEIPT_LONG_POLL = True
+RECEIPT_POLL_MIN_DELAY = 0.5  # seconds
+RECEIPT_POLL_MAX_DELAY = 8  # seconds
+
+# File with existing pools of each token pair, rebuilt when older than refresh hours (delete file to force rebuild)
+POOL_INDEX_PATH = "files/pool_index.json"
+POOL_INDEX_REFRESH_HOURS = 24
+
 '----------------------------------------------EXCHANGE CONTROL--------------------------------------------------------'
 
 MIN_WALLET_BALANCE = 2
@@ -56,9 +133,27 @@ DEPOSIT_LIMIT_RANGE = [10, 15]
 SLEEP_RANGE_BEFORE_SEND_TO_CEX = [30, 60]
 WITHDRAW_PERCENT_RANGE = (90, 95)
 
+# Plan deposits of all the accounts with low balance before the run (needs BALANCE_SNAPSHOT_PREFLIGHT): exchange balance
+# is checked once, withdrawals are sent one per interval and their arrival is checked for all the addresses at once
+FUNDING_PLANNER = True
+FUNDING_WITHDRAW_INTERVAL = 10  # seconds
+
+# Deposit arrival: min/max delay between balance checks of the address and max time to wait for the deposit
+DEPOSIT_POLL_MIN_DELAY = 5  # seconds
+DEPOSIT_POLL_MAX_DELAY = 60  # seconds
+DEPOSIT_WAIT_TIMEOUT = 3600  # seconds
+
 COLLECT_FROM_SUB_CEX = True
+# Sub-accounts requested at once while collecting, and for how long collected result is reused by next withdrawals
+SUB_SWEEP_CONCURRENCY = 5
+SUB_SWEEP_CACHE_TTL = 300  # seconds
 # http://user:login@ip:port
 OKX_PROXY = os.getenv('OKX_PROXY', None)
 OKX_API_KEY = os.getenv('OKX_API_KEY', '')
 OKX_API_SECRET = os.getenv('OKX_API_SECRET', '')
 OKX_API_PASS_PHRASE = os.getenv('OKX_API_PASS_PHRASE', '')
+
+'--------------------------------------------------STAND-IN-----------------------------------------------------------'
+# Url of the local stand-in of the aptos node, okx and airdrop api (python -m stand_in), e.g. http://127.0.0.1:8080.
+# All the requests go to it instead of the real services, no real APT is spent
+STAND_IN_URL = os.getenv('STAND_IN_URL', None)
@@ -0,0 +1,120 @@
+import asyncio
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from core.client import AptosCustomRestClient
+from core.config import SEMAPHORE_LIMIT
+from core.dataclasses import ExcelAccountData
+from core.journal import RunJournal
+from core.results import ResultsWriter
+from core.transport import TRANSPORT_REGISTRY
+from modules.liquidswap.pool_index import POOL_INDEX
+import settings
+from utils.accounts import get_accounts_data
+from utils.file import clear_file, get_shard_path, merge_files
+from utils.log import Logger, get_log_path, set_log_shard, shutdown_logging
+from worker import Worker
+
+
+def get_shard_index(account_data: ExcelAccountData, shards: int) -> int:
+    # crc32 instead of hash(), it is stable between processes and launches
+    return zlib.crc32(str(account_data.name).encode('utf-8')) % shards
+
+
+def partition_accounts(accounts_data: list[ExcelAccountData], shards: int) -> list[list[ExcelAccountData]]:
+    partitions = [[] for _ in range(shards)]
+    for account_data in accounts_data:
+        partitions[get_shard_index(account_data, shards)].append(account_data)
+
+    return partitions
+
+
+def run_shard(shard_index: int, accounts_data: list[ExcelAccountData], funding_share: float) -> tuple[int, int]:
+    """
+    Entry point of the worker process, runs own event loop and connection pools
+    :param shard_index:
+    :param accounts_data:
+    :param funding_share: share of the exchange balance the funding planner of the shard may withdraw
+    :return: succeeded and failed accounts count
+    """
+    set_log_shard(shard_index)
+    try:
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    except Exception:
+        pass
+
+    worker = Worker(SEMAPHORE_LIMIT, shard_index=shard_index, funding_share=funding_share)
+    try:
+        asyncio.run(worker.start(accounts_data))
+    finally:
+        shutdown_logging()
+    return worker.succeeded, worker.failed
+
+
+class ShardsRunner(Logger):
+    def __init__(self, shards: int):
+        Logger.__init__(self)
+        self.shards = max(int(shards), 1)
+
+    @staticmethod
+    async def prepare_pool_index():
+        # Built once by the parent, so worker processes do not race writing the index file
+        try:
+            await POOL_INDEX.load_or_build(AptosCustomRestClient())
+        finally:
+            await TRANSPORT_REGISTRY.aclose()
+
+    def is_resumed(self) -> bool:
+        if not settings.RESUME_RUN:
+            return False
+
+        return any(
+            RunJournal.is_resumable(get_shard_path(settings.RUN_JOURNAL_PATH, shard_index))
+            for shard_index in range(self.shards)
+        )
+
+    def merge_results(self):
+        for path in (*ResultsWriter.get_paths().values(), get_log_path()):
+            merge_files(
+                [get_shard_path(path, shard_index) for shard_index in range(self.shards)],
+                path,
+                skip_header=path.endswith('.csv')
+            )
+
+    def start(self):
+        # Read once in the parent: encrypted file asks for password only once
+        accounts_data = get_accounts_data(
+            settings.EXCEL_FILE_PATH,
+            settings.EXCEL_PAGE_NAME,
+            ExcelAccountData,
+            encrypted=settings.EXCEL_ENCRYPTED
+        )
+        if not Worker().check_settings():
+            return
+
+        asyncio.run(self.prepare_pool_index())
+        # Shard journals depend on shards count, resumed run has to be started with the same --shards
+        if not self.is_resumed():
+            for path in ResultsWriter.get_paths().values():
+                asyncio.run(clear_file(path))
+
+        partitions = partition_accounts(accounts_data, self.shards)
+        self.logger_msg(f'Shards: {self.shards}, accounts per shard: {[len(part) for part in partitions]}')
+
+        succeeded, failed = 0, 0
+        try:
+            with ProcessPoolExecutor(max_workers=self.shards) as executor:
+                # Exchange balance is split by accounts count, shards do not plan the same balance
+                futures = [
+                    executor.submit(run_shard, shard_index, partition, len(partition) / len(accounts_data))
+                    for shard_index, partition in enumerate(partitions)
+                    if partition
+                ]
+                for future in futures:
+                    shard_succeeded, shard_failed = future.result()
+                    succeeded += shard_succeeded
+                    failed += shard_failed
+        finally:
+            self.merge_results()
+
+        self.logger_msg(f'Wallets: {succeeded + failed} Succeeded: {succeeded} Failed: {failed}')
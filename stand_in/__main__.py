@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+
+from stand_in.server import FaultConfig, StandIn, generate_accounts, save_accounts
+
+
+async def serve(stand_in: StandIn, stats_interval: float):
+    await stand_in.start()
+    try:
+        while True:
+            await asyncio.sleep(stats_interval)
+            stand_in.logger_msg(f'Stand-in stats: {stand_in.stats()}', 'debug')
+    finally:
+        await stand_in.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Local aptos node, okx and airdrop api for running the bot offline, e.g. '
+                    'python -m stand_in --accounts 100, then STAND_IN_URL=http://127.0.0.1:8080 '
+                    'EXCEL_FILE_PATH=files/stand_in_accounts.csv python main.py'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--accounts', type=int, default=0, help='generate accounts file with this number of accounts')
+    parser.add_argument('--accounts-path', default='files/stand_in_accounts.csv')
+    parser.add_argument('--initial-balance', type=float, default=0, help='APT of every new account')
+    parser.add_argument('--latency', type=float, nargs=2, default=[0, 0], metavar=('MIN', 'MAX'),
+                        help='delay of every request in seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with 503')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='share of requests answered with 429')
+    parser.add_argument('--commit-delay', type=float, default=1, help='seconds from submit to commit of transaction')
+    parser.add_argument('--withdraw-delay', type=float, default=5, help='seconds from withdrawal to its arrival')
+    parser.add_argument('--stats-interval', type=float, default=60)
+    args = parser.parse_args()
+
+    stand_in = StandIn(
+        host=args.host,
+        port=args.port,
+        faults=FaultConfig(
+            latency_range=(args.latency[0], args.latency[1]),
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate
+        ),
+        initial_balance=args.initial_balance,
+        commit_delay=args.commit_delay,
+        withdraw_delay=args.withdraw_delay
+    )
+    if args.accounts:
+        save_accounts(generate_accounts(args.accounts), args.accounts_path)
+        stand_in.logger_msg(f'{args.accounts} accounts are saved to {args.accounts_path}')
+
+    try:
+        asyncio.run(serve(stand_in, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
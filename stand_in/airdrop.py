@@ -0,0 +1,23 @@
+from aiohttp import web
+
+
+class FakeAirdropApi:
+    """
+    LiquidSwap airdrop dashboard api, every signature is accepted
+    """
+    def __init__(self):
+        self.registrations = 0
+
+    def add_routes(self, app: web.Application):
+        app.add_routes([
+            web.get('/airdrop/account/{address}/', self.get_token),
+            web.post('/airdrop/signature', self.register),
+        ])
+
+    async def get_token(self, request: web.Request) -> web.Response:
+        return web.json_response({'token': f'stand-in:{request.match_info["address"]}'})
+
+    async def register(self, request: web.Request) -> web.Response:
+        await request.json()
+        self.registrations += 1
+        return web.json_response({'token': f'stand-in-{self.registrations}', 'invited': 0})
@@ -0,0 +1,451 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+
+from aptos_sdk.account_address import AccountAddress
+from aptos_sdk.bcs import Deserializer
+from aptos_sdk.transactions import SignedTransaction
+
+from core.config import TOKENS_INFO
+from modules.liquidswap.config import POOLS_INFO
+from modules.liquidswap.pool_index import PoolIndex
+from modules.liquidswap.quote import PoolSnapshot, quote_matrix
+
+APT_ADDRESS = TOKENS_INFO['APT']
+
+TOKEN_DECIMALS = {
+    TOKENS_INFO['APT']: 8,
+    TOKENS_INFO['USDC']: 6,
+    TOKENS_INFO['stAPTDitto']: 8,
+    TOKENS_INFO['stAPTAmnis']: 8,
+}
+
+# Price of one whole token in APT, pools are seeded by it
+TOKEN_PRICES = {
+    TOKENS_INFO['APT']: 1,
+    TOKENS_INFO['USDC']: 0.125,
+    TOKENS_INFO['stAPTDitto']: 1.05,
+    TOKENS_INFO['stAPTAmnis']: 1.05,
+}
+
+CURVE_FEES = {
+    'Uncorrelated': 30,
+    'Stable': 4,
+}
+
+# Gas units used by the entry functions close to mainnet ones, the other functions use the default
+FUNCTION_GAS = {
+    'managed_coin::register': 400,
+    'aptos_account::transfer': 10,
+    'scripts_v2::swap': 60,
+    'router::swap_coin_for_coin_x1': 60,
+}
+DEFAULT_GAS = 100
+
+
+def normalize_address(address: str | AccountAddress) -> str:
+    return str(AccountAddress.from_str_relaxed(str(address)))
+
+
+@dataclass
+class FakeAccount:
+    sequence_number: int = 0
+    # CoinStore balances, registered coin has a key even with zero balance
+    coins: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class FakePool:
+    version: str
+    curve: str
+    coin_x: str
+    coin_y: str
+    reserve_x: int
+    reserve_y: int
+    fee: int
+
+
+@dataclass
+class FakeTransaction:
+    hash: str
+    sender: str
+    sequence_number: int
+    function: str
+    type_arguments: list[str]
+    arguments: list
+    max_gas_amount: int
+    gas_unit_price: int
+    expiration_timestamp_secs: int
+    committed: bool = False
+    success: bool = False
+    vm_status: str = ''
+    gas_used: int = 0
+    version: int | None = None
+    committed_event: asyncio.Event | None = None
+
+
+class TransactionAbort(Exception):
+    pass
+
+
+class FakeChain:
+    """
+    In-memory state of the stand-in node: accounts with coin balances, LiquidSwap pools of all the token pairs
+    and the transactions. Transactions are committed in sequence number order after the commit delay,
+    swaps move the pool reserves
+    """
+    def __init__(
+            self,
+            initial_balance: float = 0,
+            pool_depth: float = 1_000_000,
+            commit_delay: float = 1
+    ):
+        """
+        :param initial_balance: APT balance of the accounts on the first request to them
+        :param pool_depth: APT value of each side of the seeded pools
+        :param commit_delay: seconds from transaction submit to its commit
+        """
+        self.initial_balance_wei = int(initial_balance * 10 ** 8)
+        self.commit_delay = commit_delay
+        self.accounts: dict[str, FakeAccount] = {}
+        self.pools: dict[tuple[str, str], FakePool] = {}
+        self.transactions: dict[str, FakeTransaction] = {}
+        self.ledger_version = 0
+        self.commits = 0
+        self.seed_pools(pool_depth)
+
+    def seed_pools(self, pool_depth: float):
+        for version, pool_info in POOLS_INFO.items():
+            resource_address = normalize_address(pool_info['resource_address'])
+            for coin_x, coin_y in itertools.combinations(TOKENS_INFO.values(), 2):
+                for curve in pool_info['types']:
+                    resource_type = PoolIndex.get_pool_resource_type(version, curve, coin_x, coin_y)
+                    self.pools[(resource_address, resource_type)] = FakePool(
+                        version=version,
+                        curve=curve,
+                        coin_x=coin_x,
+                        coin_y=coin_y,
+                        reserve_x=int(pool_depth / TOKEN_PRICES[coin_x] * 10 ** TOKEN_DECIMALS[coin_x]),
+                        reserve_y=int(pool_depth / TOKEN_PRICES[coin_y] * 10 ** TOKEN_DECIMALS[coin_y]),
+                        fee=CURVE_FEES[curve]
+                    )
+
+    def get_account(self, address: str) -> FakeAccount:
+        address = normalize_address(address)
+        account = self.accounts.get(address)
+        if account is None:
+            account = self.accounts[address] = FakeAccount(coins={APT_ADDRESS: self.initial_balance_wei})
+
+        return account
+
+    def credit(self, address: str, token_address: str, amount_wei: int):
+        coins = self.get_account(address).coins
+        coins[token_address] = coins.get(token_address, 0) + amount_wei
+
+    def get_resource(self, address: str, resource_type: str) -> dict | None:
+        """
+        Gets CoinStore, CoinInfo or LiquidityPool resource
+        :param address:
+        :param resource_type:
+        :return: resource or None if it does not exist
+        """
+        address = normalize_address(address)
+        pool = self.pools.get((address, resource_type))
+        if pool is not None:
+            return {
+                'type': resource_type,
+                'data': {
+                    'coin_x_reserve': {'value': str(pool.reserve_x)},
+                    'coin_y_reserve': {'value': str(pool.reserve_y)},
+                    'fee': str(pool.fee),
+                }
+            }
+
+        if resource_type.startswith('0x1::coin::CoinInfo<'):
+            token_address = resource_type[len('0x1::coin::CoinInfo<'):-1]
+            if token_address not in TOKEN_DECIMALS or normalize_address(token_address.split('::')[0]) != address:
+                return None
+            return {
+                'type': resource_type,
+                'data': {
+                    'decimals': TOKEN_DECIMALS[token_address],
+                    'name': token_address.split('::')[-1],
+                    'symbol': token_address.split('::')[-1],
+                }
+            }
+
+        if resource_type.startswith('0x1::coin::CoinStore<'):
+            token_address = resource_type[len('0x1::coin::CoinStore<'):-1]
+            balance = self.get_account(address).coins.get(token_address)
+            if balance is None:
+                return None
+            return {'type': resource_type, 'data': {'coin': {'value': str(balance)}, 'frozen': False}}
+
+        return None
+
+    def get_resources(self, address: str) -> list[dict]:
+        address = normalize_address(address)
+        resources = [
+            self.get_resource(address, f'0x1::coin::CoinStore<{token_address}>')
+            for token_address in self.get_account(address).coins
+        ]
+        resources += [
+            self.get_resource(address, resource_type)
+            for pool_address, resource_type in self.pools
+            if pool_address == address
+        ]
+        return resources
+
+    def get_ledger_info(self) -> dict:
+        return {
+            'chain_id': 1,
+            'epoch': '1',
+            'ledger_version': str(self.ledger_version),
+            'oldest_ledger_version': '0',
+            'ledger_timestamp': str(int(time.time() * 10 ** 6)),
+            'node_role': 'full_node',
+            'block_height': str(self.ledger_version),
+        }
+
+    @staticmethod
+    def get_hash(data: bytes) -> str:
+        return '0x' + hashlib.sha3_256(data).hexdigest()
+
+    def parse_bcs_transaction(self, data: bytes) -> FakeTransaction:
+        signed_transaction = SignedTransaction.deserialize(Deserializer(data))
+        raw_transaction = signed_transaction.transaction
+        entry_function = raw_transaction.payload.value
+        # u64 arguments are decoded, the others are kept as hex
+        arguments = [
+            Deserializer(argument).u64() if len(argument) == 8 else '0x' + argument.hex()
+            for argument in entry_function.args
+        ]
+        return FakeTransaction(
+            hash=self.get_hash(data),
+            sender=normalize_address(raw_transaction.sender),
+            sequence_number=raw_transaction.sequence_number,
+            function=f'{normalize_address(entry_function.module.address)}::'
+                     f'{entry_function.module.name}::{entry_function.function}',
+            type_arguments=[str(type_tag) for type_tag in entry_function.ty_args],
+            arguments=arguments,
+            max_gas_amount=raw_transaction.max_gas_amount,
+            gas_unit_price=raw_transaction.gas_unit_price,
+            expiration_timestamp_secs=raw_transaction.expiration_timestamps_secs
+        )
+
+    def parse_json_transaction(self, request: dict) -> FakeTransaction:
+        payload = request['payload']
+        module_address, module_name, function_name = payload['function'].split('::')
+        return FakeTransaction(
+            hash=self.get_hash(json.dumps(request, sort_keys=True).encode()),
+            sender=normalize_address(request['sender']),
+            sequence_number=int(request['sequence_number']),
+            function=f'{normalize_address(module_address)}::{module_name}::{function_name}',
+            type_arguments=payload['type_arguments'],
+            arguments=payload['arguments'],
+            max_gas_amount=int(request['max_gas_amount']),
+            gas_unit_price=int(request['gas_unit_price']),
+            expiration_timestamp_secs=int(request['expiration_timestamp_secs'])
+        )
+
+    def get_pool(self, function_address: str, coin_in: str, coin_out: str, curve_type: str) -> tuple[FakePool, bool]:
+        """
+        Gets pool of the swap function
+        :param function_address: swap address of the pool version
+        :param coin_in:
+        :param coin_out:
+        :param curve_type:
+        :return: pool and is coin_in its coin_y
+        """
+        for version, pool_info in POOLS_INFO.items():
+            if normalize_address(pool_info['swap_address']) != function_address:
+                continue
+
+            resource_address = normalize_address(pool_info['resource_address'])
+            curve = curve_type.split('::')[-1]
+            for coin_x, coin_y, is_reversed in ((coin_in, coin_out, False), (coin_out, coin_in, True)):
+                pool = self.pools.get(
+                    (resource_address, PoolIndex.get_pool_resource_type(version, curve, coin_x, coin_y))
+                )
+                if pool is not None:
+                    return pool, is_reversed
+
+        raise TransactionAbort('Move abort: ERR_POOL_DOES_NOT_EXIST')
+
+    def execute(self, txn: FakeTransaction) -> tuple[dict[tuple[str, str], int], dict[tuple[str, str], tuple[int, int]]]:
+        """
+        Executes entry function without changing the state
+        :param txn:
+        :return: balance changes by (address, token) and new pool reserves by pool key
+        """
+        function_address, module_name, function_name = txn.function.split('::')
+        function = f'{module_name}::{function_name}'
+        balances, pools = {}, {}
+
+        def withdraw(address: str, token_address: str, amount: int):
+            balance = self.get_account(address).coins.get(token_address)
+            if balance is None:
+                raise TransactionAbort('Move abort in 0x1::coin: ECOIN_STORE_NOT_PUBLISHED(0x60005)')
+            if balance + balances.get((address, token_address), 0) < amount:
+                raise TransactionAbort('Move abort in 0x1::coin: EINSUFFICIENT_BALANCE(0x10006)')
+            balances[(address, token_address)] = balances.get((address, token_address), 0) - amount
+
+        def deposit(address: str, token_address: str, amount: int):
+            balances[(address, token_address)] = balances.get((address, token_address), 0) + amount
+
+        match function:
+            case 'managed_coin::register':
+                deposit(txn.sender, txn.type_arguments[0], 0)
+            case 'aptos_account::transfer':
+                to_address, amount = normalize_address(txn.arguments[0]), int(txn.arguments[1])
+                withdraw(txn.sender, APT_ADDRESS, amount)
+                deposit(to_address, APT_ADDRESS, amount)
+            case 'scripts_v2::swap' | 'router::swap_coin_for_coin_x1':
+                coin_in, coin_out, curve_type = txn.type_arguments
+                amount_in = int(txn.arguments[0])
+                min_amount_out = int(txn.arguments[1][0] if isinstance(txn.arguments[1], list) else txn.arguments[1])
+                pool, is_reversed = self.get_pool(function_address, coin_in, coin_out, curve_type)
+                reserve_in, reserve_out = (pool.reserve_y, pool.reserve_x) if is_reversed else \
+                    (pool.reserve_x, pool.reserve_y)
+                amount_out = int(quote_matrix([amount_in], [PoolSnapshot(
+                    version=pool.version,
+                    curve=pool.curve,
+                    reserve_in=reserve_in,
+                    reserve_out=reserve_out,
+                    scale_in=10 ** TOKEN_DECIMALS[coin_in],
+                    scale_out=10 ** TOKEN_DECIMALS[coin_out],
+                    fee=pool.fee
+                )])[0, 0])
+                if amount_out < min_amount_out:
+                    raise TransactionAbort(
+                        f'Move abort in {function_address}::router: ERR_COIN_OUT_NUM_LESS_THAN_EXPECTED_MINIMUM(0x69)'
+                    )
+
+                withdraw(txn.sender, coin_in, amount_in)
+                deposit(txn.sender, coin_out, amount_out)
+                reserve_in, reserve_out = reserve_in + amount_in, reserve_out - amount_out
+                pool_key = next(key for key, value in self.pools.items() if value is pool)
+                pools[pool_key] = (reserve_out, reserve_in) if is_reversed else (reserve_in, reserve_out)
+            case _:
+                raise TransactionAbort('FUNCTION_RESOLUTION_FAILURE')
+
+        return balances, pools
+
+    def run(self, txn: FakeTransaction, commit: bool) -> FakeTransaction:
+        """
+        Simulates or commits transaction, failed transaction still pays gas and takes sequence number
+        :param txn:
+        :param commit:
+        :return:
+        """
+        account = self.get_account(txn.sender)
+        if txn.sequence_number < account.sequence_number:
+            txn.success, txn.vm_status, txn.gas_used = False, 'SEQUENCE_NUMBER_TOO_OLD', 0
+            return txn
+        if txn.sequence_number > account.sequence_number:
+            txn.success, txn.vm_status, txn.gas_used = False, 'SEQUENCE_NUMBER_TOO_NEW', 0
+            return txn
+
+        function = '::'.join(txn.function.split('::')[1:])
+        txn.gas_used = FUNCTION_GAS.get(function, DEFAULT_GAS)
+        balances, pools = {}, {}
+        if txn.gas_used > txn.max_gas_amount:
+            txn.success, txn.vm_status, txn.gas_used = False, 'OUT_OF_GAS', txn.max_gas_amount
+        elif account.coins.get(APT_ADDRESS, 0) < txn.gas_used * txn.gas_unit_price:
+            txn.success, txn.vm_status = False, 'INSUFFICIENT_BALANCE_FOR_TRANSACTION_FEE'
+        else:
+            try:
+                balances, pools = self.execute(txn)
+                txn.success, txn.vm_status = True, 'Executed successfully'
+            except TransactionAbort as e:
+                txn.success, txn.vm_status = False, str(e)
+
+        if not commit:
+            return txn
+
+        account.sequence_number += 1
+        account.coins[APT_ADDRESS] = max(account.coins.get(APT_ADDRESS, 0) - txn.gas_used * txn.gas_unit_price, 0)
+        for (address, token_address), delta in balances.items():
+            self.credit(address, token_address, delta)
+        for pool_key, (reserve_x, reserve_y) in pools.items():
+            self.pools[pool_key].reserve_x, self.pools[pool_key].reserve_y = reserve_x, reserve_y
+
+        self.ledger_version += 1
+        txn.version = self.ledger_version
+        txn.committed = True
+        self.commits += 1
+        if txn.committed_event is not None:
+            txn.committed_event.set()
+        return txn
+
+    def submit(self, txn: FakeTransaction) -> str | None:
+        """
+        Puts transaction into the mempool, it is committed after the commit delay
+        :param txn:
+        :return: error vm status if transaction is rejected
+        """
+        account = self.get_account(txn.sender)
+        if txn.sequence_number < account.sequence_number:
+            return 'SEQUENCE_NUMBER_TOO_OLD'
+        if txn.hash in self.transactions:
+            return None
+
+        txn.committed_event = asyncio.Event()
+        self.transactions[txn.hash] = txn
+        asyncio.get_running_loop().call_later(self.commit_delay, self._commit, txn)
+        return None
+
+    def _commit(self, txn: FakeTransaction):
+        account = self.get_account(txn.sender)
+        if txn.sequence_number > account.sequence_number and time.time() < txn.expiration_timestamp_secs:
+            # Earlier transaction of the account is not committed yet, waits in the mempool
+            asyncio.get_running_loop().call_later(self.commit_delay, self._commit, txn)
+            return
+        if txn.sequence_number != account.sequence_number:
+            # Expired or replaced by another transaction with the same sequence number, dropped from mempool
+            self.transactions.pop(txn.hash, None)
+            return
+
+        self.run(txn, commit=True)
+
+    def get_transaction(self, txn_hash: str) -> dict | None:
+        txn = self.transactions.get(txn_hash)
+        if txn is None:
+            return None
+
+        data = {
+            'hash': txn.hash,
+            'sender': txn.sender,
+            'sequence_number': str(txn.sequence_number),
+            'max_gas_amount': str(txn.max_gas_amount),
+            'gas_unit_price': str(txn.gas_unit_price),
+            'expiration_timestamp_secs': str(txn.expiration_timestamp_secs),
+            'payload': {
+                'function': txn.function,
+                'type_arguments': txn.type_arguments,
+                'arguments': [str(argument) for argument in txn.arguments],
+                'type': 'entry_function_payload'
+            }
+        }
+        if not txn.committed:
+            return {'type': 'pending_transaction', **data}
+
+        return {
+            'type': 'user_transaction',
+            'version': str(txn.version),
+            'success': txn.success,
+            'vm_status': txn.vm_status,
+            'gas_used': str(txn.gas_used),
+            **data
+        }
+
+    def stats(self) -> dict:
+        return {
+            'accounts': len(self.accounts),
+            'transactions': len(self.transactions),
+            'commits': self.commits,
+            'ledger_version': self.ledger_version
+        }
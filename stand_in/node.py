@@ -0,0 +1,113 @@
+import asyncio
+
+from aiohttp import web
+
+from stand_in.chain import FakeChain
+
+BCS_CONTENT_TYPE = 'application/x.aptos.signed_transaction+bcs'
+
+
+def error_response(status: int, message: str, error_code: str, vm_error_code: int | None = None) -> web.Response:
+    return web.json_response(
+        {'message': message, 'error_code': error_code, 'vm_error_code': vm_error_code},
+        status=status
+    )
+
+
+class FakeNodeApi:
+    """
+    Subset of the aptos fullnode REST api used by the bot, served under /v1
+    """
+    def __init__(self, chain: FakeChain, long_poll_timeout: float = 1):
+        self.chain = chain
+        self.long_poll_timeout = long_poll_timeout
+
+    def add_routes(self, app: web.Application):
+        app.add_routes([
+            web.get('/v1', self.get_ledger_info),
+            web.get('/v1/', self.get_ledger_info),
+            web.get('/v1/accounts/{address}', self.get_account),
+            web.get('/v1/accounts/{address}/resources', self.get_resources),
+            web.get('/v1/accounts/{address}/resource/{resource_type:.+}', self.get_resource),
+            web.post('/v1/transactions/simulate', self.simulate_transaction),
+            web.post('/v1/transactions/encode_submission', self.encode_submission),
+            web.post('/v1/transactions', self.submit_transaction),
+            web.get('/v1/transactions/by_hash/{txn_hash}', self.get_transaction),
+            web.get('/v1/transactions/wait_by_hash/{txn_hash}', self.wait_transaction),
+        ])
+
+    async def get_ledger_info(self, request: web.Request) -> web.Response:
+        return web.json_response(self.chain.get_ledger_info())
+
+    async def get_account(self, request: web.Request) -> web.Response:
+        address = request.match_info['address']
+        account = self.chain.get_account(address)
+        return web.json_response({'sequence_number': str(account.sequence_number), 'authentication_key': address})
+
+    async def get_resources(self, request: web.Request) -> web.Response:
+        return web.json_response(self.chain.get_resources(request.match_info['address']))
+
+    async def get_resource(self, request: web.Request) -> web.Response:
+        resource_type = request.match_info['resource_type']
+        resource = self.chain.get_resource(request.match_info['address'], resource_type)
+        if resource is None:
+            return error_response(404, f'Resource not found by Address, Struct tag: {resource_type}', 'resource_not_found')
+
+        return web.json_response(resource)
+
+    async def parse_transaction(self, request: web.Request):
+        if request.content_type == BCS_CONTENT_TYPE:
+            return self.chain.parse_bcs_transaction(await request.read())
+
+        return self.chain.parse_json_transaction(await request.json())
+
+    async def simulate_transaction(self, request: web.Request) -> web.Response:
+        try:
+            txn = await self.parse_transaction(request)
+        except Exception as e:
+            return error_response(400, f'Invalid transaction: {e}', 'invalid_input')
+
+        self.chain.run(txn, commit=False)
+        return web.json_response([{
+            'type': 'user_transaction',
+            'hash': txn.hash,
+            'success': txn.success,
+            'vm_status': txn.vm_status,
+            'gas_used': str(txn.gas_used),
+        }])
+
+    async def encode_submission(self, request: web.Request) -> web.Response:
+        # Signature is not verified by the stand-in, any message to sign is fine
+        body = await request.read()
+        return web.json_response('0x' + self.chain.get_hash(body)[2:])
+
+    async def submit_transaction(self, request: web.Request) -> web.Response:
+        try:
+            txn = await self.parse_transaction(request)
+        except Exception as e:
+            return error_response(400, f'Invalid transaction: {e}', 'invalid_input')
+
+        vm_status = self.chain.submit(txn)
+        if vm_status is not None:
+            return error_response(400, f'Invalid transaction: Type: Validation Code: {vm_status}', 'vm_error', 3)
+
+        return web.json_response(self.chain.get_transaction(txn.hash), status=202)
+
+    async def get_transaction(self, request: web.Request) -> web.Response:
+        txn_hash = request.match_info['txn_hash']
+        data = self.chain.get_transaction(txn_hash)
+        if data is None:
+            return error_response(404, f'Transaction not found by Transaction hash({txn_hash})', 'transaction_not_found')
+
+        return web.json_response(data)
+
+    async def wait_transaction(self, request: web.Request) -> web.Response:
+        txn = self.chain.transactions.get(request.match_info['txn_hash'])
+        if txn is not None and not txn.committed:
+            # Held until commit or the long-poll timeout, as the real node does
+            try:
+                await asyncio.wait_for(txn.committed_event.wait(), timeout=self.long_poll_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return await self.get_transaction(request)
@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+
+from aiohttp import web
+
+from core.config import TOKENS_INFO
+from stand_in.chain import FakeChain
+
+WITHDRAW_FEE = 0.001
+
+
+def okx_response(data: list, code: str = '0', msg: str = '') -> web.Response:
+    return web.json_response({'code': code, 'msg': msg, 'data': data})
+
+
+class FakeOkxApi:
+    """
+    Subset of the okx v5 REST api used by the bot: funding and trading balances, sub-accounts and withdrawals.
+    APT withdrawal is credited to the address on the stand-in chain after the withdraw delay
+    """
+    def __init__(
+            self,
+            chain: FakeChain,
+            funding_balance: float = 1_000_000,
+            sub_accounts: int = 2,
+            sub_account_balance: float = 1,
+            withdraw_delay: float = 5
+    ):
+        """
+        :param chain:
+        :param funding_balance: APT on the main funding account
+        :param sub_accounts: number of sub-accounts
+        :param sub_account_balance: APT on each sub-account
+        :param withdraw_delay: seconds from withdrawal request to its arrival on chain
+        """
+        self.chain = chain
+        self.withdraw_delay = withdraw_delay
+        self.funding: dict[str, float] = {'APT': funding_balance}
+        self.trading: dict[str, float] = {}
+        self.sub_accounts: dict[str, dict[str, float]] = {
+            f'stand_in_sub_{index}': {'APT': sub_account_balance}
+            for index in range(1, sub_accounts + 1)
+        }
+        self.ids = itertools.count(1)
+        self.withdrawals = 0
+
+    def add_routes(self, app: web.Application):
+        app.add_routes([
+            web.get('/api/v5/public/instruments', self.get_instruments),
+            web.get('/api/v5/asset/currencies', self.get_currencies),
+            web.get('/api/v5/asset/balances', self.get_funding_balances),
+            web.get('/api/v5/account/balance', self.get_trading_balances),
+            web.get('/api/v5/users/subaccount/list', self.get_sub_accounts),
+            web.get('/api/v5/asset/subaccount/balances', self.get_sub_account_balances),
+            web.post('/api/v5/asset/transfer', self.transfer),
+            web.post('/api/v5/asset/withdrawal', self.withdraw),
+        ])
+
+    async def get_instruments(self, request: web.Request) -> web.Response:
+        return okx_response([])
+
+    async def get_currencies(self, request: web.Request) -> web.Response:
+        return okx_response([{
+            'ccy': 'APT',
+            'chain': 'APT-Aptos',
+            'name': 'Aptos',
+            'canDep': True,
+            'canWd': True,
+            'canInternal': True,
+            'minFee': str(WITHDRAW_FEE),
+            'maxFee': str(WITHDRAW_FEE),
+            'minWd': '0.1',
+            'maxWd': '1000000',
+            'wdTickSz': '8',
+            'mainNet': True,
+        }])
+
+    @staticmethod
+    def get_balance_data(balances: dict[str, float]) -> list[dict]:
+        return [
+            {'ccy': ccy, 'bal': str(balance), 'availBal': str(balance), 'frozenBal': '0'}
+            for ccy, balance in balances.items()
+        ]
+
+    async def get_funding_balances(self, request: web.Request) -> web.Response:
+        return okx_response(self.get_balance_data(self.funding))
+
+    async def get_trading_balances(self, request: web.Request) -> web.Response:
+        details = [
+            {**balance, 'availEq': balance['availBal'], 'cashBal': balance['bal'], 'eq': balance['bal']}
+            for balance in self.get_balance_data(self.trading)
+        ]
+        return okx_response([{'details': details, 'totalEq': '0', 'uTime': '0'}])
+
+    async def get_sub_accounts(self, request: web.Request) -> web.Response:
+        return okx_response([{'subAcct': sub_name, 'enable': True} for sub_name in self.sub_accounts])
+
+    async def get_sub_account_balances(self, request: web.Request) -> web.Response:
+        balances = self.sub_accounts.get(request.query.get('subAcct'), {})
+        ccy = request.query.get('ccy')
+        return okx_response(self.get_balance_data({ccy: balances[ccy]} if ccy in balances else {}))
+
+    async def transfer(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        ccy, amount = body['ccy'], float(body['amt'])
+        match body.get('type', '0'), body.get('from'), body.get('to'):
+            case '2', _, _:
+                source = self.sub_accounts.get(body.get('subAcct'), {})
+                target = self.funding
+            case '0', '18', '6':
+                source, target = self.trading, self.funding
+            case '0', '6', '18':
+                source, target = self.funding, self.trading
+            case _:
+                return okx_response([], code='58127', msg='Transfer is not supported by stand-in')
+
+        if source.get(ccy, 0) < amount:
+            return okx_response([], code='58350', msg='Insufficient balance')
+
+        source[ccy] -= amount
+        target[ccy] = target.get(ccy, 0) + amount
+        return okx_response([{
+            'transId': str(next(self.ids)), 'ccy': ccy, 'amt': body['amt'], 'from': body.get('from'), 'to': body.get('to')
+        }])
+
+    async def withdraw(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        ccy, amount, fee = body['ccy'], float(body['amt']), float(body.get('fee') or 0)
+        if ccy != 'APT':
+            return okx_response([], code='58203', msg='Withdrawal of the currency is not supported by stand-in')
+        if self.funding.get(ccy, 0) < amount + fee:
+            return okx_response([], code='58350', msg='Insufficient balance')
+
+        self.funding[ccy] -= amount + fee
+        self.withdrawals += 1
+        asyncio.get_running_loop().call_later(
+            self.withdraw_delay, self.chain.credit, body['toAddr'], TOKENS_INFO['APT'], int(amount * 10 ** 8)
+        )
+        return okx_response([{'amt': body['amt'], 'wdId': str(next(self.ids)), 'ccy': ccy, 'chain': body.get('chain')}])
+
+    def stats(self) -> dict:
+        return {
+            'funding': dict(self.funding),
+            'withdrawals': self.withdrawals
+        }
+
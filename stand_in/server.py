@@ -0,0 +1,155 @@
+import asyncio
+import csv
+import os
+import random
+from dataclasses import dataclass
+
+from aiohttp import web
+from aptos_sdk.account import Account
+
+from core.dataclasses import ExcelAccountData
+from stand_in.airdrop import FakeAirdropApi
+from stand_in.chain import FakeChain
+from stand_in.node import FakeNodeApi
+from stand_in.okx import FakeOkxApi
+from utils.log import Logger
+
+# Deposit address of the stand-in exchange, accounts send tokens back to it
+STAND_IN_CEX_ADDRESS = '0x' + 'c' * 64
+
+
+@dataclass
+class FaultConfig:
+    latency_range: tuple[float, float] = (0, 0)
+    error_rate: float = 0
+    throttle_rate: float = 0
+
+
+class FaultInjector:
+    """
+    Middleware delaying every request and failing its share with 503 or 429
+    """
+    def __init__(self, config: FaultConfig):
+        self.config = config
+        self.requests = 0
+        self.routes: dict[str, int] = {}
+        self.errors = 0
+        self.throttled = 0
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        self.requests += 1
+        resource = request.match_info.route.resource
+        route = f'{request.method} {resource.canonical if resource is not None else request.path}'
+        self.routes[route] = self.routes.get(route, 0) + 1
+        delay = random.uniform(*self.config.latency_range)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if random.random() < self.config.throttle_rate:
+            self.throttled += 1
+            return web.json_response(
+                {'message': 'Too many requests', 'error_code': 'web_framework_error', 'code': '50011', 'data': []},
+                status=429
+            )
+        if random.random() < self.config.error_rate:
+            self.errors += 1
+            return web.json_response(
+                {'message': 'Service unavailable', 'error_code': 'internal_error', 'code': '50001', 'data': []},
+                status=503
+            )
+
+        return await handler(request)
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'routes': dict(sorted(self.routes.items())),
+            'errors': self.errors,
+            'throttled': self.throttled
+        }
+
+
+class StandIn(Logger):
+    """
+    Local aptos node (/v1), okx (/api/v5) and airdrop api (/airdrop) on one port, sharing one in-memory chain
+    """
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 8080,
+            faults: FaultConfig = FaultConfig(),
+            initial_balance: float = 0,
+            commit_delay: float = 1,
+            withdraw_delay: float = 5
+    ):
+        Logger.__init__(self)
+        self.host = host
+        self.port = port
+        self.chain = FakeChain(initial_balance=initial_balance, commit_delay=commit_delay)
+        self.node = FakeNodeApi(self.chain)
+        self.okx = FakeOkxApi(self.chain, withdraw_delay=withdraw_delay)
+        self.airdrop = FakeAirdropApi()
+        self.faults = FaultInjector(faults)
+        self.runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults.middleware])
+        self.node.add_routes(app)
+        self.okx.add_routes(app)
+        self.airdrop.add_routes(app)
+        return app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.build_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.logger_msg(f'Stand-in is listening on {self.url}, run the bot with STAND_IN_URL={self.url}')
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def stats(self) -> dict:
+        return {
+            'chain': self.chain.stats(),
+            'okx': self.okx.stats(),
+            'airdrop_registrations': self.airdrop.registrations,
+            'faults': self.faults.stats()
+        }
+
+
+def generate_accounts(count: int) -> list[ExcelAccountData]:
+    """
+    Generates accounts with new keys sending tokens back to the stand-in exchange
+    :param count:
+    :return:
+    """
+    return [
+        ExcelAccountData(
+            name=f'stand_in_{index}',
+            private_key=str(Account.generate().private_key),
+            proxy=None,
+            cex_address=STAND_IN_CEX_ADDRESS
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def save_accounts(accounts_data: list[ExcelAccountData], path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['name', 'private_key', 'proxy', 'cex_address'])
+        writer.writeheader()
+        for account_data in accounts_data:
+            writer.writerow({
+                'name': account_data.name,
+                'private_key': account_data.private_key,
+                'proxy': '',
+                'cex_address': account_data.cex_address
+            })
@@ -0,0 +1,120 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from modules.liquidswap.math import (
+    ONE_E_8,
+    coin_out_u256,
+    d,
+    f_u256,
+    get_coins_out_with_fees_stable,
+    get_coins_out_with_fees_stable_u256,
+    get_y_u256,
+    lp_value_u256,
+)
+
+CASES = 2000
+SCALES = [10 ** 6, 10 ** 8]
+FEES = [4, 5, 30]
+MAX_RESERVE = 10 ** 13
+
+
+def floor_root(x0: int, xy: int) -> int:
+    """
+    Exact reference: largest integer y with f(x0, y) <= xy, f is increasing in y
+    :param x0:
+    :param xy:
+    :return:
+    """
+    low, high = 0, 1
+    while f_u256(x0, high) <= xy:
+        high *= 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if f_u256(x0, middle) <= xy:
+            low = middle
+        else:
+            high = middle
+
+    return low
+
+
+def exact_coins_out(coin_in: int, reserve_in: int, reserve_out: int, scale_in: int, scale_out: int, fee: int) -> int:
+    """
+    Exact reference of the stable swap output: fee-adjusted input rounded up, y is the smallest integer above the curve
+    :return:
+    """
+    fraction_after_fees = Fraction(coin_in * (10000 - fee), 10000)
+    coin_in_after_fees = -(-fraction_after_fees.numerator // fraction_after_fees.denominator)
+
+    xy = lp_value_u256(reserve_in, scale_in, reserve_out, scale_out)
+    x0 = reserve_in * ONE_E_8 // scale_in + coin_in_after_fees * ONE_E_8 // scale_in
+    y = floor_root(x0, xy) + 1
+    return (reserve_out * ONE_E_8 // scale_out - y) * scale_out // ONE_E_8
+
+
+def random_pool(rng: random.Random) -> tuple[int, int, int, int, int]:
+    reserve_in = rng.randint(10 ** 6, MAX_RESERVE)
+    reserve_out = rng.randint(10 ** 6, MAX_RESERVE)
+    return reserve_in, reserve_out, rng.choice(SCALES), rng.choice(SCALES), rng.choice(FEES)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_get_y_u256_is_smallest_y_above_curve(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES // 4):
+        reserve_in, reserve_out, scale_in, scale_out, _ = random_pool(rng)
+        xy = lp_value_u256(reserve_in, scale_in, reserve_out, scale_out)
+        x0 = reserve_in * ONE_E_8 // scale_in + rng.randint(1, reserve_in) * ONE_E_8 // scale_in
+        # Newton method starts above the root on swaps, below it is checked too
+        start = rng.choice([reserve_out * ONE_E_8 // scale_out, 1, rng.randint(1, 10 ** 20)])
+
+        y = get_y_u256(x0, xy, start)
+        assert y == floor_root(x0, xy) + 1
+        assert f_u256(x0, y - 1) <= xy < f_u256(x0, y)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_get_coins_out_with_fees_stable_u256_matches_exact(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES // 4):
+        reserve_in, reserve_out, scale_in, scale_out, fee = random_pool(rng)
+        coin_in = rng.randint(1, reserve_in)
+
+        coins_out = get_coins_out_with_fees_stable_u256(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+        assert coins_out == exact_coins_out(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+        assert 0 <= coins_out < reserve_out
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_get_coins_out_with_fees_stable_u256_is_monotonic(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES // 4):
+        reserve_in, reserve_out, scale_in, scale_out, fee = random_pool(rng)
+        coin_in = rng.randint(1, reserve_in)
+        larger_coin_in = coin_in + rng.randint(1, reserve_in)
+
+        assert get_coins_out_with_fees_stable_u256(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee) <= \
+            get_coins_out_with_fees_stable_u256(larger_coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_decimal_matches_u256_up_to_fee_rounding(seed):
+    rng = random.Random(seed)
+    for _ in range(CASES // 4):
+        reserve_in, reserve_out, scale_in, scale_out, fee = random_pool(rng)
+        coin_in = rng.randint(1, reserve_in)
+
+        # u256 rounds the fee-adjusted input up, Decimal keeps it fractional, so its output is between the two
+        coins_out = get_coins_out_with_fees_stable_u256(coin_in, reserve_in, reserve_out, scale_in, scale_out, fee)
+        floor_coins_out = coin_out_u256(coin_in * (10000 - fee) // 10000, scale_in, scale_out, reserve_in, reserve_out)
+        decimal_coins_out = int(get_coins_out_with_fees_stable(
+            coin_in=d(coin_in),
+            reserve_in=d(reserve_in),
+            reserve_out=d(reserve_out),
+            scale_in=d(scale_in),
+            scale_out=d(scale_out),
+            fee=d(fee)
+        ))
+        assert floor_coins_out <= decimal_coins_out <= coins_out
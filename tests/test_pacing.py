@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+import settings
+import utils.log
+from worker import Worker
+
+SLOTS = 4
+SLEEP_WINDOW = 1
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    # Log records go to the default stderr sink, the file sink of the run is not created
+    monkeypatch.setattr(utils.log, 'LOG_CONFIGURED', True)
+    monkeypatch.setattr(settings, 'ADAPTIVE_CONCURRENCY', False)
+    monkeypatch.setattr(settings, 'SLEEP_RANGE_BETWEEN_ACCOUNTS', [SLEEP_WINDOW, SLEEP_WINDOW])
+    return Worker(slots=SLOTS)
+
+
+async def count_starts(pacer, duration: float) -> int:
+    starts = 0
+    deadline = time.monotonic() + duration
+    while True:
+        await pacer.acquire()
+        if time.monotonic() > deadline:
+            return starts
+        starts += 1
+
+
+def test_each_slot_starts_account_per_sleep_window(worker):
+    async def run():
+        pacer = worker.create_pacer()
+        # First account of each slot starts at once
+        for _ in range(SLOTS):
+            assert await pacer.acquire() == pytest.approx(0, abs=0.05)
+
+        return await count_starts(pacer, SLEEP_WINDOW * 2)
+
+    assert asyncio.run(run()) in range(SLOTS * 2 - 1, SLOTS * 2 + 1)
+
+
+def test_raised_concurrency_limit_starts_more_accounts(worker):
+    async def run():
+        pacer = worker.create_pacer()
+        for _ in range(SLOTS):
+            await pacer.acquire()
+
+        worker.limiter.limit = SLOTS * 2
+        return await count_starts(pacer, SLEEP_WINDOW * 2)
+
+    assert asyncio.run(run()) in range(SLOTS * 4 - 2, SLOTS * 4 + 1)
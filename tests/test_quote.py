@@ -0,0 +1,93 @@
+import random
+from decimal import localcontext
+
+import pytest
+
+from modules.liquidswap.math import d, get_coins_out_with_fees, get_coins_out_with_fees_stable_u256
+from modules.liquidswap.quote import INT64_MAX, PoolSnapshot, quote_matrix
+
+AMOUNTS_PER_POOL = 50
+SCALES = [10 ** 6, 10 ** 8]
+FEES = [4, 5, 25, 30]
+
+
+def random_pool(rng: random.Random, curve: str, max_reserve: int) -> PoolSnapshot:
+    return PoolSnapshot(
+        version=rng.choice(['v0', 'v0.5']),
+        curve=curve,
+        reserve_in=rng.randint(10 ** 6, max_reserve),
+        reserve_out=rng.randint(10 ** 6, max_reserve),
+        scale_in=rng.choice(SCALES),
+        scale_out=rng.choice(SCALES),
+        fee=rng.choice(FEES)
+    )
+
+
+def fits_int64(pool: PoolSnapshot, amounts: list[int]) -> bool:
+    max_after_fees = max(amounts) * (10000 - (pool.fee + 1))
+    return max_after_fees * pool.reserve_out <= INT64_MAX and pool.reserve_in * 10000 + max_after_fees <= INT64_MAX
+
+
+def expected_uncorrelated(amount: int, pool: PoolSnapshot) -> int:
+    # Enough digits for the products of the largest reserves and amounts, so the Decimal reference is exact
+    with localcontext() as context:
+        context.prec = 100
+        return get_coins_out_with_fees(d(amount), d(pool.reserve_in), d(pool.reserve_out), d(pool.fee))
+
+
+def expected_stable(amount: int, pool: PoolSnapshot) -> int:
+    return get_coins_out_with_fees_stable_u256(
+        amount, pool.reserve_in, pool.reserve_out, pool.scale_in, pool.scale_out, pool.fee
+    )
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_uncorrelated_int64_path_matches_per_call(seed):
+    rng = random.Random(seed)
+    pools = [random_pool(rng, 'Uncorrelated', 10 ** 8) for _ in range(10)]
+    amounts = [rng.randint(1, 10 ** 6) for _ in range(AMOUNTS_PER_POOL)]
+    assert all(fits_int64(pool, amounts) for pool in pools)
+
+    result = quote_matrix(amounts, pools)
+    for i, pool in enumerate(pools):
+        assert list(result[i]) == [expected_uncorrelated(amount, pool) for amount in amounts]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_uncorrelated_object_path_matches_per_call(seed):
+    rng = random.Random(seed)
+    pools = [random_pool(rng, 'Uncorrelated', 10 ** 18) for _ in range(10)]
+    amounts = [rng.randint(10 ** 12, 10 ** 18) for _ in range(AMOUNTS_PER_POOL)]
+    assert not any(fits_int64(pool, amounts) for pool in pools)
+
+    result = quote_matrix(amounts, pools)
+    for i, pool in enumerate(pools):
+        assert list(result[i]) == [expected_uncorrelated(amount, pool) for amount in amounts]
+
+
+@pytest.mark.parametrize('max_reserve, max_amount', [(10 ** 8, 10 ** 6), (10 ** 13, 10 ** 12), (10 ** 18, 10 ** 18)])
+def test_stable_matches_per_call(max_reserve, max_amount):
+    rng = random.Random(max_reserve)
+    pools = [random_pool(rng, 'Stable', max_reserve) for _ in range(10)]
+    amounts = [rng.randint(1, max_amount) for _ in range(AMOUNTS_PER_POOL)]
+
+    result = quote_matrix(amounts, pools)
+    for i, pool in enumerate(pools):
+        assert list(result[i]) == [expected_stable(amount, pool) for amount in amounts]
+
+
+def test_mixed_pools_keep_rows_in_pools_order():
+    rng = random.Random(0)
+    pools = [random_pool(rng, curve, 10 ** 12) for curve in ['Stable', 'Uncorrelated', 'Stable', 'Uncorrelated']]
+    amounts = [rng.randint(1, 10 ** 10) for _ in range(AMOUNTS_PER_POOL)]
+
+    result = quote_matrix(amounts, pools)
+    assert result.shape == (len(pools), len(amounts))
+    for i, pool in enumerate(pools):
+        expected = expected_stable if pool.curve == 'Stable' else expected_uncorrelated
+        assert list(result[i]) == [expected(amount, pool) for amount in amounts]
+
+
+def test_unknown_curve_is_rejected():
+    with pytest.raises(ValueError):
+        quote_matrix([1], [PoolSnapshot('v0', 'Weighted', 10 ** 8, 10 ** 8, 10 ** 8, 10 ** 8, 30)])
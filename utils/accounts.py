@@ -0,0 +1,77 @@
+import csv
+import json
+import os
+import sys
+from typing import Iterator
+
+from loguru import logger
+from msoffcrypto.exceptions import DecryptionError, InvalidKeyError
+
+from core.dataclasses import ExcelAccountData
+from utils.ms_office import iter_rows_from_excel
+
+
+class AccountsFileError(Exception):
+    pass
+
+
+def iter_rows_from_csv(file_path: str) -> Iterator[dict]:
+    with open(file_path, encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def iter_rows_from_jsonl(file_path: str) -> Iterator[dict]:
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_accounts_data(
+        file_path: str,
+        page_name: str,
+        data_class: type[ExcelAccountData],
+        encrypted: bool = False,
+) -> Iterator[ExcelAccountData]:
+    """
+    Lazily yields accounts data from xlsx, csv or jsonl file, format is chosen by file extension
+    :param file_path:
+    :param page_name: sheet name, used for xlsx only
+    :param data_class:
+    :param encrypted: xlsx file is encrypted by password
+    :return:
+    :raises AccountsFileError: file can not be decrypted or has invalid row, rows before it are already yielded
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        match extension:
+            case '.csv':
+                rows = iter_rows_from_csv(file_path)
+            case '.jsonl':
+                rows = iter_rows_from_jsonl(file_path)
+            case _:
+                rows = iter_rows_from_excel(file_path, page_name, encrypted=encrypted)
+
+        columns_checked = False
+        for row in rows:
+            if not columns_checked:
+                data_class.validate_columns(row.keys())
+                columns_checked = True
+            yield data_class.from_row(row)
+
+    except (DecryptionError, InvalidKeyError, ValueError) as e:
+        raise AccountsFileError(str(e)) from e
+
+
+def get_accounts_data(
+        file_path: str,
+        page_name: str,
+        data_class: type[ExcelAccountData],
+        encrypted: bool = False,
+) -> list[ExcelAccountData]:
+    try:
+        return list(iter_accounts_data(file_path, page_name, data_class, encrypted=encrypted))
+    except AccountsFileError as e:
+        # Read before any account is started, nothing to shut down
+        logger.error(e)
+        sys.exit()
@@ -1,3 +1,5 @@
+import os
+
 from core.config import FILE_LOCK
 
 
@@ -21,3 +23,39 @@ async def clear_file(path, encoding="utf-8"):
     async with FILE_LOCK:
         with open(path, mode="w", encoding=encoding) as f:
             f.truncate(0)
+
+
+def get_shard_path(path, shard_index: int | None = None):
+    """
+    Gets per process file path in sharded mode, e.g. files/failed_wallets.shard_1.txt
+    :param path:
+    :param shard_index:
+    :return:
+    """
+    if shard_index is None:
+        return path
+
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard_{shard_index}{extension}"
+
+
+def merge_files(paths, path, encoding="utf-8", skip_header: bool = False):
+    """
+    Appends files to the path and removes them, used by the parent process in sharded mode
+    :param paths:
+    :param path:
+    :param encoding:
+    :param skip_header: first line of the parts is a header (csv), it is written only to the empty file
+    :return:
+    """
+    with open(path, mode="a", encoding=encoding) as f:
+        for part_path in paths:
+            if not os.path.exists(part_path):
+                continue
+
+            with open(part_path, encoding=encoding) as part:
+                for line_index, line in enumerate(part):
+                    if skip_header and line_index == 0 and f.tell() > 0:
+                        continue
+                    f.write(line)
+            os.remove(part_path)
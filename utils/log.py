@@ -6,48 +6,89 @@ from aptos_sdk.account_address import AccountAddress
 from loguru import logger
 from sys import stderr
 
-from settings import DEBUG_MODE
+from settings import DEBUG_MODE, LOG_JSON
+from utils.file import get_shard_path
+
+# Set in worker processes of sharded mode, each process writes own log file
+LOG_SHARD_INDEX: int | None = None
+LOG_CONFIGURED = False
+
+LOG_DIR = "./files/logs"
+
+LOG_FORMAT = "<cyan>{time:HH:mm:ss}</cyan> | <level>" "{level: <8}</level> | <level>{extra[prefix]}{message}</level>"
+
+
+def get_log_path(shard_index: int | None = None, log_dir: str = LOG_DIR) -> str:
+    date = datetime.today().date()
+    return get_shard_path(f"{log_dir}/{date}.log", shard_index)
+
+
+def configure_logging(shard_index: int | None = None, log_dir: str = LOG_DIR):
+    """
+    Sets up log sinks once per process, records are written by background thread of each sink
+    :param shard_index: worker process index in sharded mode
+    :param log_dir: dir of the log file
+    :return:
+    """
+    global LOG_CONFIGURED
+    logger.remove()
+    logger.configure(extra={"prefix": ""})
+    logger.add(stderr, level="DEBUG" if DEBUG_MODE else "INFO", format=LOG_FORMAT, enqueue=True)
+    logger.add(
+        get_log_path(shard_index, log_dir),
+        rotation="500 MB",
+        # File is created by the first record, not when the sink is set up on import of a module with a logger
+        delay=True,
+        level="INFO",
+        format=LOG_FORMAT,
+        serialize=LOG_JSON,
+        enqueue=True
+    )
+    LOG_CONFIGURED = True
+
+
+def shutdown_logging():
+    """
+    Writes out queued records and closes sinks, atexit hooks do not run in the pool worker processes
+    :return:
+    """
+    global LOG_CONFIGURED
+    logger.remove()
+    LOG_CONFIGURED = False
+
+
+def set_log_shard(shard_index: int | None):
+    global LOG_SHARD_INDEX
+    LOG_SHARD_INDEX = shard_index
+    configure_logging(shard_index)
 
 
 class Logger(ABC):
     def __init__(self, account_address: AccountAddress | None = None, proxy: str | None = None):
-        self.logger = logger
+        if not LOG_CONFIGURED:
+            configure_logging(LOG_SHARD_INDEX)
+
         self.account_address = account_address
         self.proxy = proxy
 
-        self.logger.remove()
-        logger_format = "<cyan>{time:HH:mm:ss}</cyan> | <level>" "{level: <8}</level> | <level>{message}</level>"
-        if DEBUG_MODE:
-            self.logger.add(stderr, level="DEBUG", format=logger_format)
-        else:
-            self.logger.add(stderr, level="INFO", format=logger_format)
-        date = datetime.today().date()
-        self.logger.add(f"./files/logs/{date}.log", rotation="500 MB", level="INFO", format=logger_format)
+        # Prefix is built once, records keep account and proxy as fields for the json log
+        prefix = ''
+        if account_address is not None:
+            prefix += f'[{account_address}] |'
+        if proxy is not None:
+            prefix += f'[{proxy}] |'
+        prefix += f'[{self.__class__.__name__}] | '
+        self.logger = logger.bind(
+            prefix=prefix,
+            account=str(account_address) if account_address is not None else None,
+            proxy=proxy,
+            module_name=self.__class__.__name__
+        )
 
     def logger_msg(
             self,
             msg: str,
             type_msg: Literal['debug', 'info', 'error', 'success', 'warning', 'critical'] = 'info'
     ):
-        class_name = self.__class__.__name__
-
-        info = ''
-        if self.account_address is not None:
-            info += f'[{self.account_address}] |'
-        if self.proxy is not None:
-            info += f'[{self.proxy}] |'
-        info += f'[{class_name}] |'
-
-        match type_msg:
-            case 'debug':
-                self.logger.debug(f"{info} {msg}")
-            case 'info':
-                self.logger.info(f"{info} {msg}")
-            case 'error':
-                self.logger.error(f"{info} {msg}")
-            case 'success':
-                self.logger.success(f"{info} {msg}")
-            case 'warning':
-                self.logger.warning(f"{info} {msg}")
-            case 'critical':
-                self.logger.critical(f"{info} {msg}")
+        # Level is checked by loguru before message is turned into string, filtered debug dumps are not formatted
+        self.logger.opt(depth=1).log(type_msg.upper(), msg)
@@ -1,62 +1,60 @@
-import pandas as pd
-import sys
 import io
-import msoffcrypto
 from getpass import getpass
+from typing import Iterator
 
+import msoffcrypto
+import openpyxl
 from loguru import logger
 from msoffcrypto.exceptions import DecryptionError, InvalidKeyError
 
-from core.dataclasses import ExcelAccountData
 
+def decrypt_excel(file) -> io.BytesIO:
+    logger.success('⚔️ Enter the password degen')
+    password = getpass()
+    office_file = msoffcrypto.OfficeFile(file)
 
-def get_data_from_excel(
-        file_path: str,
-        page_name: str,
-        data_class: type[ExcelAccountData],
-        encrypted: bool = False,
-) -> list[type[ExcelAccountData]]:
     try:
-        decrypted_data = io.BytesIO()
-        with open(file_path, 'rb') as file:
-            if encrypted:
-                logger.success('⚔️ Enter the password degen')
-                password = getpass()
-                office_file = msoffcrypto.OfficeFile(file)
-
-                try:
-                    office_file.load_key(password=password)
-                except msoffcrypto.exceptions.DecryptionError:
-                    logger.error('\n⚠️ Incorrect password to decrypt Excel file! ⚠️')
-                    raise DecryptionError('Incorrect password')
-
-                try:
-                    office_file.decrypt(decrypted_data)
-                except msoffcrypto.exceptions.InvalidKeyError:
-                    logger.error('\n⚠️ Incorrect password to decrypt Excel file! ⚠️')
-                    raise InvalidKeyError('Incorrect password')
-                except msoffcrypto.exceptions.DecryptionError:
-                    logger.error('\n⚠️ Set password on your Excel file first! ⚠️')
-                    raise DecryptionError('Excel file without password!')
-
-                office_file.decrypt(decrypted_data)
-            else:
-                decrypted_data = file
-
-            try:
-                wb = pd.read_excel(decrypted_data, sheet_name=page_name)
-            except ValueError as e:
-                logger.error(e)
-                logger.error('\n⚠️ Wrong page name! Please check EXCEL_PAGE_NAME ⚠️')
-                raise ValueError(f"{e}")
+        office_file.load_key(password=password)
+    except msoffcrypto.exceptions.DecryptionError:
+        logger.error('\n⚠️ Incorrect password to decrypt Excel file! ⚠️')
+        raise DecryptionError('Incorrect password')
 
-            instances = []
-            for index, row in wb.iterrows():
-                instance = data_class.from_dataframe_row(row)
-                instances.append(instance)
+    decrypted_data = io.BytesIO()
+    try:
+        office_file.decrypt(decrypted_data)
+    except msoffcrypto.exceptions.InvalidKeyError:
+        logger.error('\n⚠️ Incorrect password to decrypt Excel file! ⚠️')
+        raise InvalidKeyError('Incorrect password')
+    except msoffcrypto.exceptions.DecryptionError:
+        logger.error('\n⚠️ Set password on your Excel file first! ⚠️')
+        raise DecryptionError('Excel file without password!')
+
+    decrypted_data.seek(0)
+    return decrypted_data
+
+
+def iter_rows_from_excel(file_path: str, page_name: str, encrypted: bool = False) -> Iterator[dict]:
+    """
+    Yields sheet rows as dicts by header, reads workbook in read-only (streaming) mode
+    :param file_path:
+    :param page_name:
+    :param encrypted:
+    :return:
+    """
+    with open(file_path, 'rb') as file:
+        data = decrypt_excel(file) if encrypted else file
+        wb = openpyxl.load_workbook(data, read_only=True, data_only=True)
+        try:
+            if page_name not in wb.sheetnames:
+                logger.error('\n⚠️ Wrong page name! Please check EXCEL_PAGE_NAME ⚠️')
+                raise ValueError(f"Worksheet named '{page_name}' not found")
 
-            return instances
+            rows = wb[page_name].iter_rows(values_only=True)
+            header = next(rows, ())
+            for values in rows:
+                if all(value is None for value in values):
+                    continue
+                yield {column: value for column, value in zip(header, values) if column is not None}
+        finally:
+            wb.close()
 
-    except (DecryptionError, InvalidKeyError, DecryptionError, ValueError) as e:
-        logger.error(e)
-        sys.exit()
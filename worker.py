@@ -1,22 +1,56 @@
 import asyncio
 import random
+import time
+from typing import Iterable
 
 from aptos_sdk.account import Account
 
-from core.config import TOKENS_INFO
+from core.config import TOKENS_INFO, SEMAPHORE_LIMIT, CONCURRENCY_LIMIT_RANGE
+from core.cache import RESOURCE_CACHE
+from core.client import AptosCustomRestClient
+from core.concurrency import AdaptiveConcurrencyLimiter
 from core.dataclasses import ExcelAccountData
+from core.deposits import DEPOSIT_WATCHER
+from core.journal import RunJournal
+from core.metrics import METRICS
+from core.rate_limit import RATE_LIMITERS, TokenBucket
+from core.receipts import RECEIPT_WATCHER
+from core.results import RESULTS_WRITER, AccountResult
+from core.rpc_router import RPC_ROUTER
+from core.sequence import SEQUENCE_NUMBERS
+from core.transport import TRANSPORT_REGISTRY
+from modules.exchange.funding import FUNDING_PLANNER
+from modules.exchange.okx import OKX_EXCHANGE
+from modules.liquidswap.pool_index import POOL_INDEX
+from modules.liquidswap.pool_state import POOL_STATE
 from modules.liquidswap.swap import LiquidSwapSwap
 import settings
-from utils.file import append_line, clear_file
+from utils.accounts import AccountsFileError, iter_accounts_data
+from utils.file import get_shard_path
 from utils.log import Logger
-from utils.ms_office import get_data_from_excel
 
 
 class Worker(Logger):
     # TODO здесь необходимо сделать запуск модулей из сгенерированых последовательностей
-    def __init__(self, semaphore):
+    def __init__(self, slots: int = SEMAPHORE_LIMIT, shard_index: int | None = None, funding_share: float = 1.0):
         Logger.__init__(self)
-        self.semaphore = semaphore
+        min_limit, max_limit = CONCURRENCY_LIMIT_RANGE if settings.ADAPTIVE_CONCURRENCY else (slots, slots)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=slots,
+            min_limit=min_limit,
+            max_limit=max_limit,
+            latency_target=settings.CONCURRENCY_LATENCY_TARGET
+        )
+        # Worker coroutines for the max limit, the current limit decides how many of them run accounts
+        self.slots = self.limiter.max_limit
+        self.shard_index = shard_index
+        self.funding_share = funding_share
+        self.journal = RunJournal(get_shard_path(settings.RUN_JOURNAL_PATH, shard_index))
+        self.balances_snapshot: dict[str, dict[str, int]] = {}
+        self.queue: asyncio.Queue | None = None
+        self.busy_slots = 0
+        self.succeeded = 0
+        self.failed = 0
 
     def check_settings(self):
         if not settings.SWAP_AMOUNT_PERCENT and not settings.SWAP_AMOUNT_QUANTITY:
@@ -34,15 +68,27 @@ class Worker(Logger):
 
         return True
 
-    async def start(self):
-        await clear_file("files/succeeded_wallets.txt")
-        await clear_file("files/failed_wallets.txt")
-        accounts_data = get_data_from_excel(
-            settings.EXCEL_FILE_PATH,
-            settings.EXCEL_PAGE_NAME,
-            ExcelAccountData,
-            encrypted=settings.EXCEL_ENCRYPTED
-        )
+    async def start(self, accounts_data: Iterable[ExcelAccountData] | None = None):
+        """
+        Runs all the accounts
+        :param accounts_data: preloaded accounts (e.g. shard of the parent process), read from file if None
+        :return:
+        """
+        if accounts_data is None:
+            accounts_data = iter_accounts_data(
+                settings.EXCEL_FILE_PATH,
+                settings.EXCEL_PAGE_NAME,
+                ExcelAccountData,
+                encrypted=settings.EXCEL_ENCRYPTED
+            )
+
+        # Shuffle and balances snapshot need all the rows, otherwise rows are streamed into the queue
+        if settings.SHUFFLE_ACCOUNTS or settings.BALANCE_SNAPSHOT_PREFLIGHT:
+            try:
+                accounts_data = list(accounts_data)
+            except AccountsFileError as e:
+                self.logger_msg(f'Error reading accounts: {e}', 'critical')
+                return
 
         if settings.SHUFFLE_ACCOUNTS:
             random.shuffle(accounts_data)
@@ -50,37 +96,241 @@ class Worker(Logger):
         if not self.check_settings():
             return
 
-        tasks = []
-        for i, account_data in enumerate(accounts_data):
-            tasks.append(
-                asyncio.create_task(
-                    self.execute(account_data, sleep_needed=False if i < settings.SEMAPHORE_LIMIT else True)
-                )
-            )
+        # Results of the interrupted run are kept, its succeeded accounts are not run again
+        resumed = await self.journal.open(resume=settings.RESUME_RUN)
+        if resumed:
+            self.logger_msg(f'Resuming previous run from journal: {self.journal.path}')
+
+        complete = False
+        try:
+            rpc_client = AptosCustomRestClient()
+            await POOL_INDEX.load_or_build(rpc_client)
+
+            await METRICS.start(self.shard_index)
+            await RESULTS_WRITER.start(self.shard_index, resume=resumed)
+            if settings.POOL_STATE_SERVICE:
+                await POOL_STATE.start(rpc_client)
+
+            if settings.BALANCE_SNAPSHOT_PREFLIGHT:
+                await self.snapshot_balances(accounts_data, rpc_client)
+                if settings.FUNDING_PLANNER and not settings.ONLY_WITHDRAW:
+                    await FUNDING_PLANNER.start(
+                        accounts_data,
+                        self.balances_snapshot,
+                        self.journal,
+                        balance_share=self.funding_share
+                    )
+
+            # Run with an invalid row is not complete, resumed run starts the accounts after the row is fixed
+            complete = await self.run_queue(accounts_data)
+        finally:
+            await POOL_STATE.stop()
+            await RESULTS_WRITER.stop()
+            await FUNDING_PLANNER.stop()
+            await DEPOSIT_WATCHER.stop()
+            self.logger_msg(f'Transport stats: {TRANSPORT_REGISTRY.stats()}', 'debug')
+            self.logger_msg(f'Resource cache stats: {RESOURCE_CACHE.stats()}', 'debug')
+            self.logger_msg(f'Sequence numbers stats: {SEQUENCE_NUMBERS.stats()}', 'debug')
+            self.logger_msg(f'Receipts stats: {RECEIPT_WATCHER.stats()}', 'debug')
+            self.logger_msg(f'Rpc stats: {RPC_ROUTER.stats()}', 'debug')
+            self.logger_msg(f'Concurrency stats: {self.limiter.stats()}', 'debug')
+            self.logger_msg(f'Rate limits stats: {RATE_LIMITERS.stats()}', 'debug')
+            self.logger_msg(f'Deposits stats: {DEPOSIT_WATCHER.stats()}', 'debug')
+            self.logger_msg(f'Pool state stats: {POOL_STATE.stats()}', 'debug')
+            self.logger_msg(f'Results stats: {RESULTS_WRITER.stats()}', 'debug')
+            self.logger_msg(f'Journal stats: {self.journal.stats()}', 'debug')
+            await METRICS.stop()
+            self.logger_msg(f'Metrics stats: {METRICS.stats()}', 'debug')
+            await TRANSPORT_REGISTRY.aclose()
+            await OKX_EXCHANGE.close()
+            # Marked complete only here, after the results of all the accounts are written
+            await self.journal.close(complete=complete)
 
-        res = await asyncio.gather(*tasks)
         self.logger_msg(
-            f'Wallets: {len(res)} Succeeded: {len([x for x in res if x])} Failed: {len([x for x in res if not x])}'
+            f'Wallets: {self.succeeded + self.failed} Succeeded: {self.succeeded} Failed: {self.failed}'
         )
 
-    async def execute(self, account_data: type[ExcelAccountData], sleep_needed: bool = False):
-        async with self.semaphore:
-            if sleep_needed:
-                sleep_time = random.randint(*settings.SLEEP_RANGE_BETWEEN_ACCOUNTS)
-                self.logger_msg(f'sleeping: {sleep_time} second')
-                await asyncio.sleep(sleep_time)
-
-            account = Account.load_key(account_data.private_key)
-            module = LiquidSwapSwap(
-                account,
-                cex_address=account_data.cex_address,
-                proxy=account_data.proxy
-            )
-            result = await module.run()
+    def create_pacer(self) -> TokenBucket:
+        """
+        Token bucket of account starts: first accounts of each slot start at once, then each slot starts
+        next account once per SLEEP_RANGE_BETWEEN_ACCOUNTS, so the bucket refills the slots count times faster.
+        Both follow the current concurrency limit, raised limit admits more accounts
+        :return:
+        """
+        return TokenBucket(
+            capacity=lambda: self.limiter.current_limit,
+            interval=lambda: random.randint(*settings.SLEEP_RANGE_BETWEEN_ACCOUNTS) / self.limiter.current_limit
+        )
+
+    async def produce(self, accounts_data: Iterable[ExcelAccountData]) -> bool:
+        """
+        Puts accounts into the queue, account starts are paced by token bucket outside the worker slots
+        :param accounts_data:
+        :return: False if reading of the streamed accounts failed, started accounts are still run to the end
+        """
+        pacer = self.create_pacer()
+        read = True
+        try:
+            for account_data in accounts_data:
+                # Failed accounts of the interrupted run are run again, done steps of them are not repeated
+                if self.journal.is_finished(str(account_data.name)):
+                    self.logger_msg(f'Wallet {account_data.name} succeeded in previous run, skipped', 'debug')
+                    self.succeeded += 1
+                    continue
+
+                waited = await pacer.acquire()
+                if waited:
+                    self.logger_msg(f'paced next account start by: {waited:.0f} second', 'debug')
+                await self.queue.put(account_data)
+        except AccountsFileError as e:
+            self.logger_msg(f'Error reading accounts, next accounts are not started: {e}', 'critical')
+            read = False
+
+        for _ in range(self.slots):
+            await self.queue.put(None)
+
+        return read
+
+    async def consume(self):
+        while True:
+            account_data = await self.queue.get()
+            if account_data is None:
+                return
+
+            async with self.limiter:
+                self.busy_slots += 1
+                try:
+                    result = await self.execute(account_data)
+                except Exception as e:
+                    self.logger_msg(f'Wallet {account_data.name} stopped with error: {e}', 'error')
+                    self.put_result(AccountResult(name=str(account_data.name), result=False, error=str(e)))
+                    result = False
+                finally:
+                    self.busy_slots -= 1
 
+            METRICS.inc('liquidswap_accounts_total', result='succeeded' if result else 'failed')
             if result:
-                await append_line(str(account_data.name), "files/succeeded_wallets.txt")
-                return True
+                self.succeeded += 1
+            else:
+                self.failed += 1
 
-            await append_line(str(account_data.name), "files/failed_wallets.txt")
-            return False
+    def get_metrics(self) -> dict:
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'busy_slots': self.busy_slots,
+            'slots': self.limiter.current_limit,
+            'slot_utilisation': self.busy_slots / self.limiter.current_limit,
+            'concurrency_limit': self.limiter.current_limit,
+            'concurrency_limit_range': (self.limiter.min_limit, self.limiter.max_limit),
+            'succeeded': self.succeeded,
+            'failed': self.failed
+        }
+
+    async def report_metrics(self):
+        while True:
+            await asyncio.sleep(settings.WORKER_METRICS_INTERVAL)
+            metrics = self.get_metrics()
+            self.logger_msg(
+                f"Queue depth: {metrics['queue_depth']} | Slots busy: {metrics['busy_slots']}/{metrics['slots']} "
+                f"| Succeeded: {metrics['succeeded']} | Failed: {metrics['failed']}"
+            )
+
+    async def run_queue(self, accounts_data: Iterable[ExcelAccountData]) -> bool:
+        """
+        Runs accounts by fixed pool of worker coroutines pulling from bounded queue
+        :param accounts_data:
+        :return: True if all the accounts are read and run
+        """
+        self.queue = asyncio.Queue(maxsize=self.slots)
+        consumers = [asyncio.create_task(self.consume()) for _ in range(self.slots)]
+        reporter = asyncio.create_task(self.report_metrics())
+        background_tasks = [reporter]
+        if settings.ADAPTIVE_CONCURRENCY:
+            background_tasks.append(asyncio.create_task(self.limiter.run(settings.CONCURRENCY_ADJUST_INTERVAL)))
+        try:
+            read, *_ = await asyncio.gather(self.produce(accounts_data), *consumers)
+            return read
+        finally:
+            for task in background_tasks:
+                task.cancel()
+            for consumer in consumers:
+                consumer.cancel()
+
+    async def snapshot_balances(self, accounts_data: list[ExcelAccountData], client: AptosCustomRestClient):
+        """
+        Gets balances of all accounts before swaps start for the funding planner. They are not put into the resource
+        cache: accounts start long after its ttl and read own balances again.
+        Requests go through one shared client from a fixed pool of BALANCE_SNAPSHOT_CONCURRENCY workers
+        :param accounts_data:
+        :param client:
+        :return:
+        """
+        apt_address = TOKENS_INFO['APT']
+        token_addresses = list(TOKENS_INFO.values())
+        pending_accounts = iter(accounts_data)
+
+        async def snapshot():
+            for account_data in pending_accounts:
+                address = Account.load_key(account_data.private_key).address()
+                try:
+                    coin_stores = await client.account_coin_stores(address, token_addresses, use_cache=False)
+                except Exception as e:
+                    self.logger_msg(f'Wallet {account_data.name} balances error: {e}', 'error')
+                    continue
+
+                self.balances_snapshot[str(account_data.name)] = {
+                    token_address: int(coin_store["data"]["coin"]["value"]) if coin_store else 0
+                    for token_address, coin_store in coin_stores.items()
+                }
+
+        self.logger_msg(f'Getting balances snapshot of {len(accounts_data)} wallets')
+        workers = min(settings.BALANCE_SNAPSHOT_CONCURRENCY, len(accounts_data))
+        await asyncio.gather(*[snapshot() for _ in range(workers)])
+
+        low_balance_count = len([
+            balances for balances in self.balances_snapshot.values()
+            if balances[apt_address] / 10 ** 8 < settings.MIN_WALLET_BALANCE
+        ])
+        self.logger_msg(
+            f'Balances snapshot: {len(self.balances_snapshot)}/{len(accounts_data)} wallets, '
+            f'{low_balance_count} need deposit from exchange'
+        )
+
+    def put_result(self, account_result: AccountResult):
+        """
+        Queues the account result, the account is journaled as finished only once its result is written,
+        so resumed run does not skip the account with lost result
+        :param account_result:
+        :return:
+        """
+        RESULTS_WRITER.put(
+            account_result,
+            on_written=lambda: self.journal.record(account_result.name, 'finished', result=account_result.result)
+        )
+
+    async def execute(self, account_data: ExcelAccountData):
+        account = Account.load_key(account_data.private_key)
+        module = LiquidSwapSwap(
+            account,
+            cex_address=account_data.cex_address,
+            proxy=account_data.proxy,
+            journal=self.journal.for_account(str(account_data.name))
+        )
+        started_at = time.time()
+        error = None
+        try:
+            result = bool(await module.run())
+        except Exception as e:
+            self.logger_msg(f'Wallet {account_data.name} stopped with error: {e}', 'error')
+            result, error = False, str(e)
+
+        self.put_result(AccountResult(
+            name=str(account_data.name),
+            result=result,
+            address=str(account.address()),
+            started_at=started_at,
+            duration=round(time.time() - started_at, 3),
+            tx_hashes=module.tx_hashes,
+            error=error
+        ))
+        return result